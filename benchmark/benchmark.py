@@ -2,33 +2,208 @@
 Benchmark the WER and RTF of a model (EncoderASR or EncoderDecoderASR)
 """
 
+import time
+
+import numpy as np
 import tqdm
 from speechbrain.inference.ASR import EncoderASR, EncoderDecoderASR
+from benchmark.memory import PeakRSS
 from benchmark.wrapper import EncoderASRWrapper, EncoderDecoderASRWrapper
-from benchmark.wer import compute_wer
+from benchmark.wer import StreamingWER
+from data.data import length_bucketed_batches, sample_lengths
+from data.prefetch import Prefetcher
+
+
+def benchmark(
+    model,
+    samples,
+    references,
+    batch_size=1,
+    max_wer=None,
+    warmup=10,
+    **wrapper_kwargs,
+):
+    """Transcribes the samples and measures WER, RTF and throughput.
 
+    Samples are sorted by length and grouped into padded batches of up to
+    ``batch_size`` utterances, which are transcribed together. Each batch
+    is scored against its references as soon as it is transcribed, so
+    transcripts are not kept in memory.
 
-def benchmark(model, samples, references):
-    total_audio_length = sum([sample.shape[0] / 16000 for sample in samples])
+    Arguments
+    ---------
+    model : EncoderASR | EncoderDecoderASR
+        Model to be benchmarked.
+    samples : list[torch.Tensor] | LibriSpeechDataset | Prefetcher
+        1D audio tensors, sampled at 16kHz. A Prefetcher loads and
+        preprocesses upcoming batches while the current one is transcribed.
+    references : list[str]
+        Reference transcripts, in the same order as the samples.
+    batch_size : int
+        Maximum number of utterances transcribed together.
+    max_wer : float
+        WER (%) budget. Evaluation stops as soon as the WER over all of the
+        references is certain to exceed it, whatever the remaining
+        transcripts turn out to be.
+    warmup : int
+        Number of samples transcribed before timing starts.
+    **wrapper_kwargs
+        Options of the wrapper, e.g. ``chunk_window`` for EncoderASR models,
+        or ``vad`` to only transcribe speech regions.
+
+    Returns
+    -------
+    dict
+        ``wer`` (%), ``rtf`` (encoder time per second of audio),
+        ``skipped_audio`` (seconds of audio not sent to the encoder, found to
+        be silence by the VAD), ``effective_rtf`` (VAD and encoder time per
+        second of audio, i.e. the RTF net of the cost of the VAD), ``e2e_rtf``
+        (preprocessing, encoder, decoder and tokenizer time per second of
+        audio), ``audio`` (seconds of audio transcribed), ``throughput``
+        (seconds of audio transcribed per wall-clock second), ``stages``
+        (p50/p90/p99 wall and CPU time of each stage per batch, see
+        ``StageTimer.summary``) and ``peak_rss`` (peak resident set size while
+        evaluating, in bytes). If evaluation stopped early, ``stopped_early``
+        is True and all values only cover the samples transcribed so far.
+    """
+    total_audio_length = 0
     total_cpu_time = 0
-    outputs = []
+    scorer = StreamingWER()
+    total_ref_words = sum(len(reference.split()) for reference in references)
+    stopped_early = False
+
+    wrapper = make_wrapper(model, **wrapper_kwargs)
 
+    # warmup iterations reduce unwanted variation in timing
+    warmup_samples = samples[:warmup]
+    warmup_batches = length_bucketed_batches(sample_lengths(warmup_samples), batch_size)
+    for indices in tqdm.tqdm(warmup_batches, desc="warming up"):
+        wrapper.timed_transcribe_batch([warmup_samples[i] for i in indices])
+
+    wrapper.reset()
+
+    lengths = sample_lengths(samples)
+    batches = length_bucketed_batches(lengths, batch_size)
+    if isinstance(samples, Prefetcher) and wrapper.vad is None:
+        # batches are loaded and preprocessed in the background, so the
+        # preprocess stage is not timed
+        loaded = samples.iter_batches(batches, wrapper.preprocess_batch)
+
+        def transcribe(batch):
+            return wrapper.timed_transcribe_padded(*batch)
+
+    elif isinstance(samples, Prefetcher):
+        # the VAD needs the raw waveforms, so only loading is in the background
+        loaded = samples.iter_batches(batches, list)
+        transcribe = wrapper.timed_transcribe_batch
+    else:
+        loaded = ((indices, [samples[i] for i in indices]) for indices in batches)
+        transcribe = wrapper.timed_transcribe_batch
+    with PeakRSS() as peak_rss:
+        start = time.perf_counter()
+        for indices, batch in tqdm.tqdm(loaded, total=len(batches), desc="evaluating"):
+            predicted_words, duration = transcribe(batch)
+            scorer.update_batch([references[i] for i in indices], predicted_words)
+            total_audio_length += sum(lengths[i] / 16000 for i in indices)
+            total_cpu_time += duration
+            if max_wer is not None and scorer.lower_bound(total_ref_words) > max_wer:
+                stopped_early = True
+                break
+        wall_time = time.perf_counter() - start
+
+    total_stage_time = sum(
+        wrapper.timer.total(stage) for stage in wrapper.timer.stages()
+    )
+    vad_time = wrapper.timer.total("vad") if wrapper.vad is not None else 0.0
+    return {
+        "wer": scorer.wer(),
+        "rtf": total_cpu_time / total_audio_length,
+        "skipped_audio": total_audio_length - wrapper.encoded_seconds,
+        "effective_rtf": (vad_time + total_cpu_time) / total_audio_length,
+        "e2e_rtf": total_stage_time / total_audio_length,
+        "audio": total_audio_length,
+        "throughput": total_audio_length / wall_time,
+        "stages": wrapper.timer.summary(),
+        "peak_rss": peak_rss.peak,
+        "stopped_early": stopped_early,
+    }
+
+
+def length_scaling(model, sample, durations, repeats=3, **wrapper_kwargs):
+    """Measures how transcription latency grows with input length.
+
+    Inputs of each duration are made by repeating the sample, and the best
+    latency of ``repeats`` runs is kept. A straight line is fitted to the
+    latencies; an ``r2`` close to 1 means latency grows linearly.
+
+    Arguments
+    ---------
+    model : EncoderASR | EncoderDecoderASR
+        Model to be benchmarked.
+    sample : torch.Tensor
+        1D audio tensor, sampled at 16kHz.
+    durations : list[float]
+        Input lengths to be timed, in seconds.
+    repeats : int
+        Number of runs per input length.
+    **wrapper_kwargs
+        Options of the wrapper, e.g. ``chunk_window`` for EncoderASR models.
+
+    Returns
+    -------
+    dict
+        ``durations`` and ``latencies`` (seconds), ``slope`` (seconds of
+        latency per second of audio), ``intercept`` and ``r2`` of the fit.
+    """
+    wrapper = make_wrapper(model, **wrapper_kwargs)
+    latencies = []
+    for duration in tqdm.tqdm(durations, desc="timing lengths"):
+        num_samples = int(duration * 16000)
+        repeated = sample.repeat(num_samples // sample.shape[0] + 1)[:num_samples]
+        times = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            wrapper(repeated)
+            times.append(time.perf_counter() - start)
+        latencies.append(min(times))
+
+    slope, intercept = np.polyfit(durations, latencies, 1)
+    predicted = slope * np.asarray(durations) + intercept
+    residual = np.sum((np.asarray(latencies) - predicted) ** 2)
+    total = np.sum((np.asarray(latencies) - np.mean(latencies)) ** 2)
+    return {
+        "durations": list(durations),
+        "latencies": latencies,
+        "slope": float(slope),
+        "intercept": float(intercept),
+        "r2": float(1 - residual / total) if total > 0 else 1.0,
+    }
+
+
+def make_wrapper(model, **wrapper_kwargs):
     if isinstance(model, EncoderASR):
-        wrapper = EncoderASRWrapper(model)
+        return EncoderASRWrapper(model, **wrapper_kwargs)
     elif isinstance(model, EncoderDecoderASR):
-        wrapper = EncoderDecoderASRWrapper(model)
+        return EncoderDecoderASRWrapper(model, **wrapper_kwargs)
     else:
         raise NotImplementedError
-    
-    # warmup iterations reduce unwanted variation in timing
-    for sample in tqdm.tqdm(samples[:10], desc="warming up"):
-        wrapper.timed_transcribe(sample)
 
-    for sample in tqdm.tqdm(samples, desc="evaluating"):
-        output, duration = wrapper.timed_transcribe(sample)
-        outputs.append(output)
-        total_cpu_time += duration
 
-    wer = compute_wer(references, outputs)
-    rtf = total_cpu_time / total_audio_length
-    return wer, rtf
+def format_results(results):
+    """Formats the output of ``benchmark`` as lines of text for the output files."""
+    lines = [
+        f"WER(%): {results['wer']}",
+        f"RTF: {results['rtf']}",
+        f"End-to-end RTF: {results['e2e_rtf']}",
+        f"Skipped audio (s): {results['skipped_audio']}",
+        f"Effective RTF: {results['effective_rtf']}",
+        f"Throughput: {results['throughput']}",
+        f"Peak RSS (MB): {results['peak_rss'] / 2**20}",
+    ]
+    if results["stopped_early"]:
+        lines.append("Stopped early: WER budget exceeded")
+    for stage, clocks in results["stages"].items():
+        for clock, stats in clocks.items():
+            values = ", ".join(f"{k}={v:.6f}s" for k, v in stats.items())
+            lines.append(f"{stage} ({clock}): {values}")
+    return "\n".join(lines) + "\n"
@@ -1,12 +1,23 @@
 """
 Functions for counting the number of FLOPs (per unit audio length),
 so as to help with sensitivity analysis of quantization.
+
+Tracing a large encoder is slow, so FLOPs can be cached on disk and fitted
+as a function of audio length, to be predicted for any length without
+tracing again.
 """
 
+import hashlib
+import json
+import os
+
+import numpy as np
 import torch
 from fvcore.nn import FlopCountAnalysis
 from speechbrain.inference.ASR import EncoderASR, EncoderDecoderASR
 
+from data.data import pcm_to_float
+
 
 def count_flops(model, modules, sample):
     return _encoder_flop_analysis(model, modules, sample, FlopCountAnalysis)
@@ -14,22 +25,180 @@ def count_flops(model, modules, sample):
 
 # Pass dependency into function for easier testing
 def _encoder_flop_analysis(model, modules, sample, flop_analyzer):
+    # audio signal is 16kHz
+    audio_length = sample.shape[0] / 16000
+
+    flops = _encoder_flops(model, modules, sample, flop_analyzer)
+    return {module: value / audio_length for module, value in flops.items()}
+
+
+def _encoder_flops(model, modules, sample, flop_analyzer):
     if not isinstance(model, EncoderASR) and not isinstance(model, EncoderDecoderASR):
         raise NotImplementedError
 
-    wavs = sample.unsqueeze(0).float()
+    wavs = pcm_to_float(sample.unsqueeze(0))
     wav_lens = torch.tensor([1.0])
 
-    # audio signal is 16kHz
-    audio_length = sample.shape[0] / 16000
-
     flops = flop_analyzer(model.mods.encoder, (wavs, wav_lens))
     flops_by_module = flops.by_module()
     output = {}
     for module in modules:
         if module.startswith("encoder."):
-            output[module] = (
-                flops_by_module[module.removeprefix("encoder.")] / audio_length
-            )
+            output[module] = flops_by_module[module.removeprefix("encoder.")]
 
     return output
+
+
+class FlopCache:
+    """FLOPs of encoder modules, stored in a JSON file.
+
+    Entries are keyed by model source, module set and input length, since
+    the FLOPs of a trace do not depend on the values of the input.
+
+    Arguments
+    ---------
+    path : str
+        Path of the JSON file, created on the first write.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    @staticmethod
+    def key(src, modules, num_samples):
+        description = json.dumps([src, sorted(modules), num_samples])
+        return hashlib.sha256(description.encode()).hexdigest()
+
+    def get(self, src, modules, num_samples):
+        return self.entries.get(self.key(src, modules, num_samples))
+
+    def set(self, src, modules, num_samples, flops):
+        self.entries[self.key(src, modules, num_samples)] = flops
+        with open(self.path, "w") as f:
+            json.dump(self.entries, f)
+
+
+def cached_encoder_flops(
+    load_model,
+    src,
+    modules,
+    num_samples,
+    cache,
+    flop_analyzer=FlopCountAnalysis,
+):
+    """FLOPs of encoder modules for an input length, traced only on a cache miss.
+
+    Arguments
+    ---------
+    load_model : Callable[[], EncoderASR | EncoderDecoderASR]
+        Returns the model. Only called on a cache miss, so that the model
+        need not be loaded when all lengths are cached.
+    src : str
+        Source of the model, e.g. ``ModelConfig.src``, used as part of the key.
+    modules : list[str]
+        Names of the modules to be counted; only ``encoder.*`` ones are.
+    num_samples : int
+        Input length, in samples at 16kHz.
+    cache : FlopCache
+        Cache to be read and updated.
+    flop_analyzer : Callable
+        Counts FLOPs by module, e.g. fvcore's FlopCountAnalysis.
+
+    Returns
+    -------
+    dict[str, float]
+        FLOPs of each encoder module for the whole input.
+    """
+    flops = cache.get(src, modules, num_samples)
+    if flops is None:
+        # FLOPs do not depend on the input values, so any audio will do
+        generator = torch.Generator().manual_seed(0)
+        sample = torch.randn(num_samples, generator=generator)
+        flops = _encoder_flops(load_model(), modules, sample, flop_analyzer)
+        cache.set(src, modules, num_samples, flops)
+    return flops
+
+
+class FlopModel:
+    """FLOPs of encoder modules as a function of audio length.
+
+    Each module's FLOPs are fitted as ``a * L + b * L**2`` for an audio
+    length of ``L`` seconds: most ops grow linearly with length, while
+    self-attention grows quadratically.
+
+    Arguments
+    ---------
+    coefficients : dict[str, tuple[float, float]]
+        ``(a, b)`` of each module.
+    """
+
+    def __init__(self, coefficients):
+        self.coefficients = coefficients
+
+    @staticmethod
+    def fit(durations, flops):
+        """Fits the FLOPs traced at several audio lengths.
+
+        Arguments
+        ---------
+        durations : list[float]
+            Audio lengths, in seconds.
+        flops : list[dict[str, float]]
+            FLOPs of each module at each of the durations.
+
+        Returns
+        -------
+        FlopModel
+        """
+        durations = np.asarray(durations, dtype=float)
+        design = np.stack([durations, durations**2], axis=1)
+        coefficients = {}
+        for module in flops[0]:
+            values = np.asarray([f[module] for f in flops], dtype=float)
+            (a, b), *_ = np.linalg.lstsq(design, values, rcond=None)
+            coefficients[module] = (float(a), float(b))
+        return FlopModel(coefficients)
+
+    def predict(self, duration):
+        """FLOPs of each module for an utterance of ``duration`` seconds."""
+        return {
+            module: a * duration + b * duration**2
+            for module, (a, b) in self.coefficients.items()
+        }
+
+    def per_second(self, duration):
+        """FLOPs per second of audio of each module, for an utterance of
+        ``duration`` seconds."""
+        return {
+            module: a + b * duration for module, (a, b) in self.coefficients.items()
+        }
+
+
+def fit_flops(
+    load_model,
+    src,
+    modules,
+    cache,
+    durations=(2, 4, 8, 16),
+    flop_analyzer=FlopCountAnalysis,
+):
+    """Traces (or reads from the cache) the FLOPs of encoder modules at a few
+    audio lengths, and fits them as a function of length.
+
+    See ``cached_encoder_flops`` for the arguments.
+
+    Returns
+    -------
+    FlopModel
+    """
+    flops = [
+        cached_encoder_flops(
+            load_model, src, modules, int(duration * 16000), cache, flop_analyzer
+        )
+        for duration in durations
+    ]
+    return FlopModel.fit(durations, flops)
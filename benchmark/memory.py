@@ -0,0 +1,198 @@
+"""
+Accounting of the memory taken up by a model (EncoderASR or EncoderDecoderASR):
+parameter and buffer bytes per module and per dtype, the projected size of
+low bit quantization, and the peak resident set size of the process.
+"""
+
+import math
+import os
+import resource
+import sys
+import threading
+
+import torch
+import torch.nn as nn
+
+from quantization.utils import get_module
+
+# layers whose weights are quantized by TorchQuant's QWrapper
+_LOW_BIT_LAYERS = (nn.Linear, nn.Conv1d, nn.Conv2d)
+
+
+def memory_by_dtype(module):
+    """Bytes of the parameters and buffers of a module, per dtype.
+
+    Everything in the module's state dict is counted, which includes observer
+    buffers and the packed weights of quantized modules. Tensors shared by
+    several submodules are only counted once.
+
+    Arguments
+    ---------
+    module : torch.nn.Module
+        Module to be measured.
+
+    Returns
+    -------
+    dict[str, int]
+        Bytes per dtype, e.g. ``{"torch.float32": 1024, "torch.qint8": 256}``.
+    """
+    sizes = {}
+    seen = {}
+    for value in module.state_dict().values():
+        for dtype, nbytes in _tensor_bytes(value, seen):
+            sizes[dtype] = sizes.get(dtype, 0) + nbytes
+    return sizes
+
+
+def _tensor_bytes(value, seen):
+    # packed params of quantized modules are ScriptObjects, possibly nested
+    # in tuples, whose tensors are only reachable through their state
+    if isinstance(value, torch.Tensor):
+        key = (value.data_ptr(), value.dtype, value.nelement())
+        if key in seen:
+            return
+        # tensors unpacked from ScriptObjects are temporary, they are kept
+        # alive so that their memory is not reused by the next one
+        seen[key] = value
+        yield str(value.dtype), value.element_size() * value.nelement()
+        if value.is_quantized and value.qscheme() in (
+            torch.per_channel_affine,
+            torch.per_channel_symmetric,
+        ):
+            yield from _tensor_bytes(value.q_per_channel_scales(), seen)
+            yield from _tensor_bytes(value.q_per_channel_zero_points(), seen)
+    elif isinstance(value, (tuple, list)):
+        for item in value:
+            yield from _tensor_bytes(item, seen)
+    elif isinstance(value, torch.ScriptObject) and hasattr(value, "__getstate__"):
+        yield from _tensor_bytes(value.__getstate__(), seen)
+
+
+def module_memory(model, modules):
+    """Bytes of the parameters and buffers of named submodules, per dtype.
+
+    Arguments
+    ---------
+    model : EncoderASR | EncoderDecoderASR
+        Model whose submodules are measured.
+    modules : list[str]
+        Names of the submodules, as accepted by ``quantization.utils.get_module``.
+
+    Returns
+    -------
+    dict[str, dict[str, int]]
+        Bytes per dtype of each module.
+    """
+    return {module: memory_by_dtype(get_module(model, module)) for module in modules}
+
+
+def model_memory(model):
+    """Bytes of the parameters and buffers of a whole model, per dtype."""
+    return memory_by_dtype(model.mods)
+
+
+def projected_low_bit_size(model, bits_config):
+    """Projected bytes of a model once modules are quantized to low bit widths.
+
+    Follows ``extension.quantization.wrap_modules`` with weights quantized:
+    the weights of the Linear and Conv layers inside each module are stored
+    with the given number of bits, plus a float32 scale and zero point,
+    while everything else keeps its current size.
+
+    Arguments
+    ---------
+    model : EncoderASR | EncoderDecoderASR
+        Unquantized model.
+    bits_config : dict[str, int]
+        Number of bits for each module.
+
+    Returns
+    -------
+    dict
+        ``modules`` (projected bytes of each module in bits_config) and
+        ``total`` (projected bytes of the whole model).
+    """
+    projected = {}
+    saved = 0
+    for module_name, bits in bits_config.items():
+        module = get_module(model, module_name)
+        current = sum(memory_by_dtype(module).values())
+        size = current
+        for layer in module.modules():
+            if isinstance(layer, _LOW_BIT_LAYERS):
+                weight = layer.weight
+                size -= weight.element_size() * weight.nelement()
+                # packed weights, and a float32 scale and zero point
+                size += math.ceil(weight.nelement() * bits / 8) + 8
+        projected[module_name] = size
+        saved += current - size
+    return {
+        "modules": projected,
+        "total": sum(model_memory(model).values()) - saved,
+    }
+
+
+def format_memory(sizes):
+    """Formats the output of ``module_memory`` as lines of text, in MB."""
+    lines = []
+    for module, dtypes in sizes.items():
+        values = ", ".join(
+            f"{dtype}={nbytes / 2**20:.3f}MB" for dtype, nbytes in dtypes.items()
+        )
+        lines.append(f"{module}: {sum(dtypes.values()) / 2**20:.3f}MB ({values})")
+    return "\n".join(lines) + "\n"
+
+
+def current_rss():
+    """Resident set size of this process in bytes, or None if unavailable."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+class PeakRSS:
+    """Records the peak resident set size of the process while in use.
+
+    The RSS is polled on a background thread. Where ``/proc`` is unavailable,
+    the peak RSS since the start of the process is reported instead.
+
+    Arguments
+    ---------
+    interval : float
+        Seconds between polls.
+    """
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.peak = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _poll(self):
+        while True:
+            rss = current_rss()
+            if rss is None:
+                return
+            self.peak = max(self.peak, rss)
+            if self._stop.wait(self.interval):
+                return
+
+    def __enter__(self):
+        self.peak = 0
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._poll, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self._stop.set()
+        self._thread.join()
+        rss = current_rss()
+        if rss is None:
+            maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            # ru_maxrss is in bytes on macOS, but in kilobytes on Linux
+            self.peak = maxrss if sys.platform == "darwin" else maxrss * 1024
+        else:
+            self.peak = max(self.peak, rss)
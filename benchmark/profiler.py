@@ -0,0 +1,193 @@
+"""
+Measures where the wall-clock time of inference goes, by attaching forward
+pre/post hooks to named submodules of a model (as named in ModelConfig), so
+as to find which modules are worth quantizing for speed.
+"""
+
+import time
+
+import torch.nn as nn
+import tqdm
+
+from benchmark.benchmark import make_wrapper
+from data.data import length_bucketed_batches, sample_lengths
+from quantization.utils import get_module
+
+
+class ModuleProfiler:
+    """Accumulates the time spent in the forward calls of named submodules.
+
+    Names follow the convention of ``quantization.utils.get_module``, e.g.
+    ``encoder.wav2vec2.model.feature_extractor``. A ``ModuleList`` (which is
+    never called itself) is timed as the sum of its elements. Calls to
+    ``forward_step``, which SpeechBrain's beam searchers use to run decoders
+    one step at a time, are timed as well. Times of nested modules overlap,
+    i.e. a module's time includes its children's.
+
+    Arguments
+    ---------
+    model : EncoderASR | EncoderDecoderASR
+        Model whose submodules are timed.
+    modules : list[str]
+        Names of the submodules to be timed.
+    clock : Callable[[], float]
+        Clock used for timing, in seconds.
+    """
+
+    def __init__(self, model, modules, clock=time.perf_counter):
+        self.model = model
+        self.modules = list(modules)
+        self.clock = clock
+        self.handles = []
+        self.patched = []
+        self.reset()
+
+    def reset(self):
+        self.times = {module: 0.0 for module in self.modules}
+        self.calls = {module: 0 for module in self.modules}
+        # only the outermost of nested calls to the same module is timed
+        self._depths = {module: 0 for module in self.modules}
+        self._starts = {module: 0.0 for module in self.modules}
+
+    def attach(self):
+        for name in self.modules:
+            module = get_module(self.model, name)
+            targets = list(module) if isinstance(module, nn.ModuleList) else [module]
+            for target in targets:
+                self.handles.append(
+                    target.register_forward_pre_hook(self._pre_hook(name))
+                )
+                self.handles.append(target.register_forward_hook(self._post_hook(name)))
+                if hasattr(target, "forward_step"):
+                    target.forward_step = self._timed(name, target.forward_step)
+                    self.patched.append(target)
+
+    def detach(self):
+        for handle in self.handles:
+            handle.remove()
+        self.handles = []
+        for target in self.patched:
+            del target.forward_step
+        self.patched = []
+
+    def __enter__(self):
+        self.attach()
+        return self
+
+    def __exit__(self, *args):
+        self.detach()
+
+    def _enter(self, name):
+        if self._depths[name] == 0:
+            self._starts[name] = self.clock()
+        self._depths[name] += 1
+
+    def _exit(self, name):
+        self._depths[name] -= 1
+        if self._depths[name] == 0:
+            self.times[name] += self.clock() - self._starts[name]
+            self.calls[name] += 1
+
+    def _pre_hook(self, name):
+        def hook(module, inputs):
+            self._enter(name)
+
+        return hook
+
+    def _post_hook(self, name):
+        def hook(module, inputs, output):
+            self._exit(name)
+
+        return hook
+
+    def _timed(self, name, method):
+        def timed_method(*args, **kwargs):
+            self._enter(name)
+            try:
+                return method(*args, **kwargs)
+            finally:
+                self._exit(name)
+
+        return timed_method
+
+    def table(self, audio_length, total_time=None):
+        """Modules ranked by time spent in them, slowest first.
+
+        Arguments
+        ---------
+        audio_length : float
+            Seconds of audio processed while profiling.
+        total_time : float
+            Total inference time while profiling, to compute each module's share.
+
+        Returns
+        -------
+        list[dict]
+            ``module``, ``time`` (seconds), ``time_per_second`` (seconds per
+            second of audio), ``calls`` and ``share`` (of total_time, or None).
+        """
+        rows = []
+        for module in self.modules:
+            rows.append(
+                {
+                    "module": module,
+                    "time": self.times[module],
+                    "time_per_second": self.times[module] / audio_length,
+                    "calls": self.calls[module],
+                    "share": (
+                        self.times[module] / total_time
+                        if total_time is not None
+                        else None
+                    ),
+                }
+            )
+        return sorted(rows, key=lambda row: row["time"], reverse=True)
+
+
+def profile_modules(model, modules, samples, batch_size=1, warmup=10):
+    """Transcribes the samples and measures the time spent in each module.
+
+    Arguments
+    ---------
+    model : EncoderASR | EncoderDecoderASR
+        Model to be profiled, fp32 or quantized.
+    modules : list[str]
+        Names of the submodules to be timed.
+    samples : list[torch.Tensor] | LibriSpeechDataset
+        1D audio tensors, sampled at 16kHz.
+    batch_size : int
+        Maximum number of utterances transcribed together.
+    warmup : int
+        Number of samples transcribed before profiling starts.
+
+    Returns
+    -------
+    list[dict]
+        Ranked table of modules, see ``ModuleProfiler.table``.
+    """
+    wrapper = make_wrapper(model)
+    for sample in samples[:warmup]:
+        wrapper.timed_transcribe(sample)
+
+    audio_length = 0
+    lengths = sample_lengths(samples)
+    batches = length_bucketed_batches(lengths, batch_size)
+    with ModuleProfiler(model, modules) as profiler:
+        start = time.perf_counter()
+        for indices in tqdm.tqdm(batches, desc="profiling"):
+            wrapper.timed_transcribe_batch([samples[i] for i in indices])
+            audio_length += sum(lengths[i] / 16000 for i in indices)
+        total_time = time.perf_counter() - start
+    return profiler.table(audio_length, total_time)
+
+
+def format_profile(table):
+    """Formats the output of ``ModuleProfiler.table`` as lines of text."""
+    lines = []
+    for rank, row in enumerate(table, start=1):
+        share = f", {row['share'] * 100:.1f}%" if row["share"] is not None else ""
+        lines.append(
+            f"{rank}. {row['module']}: {row['time_per_second']:.6f}s per second "
+            f"of audio ({row['calls']} calls{share})"
+        )
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,204 @@
+"""
+Runs a benchmark several times under controlled threading and CPU affinity,
+and reports RTF with bootstrap confidence intervals, so that differences
+between quantization configs can be told apart from noise.
+"""
+
+import os
+
+import numpy as np
+import torch
+
+from benchmark.benchmark import benchmark
+
+
+def bootstrap_ci(values, confidence=0.95, num_resamples=10000, seed=0):
+    """Bootstrap confidence interval of the mean of values.
+
+    Arguments
+    ---------
+    values : list[float]
+        Measurements, e.g. the RTF of each run.
+    confidence : float
+        Confidence level of the interval.
+    num_resamples : int
+        Number of bootstrap resamples.
+    seed : int
+        Seed of the resampling, for reproducible intervals.
+
+    Returns
+    -------
+    tuple[float, float]
+        Lower and upper bounds of the interval.
+    """
+    values = np.asarray(values, dtype=float)
+    rng = np.random.default_rng(seed)
+    resamples = rng.choice(values, size=(num_resamples, len(values)), replace=True)
+    means = resamples.mean(axis=1)
+    alpha = (1 - confidence) / 2
+    lower, upper = np.quantile(means, [alpha, 1 - alpha])
+    return float(lower), float(upper)
+
+
+def compare(baseline, candidate, confidence=0.95, num_resamples=10000, seed=0):
+    """Compares two sets of measurements, e.g. the RTFs of two configs.
+
+    The runs of each config are resampled independently, and the difference
+    is only significant if its confidence interval excludes zero.
+
+    Arguments
+    ---------
+    baseline : list[float]
+        Measurements of the baseline.
+    candidate : list[float]
+        Measurements of the candidate.
+    confidence, num_resamples, seed
+        See ``bootstrap_ci``.
+
+    Returns
+    -------
+    dict
+        ``difference`` (mean of candidate minus mean of baseline), ``ci``
+        (confidence interval of the difference) and ``significant``.
+    """
+    baseline = np.asarray(baseline, dtype=float)
+    candidate = np.asarray(candidate, dtype=float)
+    rng = np.random.default_rng(seed)
+    baseline_means = rng.choice(
+        baseline, size=(num_resamples, len(baseline)), replace=True
+    ).mean(axis=1)
+    candidate_means = rng.choice(
+        candidate, size=(num_resamples, len(candidate)), replace=True
+    ).mean(axis=1)
+    alpha = (1 - confidence) / 2
+    lower, upper = np.quantile(candidate_means - baseline_means, [alpha, 1 - alpha])
+    return {
+        "difference": float(candidate.mean() - baseline.mean()),
+        "ci": (float(lower), float(upper)),
+        "significant": bool(lower > 0 or upper < 0),
+    }
+
+
+def repeated_benchmark(
+    model,
+    samples,
+    references,
+    repeats=5,
+    num_threads=None,
+    num_interop_threads=None,
+    cpu_affinity=None,
+    confidence=0.95,
+    benchmark_fn=benchmark,
+    **benchmark_kwargs,
+):
+    """Runs ``benchmark`` several times and reports RTF with confidence intervals.
+
+    Thread counts and CPU affinity are set for the duration of the runs and
+    restored afterwards, except for the inter-op thread count, which torch
+    only allows to be set once per process. The settings actually in effect
+    are recorded, since a request may not be honoured.
+
+    Arguments
+    ---------
+    model : EncoderASR | EncoderDecoderASR
+        Model to be benchmarked.
+    samples : list[torch.Tensor]
+        1D audio tensors, sampled at 16kHz.
+    references : list[str]
+        Reference transcripts, in the same order as the samples.
+    repeats : int
+        Number of timed passes over the samples.
+    num_threads : int
+        Intra-op threads (``torch.set_num_threads``), or None to keep the current.
+    num_interop_threads : int
+        Inter-op threads (``torch.set_num_interop_threads``), or None.
+    cpu_affinity : list[int]
+        CPUs to pin the process to, or None not to pin it.
+    confidence : float
+        Confidence level of the intervals.
+    benchmark_fn : Callable
+        Runs one pass, ``benchmark`` by default.
+    **benchmark_kwargs
+        Options of ``benchmark_fn``, e.g. ``batch_size`` or ``warmup``.
+
+    Returns
+    -------
+    dict
+        ``rtf``, ``e2e_rtf`` and ``throughput`` (mean over runs), ``rtf_ci``,
+        ``e2e_rtf_ci`` and ``throughput_ci`` (confidence intervals), ``rtfs``
+        and ``e2e_rtfs`` (RTF and end-to-end RTF of each run), ``wer`` (of the
+        first run, since transcripts do not change between runs),
+        ``num_threads``, ``num_interop_threads``, ``cpu_affinity`` (sorted
+        CPUs, or None where unsupported) and ``runs`` (results of each run).
+    """
+    previous_threads = torch.get_num_threads()
+    previous_affinity = _get_affinity()
+    if num_threads is not None:
+        torch.set_num_threads(num_threads)
+    if num_interop_threads is not None:
+        try:
+            torch.set_num_interop_threads(num_interop_threads)
+        except RuntimeError:
+            # already set, or parallel work has started: the current count
+            # is kept, and recorded below
+            pass
+    if cpu_affinity is not None:
+        os.sched_setaffinity(0, cpu_affinity)
+
+    try:
+        settings = {
+            "num_threads": torch.get_num_threads(),
+            "num_interop_threads": torch.get_num_interop_threads(),
+            "cpu_affinity": _get_affinity(),
+        }
+        runs = [
+            benchmark_fn(model, samples, references, **benchmark_kwargs)
+            for _ in range(repeats)
+        ]
+    finally:
+        torch.set_num_threads(previous_threads)
+        if cpu_affinity is not None:
+            os.sched_setaffinity(0, previous_affinity)
+
+    results = {"wer": runs[0]["wer"]}
+    for metric in ["rtf", "e2e_rtf", "throughput"]:
+        values = [run[metric] for run in runs]
+        results[metric] = float(np.mean(values))
+        results[f"{metric}_ci"] = bootstrap_ci(values, confidence)
+    results["rtfs"] = [run["rtf"] for run in runs]
+    results["e2e_rtfs"] = [run["e2e_rtf"] for run in runs]
+    results.update(settings)
+    results["runs"] = runs
+    return results
+
+
+def _get_affinity():
+    if not hasattr(os, "sched_getaffinity"):
+        return None
+    return sorted(os.sched_getaffinity(0))
+
+
+def format_repeated(results):
+    """Formats the output of ``repeated_benchmark`` as lines of text."""
+    lines = [f"WER(%): {results['wer']}"]
+    for metric, name in [
+        ("rtf", "RTF"),
+        ("e2e_rtf", "End-to-end RTF"),
+        ("throughput", "Throughput"),
+    ]:
+        lower, upper = results[f"{metric}_ci"]
+        lines.append(f"{name}: {results[metric]} (CI {lower}, {upper})")
+    lines.append(f"Runs: {len(results['runs'])}")
+    lines.append(
+        f"Threads: {results['num_threads']} intra-op, "
+        f"{results['num_interop_threads']} inter-op"
+    )
+    lines.append(f"CPU affinity: {results['cpu_affinity']}")
+    return "\n".join(lines) + "\n"
+
+
+def format_comparison(comparison):
+    """Formats the output of ``compare`` as a line of text."""
+    lower, upper = comparison["ci"]
+    verdict = "significant" if comparison["significant"] else "not significant"
+    return f"Difference: {comparison['difference']} (CI {lower}, {upper}), {verdict}\n"
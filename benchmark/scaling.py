@@ -0,0 +1,332 @@
+"""
+Measures how throughput scales with the number of threads and of model
+replicas, to decide between one model with N threads and K replicas with
+N/K threads each on a many-core host.
+"""
+
+import copy
+import os
+import pickle
+import time
+import traceback
+from multiprocessing.reduction import ForkingPickler
+from queue import Empty
+
+import torch
+import torch.multiprocessing
+import torch.nn as nn
+from torch.nn.utils import parametrize
+
+from benchmark.benchmark import benchmark
+
+# seconds between checks that the replicas are still alive
+POLL_INTERVAL = 1.0
+
+
+def _fold(module):
+    # parametrized modules, e.g. the weight-norm convolution of wav2vec2,
+    # refuse to be pickled, so replicas get a copy of the module that was
+    # parametrized, with each parametrized tensor as a plain parameter, as it
+    # would be for deployment. The copy is built rather than unparametrized,
+    # as removing a parametrization alters the class shared with the original
+    cls = type(module).__bases__[0]
+    folded = cls.__new__(cls)
+    state = dict(module.__dict__)
+    state["_modules"] = type(module._modules)(
+        (name, child)
+        for name, child in module._modules.items()
+        if name != "parametrizations"
+    )
+    folded.__dict__ = copy.deepcopy(state)
+    with torch.no_grad():
+        for name in module.parametrizations:
+            folded._parameters[name] = nn.Parameter(getattr(module, name).clone())
+    # weight norm's hook renaming the keys of old state dicts is a local
+    # function, which cannot be pickled, and no longer applies once folded
+    folded._load_state_dict_pre_hooks.clear()
+    return folded
+
+
+def _restore_module(cls, state):
+    module = cls.__new__(cls)
+    # some modules, e.g. quantized convolutions, only restore part of the
+    # attributes of nn.Module from their state
+    nn.Module.__init__(module)
+    module.__setstate__(state)
+    return module
+
+
+class _ReplicaPickler(ForkingPickler):
+    # pickles a model for the replicas, with its tensors in shared memory as
+    # by torch.multiprocessing, working around what torch cannot pickle
+
+    def reducer_override(self, obj):
+        if isinstance(obj, nn.Module) and parametrize.is_parametrized(obj):
+            folded = _fold(obj)
+            return _restore_module, (type(folded), folded.__getstate__())
+        if (
+            isinstance(obj, nn.Module)
+            and type(obj).__setstate__ is not nn.Module.__setstate__
+        ):
+            return _restore_module, (type(obj), obj.__getstate__())
+        if torch.is_tensor(obj) and obj.is_quantized:
+            # torch cannot share quantized tensors, so they are copied
+            return pickle.loads, (pickle.dumps(obj),)
+        return NotImplemented
+
+
+def _share(model):
+    # parameters and buffers are moved to shared memory, so that spawned
+    # replicas map the weights of the parent rather than copying them. The
+    # model is pickled before any replica starts, so that the shared memory
+    # of tensors made while pickling, e.g. the folded weights of
+    # parametrized modules, is held by the parent until the replica takes it over
+    model.share_memory()
+    return bytes(_ReplicaPickler.dumps(model))
+
+
+def _replica(
+    index, pickled_model, samples, references, num_threads, barrier, queue, kwargs
+):
+    try:
+        torch.set_num_threads(num_threads)
+        model = ForkingPickler.loads(pickled_model)
+        # every replica warms up before any is timed, so that no warmup
+        # competes with the timed loop of another replica
+        warmup = kwargs.pop("warmup", 10)
+        benchmark(model, samples[:warmup], references[:warmup], warmup=0, **kwargs)
+        # replicas start transcribing at the same time, so that they compete
+        # for the host as they would when serving
+        barrier.wait()
+        # wall-clock time, as it is comparable across processes
+        start = time.time()
+        result = benchmark(model, samples, references, warmup=0, **kwargs)
+        result["start"], result["end"] = start, time.time()
+        queue.put((index, result))
+    except Exception:
+        # the error is sent as text, as the exception may not be picklable
+        queue.put((index, traceback.format_exc()))
+
+
+def _collect(processes, barrier, queue, timeout=None):
+    # results of the replicas by index, raising if any of them failed,
+    # including if it was killed without a chance to report or is stuck
+    deadline = None if timeout is None else time.monotonic() + timeout
+    runs = {}
+    error = None
+    while len(runs) < len(processes) and error is None:
+        try:
+            index, result = queue.get(timeout=POLL_INTERVAL)
+        except Empty:
+            for index, process in enumerate(processes):
+                if index not in runs and process.exitcode not in (None, 0):
+                    error = f"Replica {index} exited with code {process.exitcode}"
+            if error is None and deadline is not None and time.monotonic() > deadline:
+                error = f"Replicas did not finish within {timeout}s"
+            continue
+        if isinstance(result, str):
+            error = f"Replica {index} failed:\n{result}"
+        else:
+            runs[index] = result
+    if error is not None:
+        # replicas still waiting for the others are released and stopped
+        barrier.abort()
+        for process in processes:
+            process.terminate()
+            process.join()
+        raise RuntimeError(error)
+    return runs
+
+
+def replica_benchmark(
+    model,
+    samples,
+    references,
+    num_replicas,
+    num_threads,
+    timeout=None,
+    **benchmark_kwargs,
+):
+    """Benchmarks replicas of a model running side by side.
+
+    Each replica runs in a spawned process with ``num_threads`` threads and
+    transcribes every ``num_replicas``-th sample. Replicas are spawned rather
+    than forked, as OpenMP hangs in a forked child once the parent has run
+    multi-threaded ops. The model's parameters and buffers are moved to
+    shared memory, so replicas share them rather than copying them, except
+    for quantized weights, which torch cannot share. Parametrizations, e.g.
+    weight norm, are folded into plain weights in the replicas. Every
+    replica warms up before any is timed, and a RuntimeError is raised if a
+    replica raises, is killed or does not finish within ``timeout``.
+
+    Scripts calling this must guard their code with
+    ``if __name__ == "__main__"``, as spawned processes import them.
+
+    Arguments
+    ---------
+    model : EncoderASR | EncoderDecoderASR
+        Model to be benchmarked.
+    samples : list[torch.Tensor]
+        1D audio tensors, sampled at 16kHz.
+    references : list[str]
+        Reference transcripts, in the same order as the samples.
+    num_replicas : int
+        Number of processes running the model.
+    num_threads : int
+        Intra-op threads of each replica.
+    timeout : float
+        Seconds to wait for all replicas to finish, or None to wait forever.
+    **benchmark_kwargs
+        Options of ``benchmark``, e.g. ``batch_size``.
+
+    Returns
+    -------
+    dict
+        ``replicas``, ``threads`` (per replica), ``throughput`` (seconds of
+        audio transcribed by all replicas per second, from the first replica
+        starting to the last one finishing), ``rtf`` and ``e2e_rtf`` (mean
+        over replicas), ``latency`` (``p50`` and ``p90`` wall time per batch
+        of each stage, of the slowest replica), ``wer`` (over all samples)
+        and ``runs`` (results of each replica, with the ``start`` and ``end``
+        of its timed loop).
+    """
+    context = torch.multiprocessing.get_context("spawn")
+    barrier = context.Barrier(num_replicas)
+    queue = context.Queue()
+    processes = [
+        context.Process(
+            target=_replica,
+            args=(
+                index,
+                # each replica takes over the shared memory of its own copy
+                _share(model),
+                samples[index::num_replicas],
+                references[index::num_replicas],
+                num_threads,
+                barrier,
+                queue,
+                benchmark_kwargs,
+            ),
+        )
+        for index in range(num_replicas)
+    ]
+    for process in processes:
+        process.start()
+    # results are collected before joining, as a process cannot exit until
+    # what it has put on the queue has been read
+    runs = _collect(processes, barrier, queue, timeout)
+    for process in processes:
+        process.join()
+    runs = [runs[index] for index in range(num_replicas)]
+
+    words = [
+        sum(len(reference.split()) for reference in references[index::num_replicas])
+        for index in range(num_replicas)
+    ]
+    return {
+        "replicas": num_replicas,
+        "threads": num_threads,
+        "throughput": sum(run["audio"] for run in runs)
+        / (max(run["end"] for run in runs) - min(run["start"] for run in runs)),
+        "rtf": sum(run["rtf"] for run in runs) / num_replicas,
+        "e2e_rtf": sum(run["e2e_rtf"] for run in runs) / num_replicas,
+        "latency": {
+            stage: {
+                p: max(run["stages"][stage]["wall"][p] for run in runs)
+                for p in ("p50", "p90")
+            }
+            for stage in runs[0]["stages"]
+        },
+        "wer": sum(run["wer"] * n for run, n in zip(runs, words)) / sum(words),
+        "runs": runs,
+    }
+
+
+def scaling_sweep(
+    model,
+    samples,
+    references,
+    thread_counts,
+    replica_counts,
+    max_cpus=None,
+    replica_benchmark_fn=replica_benchmark,
+    **benchmark_kwargs,
+):
+    """Benchmarks every combination of thread and replica counts.
+
+    Scaling efficiency is the throughput of a configuration relative to
+    perfect scaling from the configuration using the fewest CPUs, i.e. 1.0
+    means every added CPU adds as much throughput as the first ones did.
+
+    Arguments
+    ---------
+    model : EncoderASR | EncoderDecoderASR
+        Model to be benchmarked.
+    samples : list[torch.Tensor]
+        1D audio tensors, sampled at 16kHz.
+    references : list[str]
+        Reference transcripts, in the same order as the samples.
+    thread_counts : list[int]
+        Threads per replica.
+    replica_counts : list[int]
+        Numbers of replicas.
+    max_cpus : int
+        Configurations using more CPUs (replicas times threads) are skipped.
+        Defaults to the number of CPUs of the host.
+    replica_benchmark_fn : Callable
+        Benchmarks one configuration, ``replica_benchmark`` by default.
+    **benchmark_kwargs
+        Options of ``replica_benchmark_fn``, e.g. ``timeout``, or of
+        ``benchmark``, e.g. ``batch_size``.
+
+    Returns
+    -------
+    list[dict]
+        Results of ``replica_benchmark`` for each configuration, sorted by
+        CPUs used, with ``cpus`` and ``efficiency`` added.
+    """
+    if max_cpus is None:
+        max_cpus = os.cpu_count()
+    configs = sorted(
+        (
+            (num_replicas, num_threads)
+            for num_replicas in replica_counts
+            for num_threads in thread_counts
+            if num_replicas * num_threads <= max_cpus
+        ),
+        key=lambda config: (config[0] * config[1], config),
+    )
+    results = []
+    for num_replicas, num_threads in configs:
+        result = replica_benchmark_fn(
+            model, samples, references, num_replicas, num_threads, **benchmark_kwargs
+        )
+        result["cpus"] = num_replicas * num_threads
+        results.append(result)
+
+    if results:
+        base = results[0]
+        throughput_per_cpu = base["throughput"] / base["cpus"]
+        for result in results:
+            result["efficiency"] = result["throughput"] / (
+                throughput_per_cpu * result["cpus"]
+            )
+    return results
+
+
+def format_scaling(results):
+    """Formats the output of ``scaling_sweep`` as lines of text."""
+    lines = []
+    for result in results:
+        latency = ", ".join(
+            f"{stage}={stats['p50']:.6f}s/{stats['p90']:.6f}s"
+            for stage, stats in result["latency"].items()
+        )
+        lines.append(
+            f"{result['replicas']} replicas x {result['threads']} threads: "
+            f"Throughput: {result['throughput']}, RTF: {result['rtf']}, "
+            f"End-to-end RTF: {result['e2e_rtf']}, "
+            f"Efficiency: {result['efficiency']}, WER(%): {result['wer']}, "
+            f"Latency (p50/p90 per batch): {latency}"
+        )
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,68 @@
+from unittest.mock import MagicMock
+
+import pytest
+import torch
+
+from benchmark.benchmark import benchmark
+from benchmark.wrapper import Wrapper
+
+
+class LengthWrapper(Wrapper):
+    # transcribes each input as a single word naming its length, and records
+    # the lengths of each batch
+    def __init__(self, model):
+        super().__init__(model)
+        self.batches = []
+
+    def timed_transcribe_padded(self, wavs, wav_lens):
+        with self.timer.stage("encoder"):
+            lengths = torch.round(wav_lens * wavs.shape[1]).int().tolist()
+        self.batches.append(lengths)
+        return [f"length{length}" for length in lengths], self.timer.last("encoder")
+
+
+class TestBenchmark:
+    def test_hypotheses_are_aligned_to_references(self, monkeypatch):
+        # GIVEN
+        #      samples of unsorted lengths, and references naming them
+        model = MagicMock()
+        model.device = "cpu"
+        wrapper = LengthWrapper(model)
+        monkeypatch.setattr(
+            "benchmark.benchmark.make_wrapper", lambda model, **kwargs: wrapper
+        )
+        lengths = [300, 900, 100, 700, 500, 800, 200]
+        samples = [torch.zeros(length) for length in lengths]
+        references = [f"length{length}" for length in lengths]
+
+        # WHEN
+        #      they are benchmarked in batches of 3
+        results = benchmark(model, samples, references, batch_size=3, warmup=0)
+
+        # THEN
+        #      batches are built longest first
+        #      every hypothesis is scored against its own reference
+        assert wrapper.batches == [[900, 800, 700], [500, 300, 200], [100]]
+        assert results["wer"] == 0.0
+        assert results["audio"] == pytest.approx(sum(lengths) / 16000)
+
+    def test_misaligned_hypotheses_are_counted(self, monkeypatch):
+        # GIVEN
+        #      references in another order than the samples
+        model = MagicMock()
+        model.device = "cpu"
+        monkeypatch.setattr(
+            "benchmark.benchmark.make_wrapper",
+            lambda model, **kwargs: LengthWrapper(model),
+        )
+        lengths = [300, 900, 100]
+        samples = [torch.zeros(length) for length in lengths]
+        references = [f"length{length}" for length in reversed(lengths)]
+
+        # WHEN
+        #      they are benchmarked in batches of 3
+        results = benchmark(model, samples, references, batch_size=3, warmup=0)
+
+        # THEN
+        #      the swapped transcripts count as errors
+        assert results["wer"] == pytest.approx(200 / 3)
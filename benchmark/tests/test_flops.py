@@ -4,7 +4,13 @@ import pytest
 import torch
 from speechbrain.inference.ASR import EncoderASR
 
-from benchmark.flops import _encoder_flop_analysis, count_flops
+from benchmark.flops import (
+    FlopCache,
+    FlopModel,
+    _encoder_flop_analysis,
+    cached_encoder_flops,
+    count_flops,
+)
 
 
 class TestCountFlops:
@@ -62,3 +68,67 @@ class TestEncoderFlopAnalysis:
         flop_analyzer.assert_called_once()
         flop_object.by_module.assert_called_once()
         assert output == expected_output
+
+
+class TestCachedEncoderFlops:
+    def test_traces_only_on_cache_miss(self, tmp_path):
+        # GIVEN
+        #      an empty cache file
+        #      a flop analyzer that counts FLOPs proportional to input length
+        path = str(tmp_path / "flops.json")
+        modules = ["encoder.module1", "decoder.module2"]
+        model = MagicMock(spec=EncoderASR)
+        model.mods = MagicMock()
+        load_model = MagicMock(return_value=model)
+
+        def flop_analyzer(encoder, inputs):
+            flop_object = MagicMock()
+            flop_object.by_module.return_value = {"module1": inputs[0].shape[1] * 2}
+            return flop_object
+
+        # WHEN
+        #      FLOPs are counted twice for the same length, with the cache reloaded
+        first = cached_encoder_flops(
+            load_model, "src", modules, 1600, FlopCache(path), flop_analyzer
+        )
+        second = cached_encoder_flops(
+            load_model, "src", modules, 1600, FlopCache(path), flop_analyzer
+        )
+
+        # THEN
+        #      only encoder modules are counted
+        #      the model is only loaded and traced for the first call
+        assert first == second == {"encoder.module1": 3200}
+        load_model.assert_called_once()
+
+    def test_key_depends_on_source_modules_and_length(self):
+        # GIVEN
+        #      a key
+        key = FlopCache.key("src", ["a", "b"], 1600)
+
+        # WHEN
+        #      keys are computed from other sources, module sets and lengths
+        # THEN
+        #      they differ, but not when only the module order differs
+        assert key == FlopCache.key("src", ["b", "a"], 1600)
+        assert key != FlopCache.key("other", ["a", "b"], 1600)
+        assert key != FlopCache.key("src", ["a"], 1600)
+        assert key != FlopCache.key("src", ["a", "b"], 3200)
+
+
+class TestFlopModel:
+    def test_fit_linear_and_quadratic_terms(self):
+        # GIVEN
+        #      FLOPs of a module growing linearly and one growing quadratically
+        durations = [1, 2, 4]
+        flops = [{"linear": 10 * d, "attention": 3 * d + 2 * d**2} for d in durations]
+
+        # WHEN
+        #      the FLOPs are fitted
+        flop_model = FlopModel.fit(durations, flops)
+
+        # THEN
+        #      FLOPs and FLOPs per second are predicted for unseen lengths
+        assert flop_model.predict(10)["linear"] == pytest.approx(100)
+        assert flop_model.predict(10)["attention"] == pytest.approx(230)
+        assert flop_model.per_second(10)["attention"] == pytest.approx(23)
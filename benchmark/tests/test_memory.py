@@ -0,0 +1,109 @@
+from unittest.mock import MagicMock
+
+import pytest
+import torch
+import torch.nn as nn
+
+from benchmark import memory
+from benchmark.memory import PeakRSS, memory_by_dtype, projected_low_bit_size
+
+
+class TestMemoryByDtype:
+    def test_parameters_and_buffers(self):
+        # GIVEN
+        #      a module with float32 parameters and int64 buffers
+        module = nn.Sequential(nn.Linear(4, 8), nn.BatchNorm1d(8))
+
+        # WHEN
+        #      the memory is counted
+        sizes = memory_by_dtype(module)
+
+        # THEN
+        #      weights, biases, running stats and the batch counter are counted
+        assert sizes == {"torch.float32": (32 + 8 + 4 * 8) * 4, "torch.int64": 8}
+
+    def test_shared_tensors_are_counted_once(self):
+        # GIVEN
+        #      two layers sharing a weight
+        module = nn.Sequential(nn.Linear(4, 4, bias=False), nn.Linear(4, 4, bias=False))
+        module[1].weight = module[0].weight
+
+        # WHEN
+        #      the memory is counted
+        sizes = memory_by_dtype(module)
+
+        # THEN
+        #      the weight is only counted once
+        assert sizes == {"torch.float32": 16 * 4}
+
+    def test_packed_quantized_weights(self):
+        # GIVEN
+        #      a dynamically quantized Linear and LSTM, whose weights are packed
+        module = nn.Sequential(nn.Linear(8, 8), nn.LSTM(8, 8))
+        quantized = torch.ao.quantization.quantize_dynamic(module, {nn.Linear, nn.LSTM})
+
+        # WHEN
+        #      the memory is counted
+        sizes = memory_by_dtype(quantized)
+
+        # THEN
+        #      every weight is counted as one byte per element
+        assert sizes["torch.qint8"] == 8 * 8 + 2 * (4 * 8) * 8
+
+
+class TestProjectedLowBitSize:
+    def test_weights_are_counted_at_low_bit_width(self):
+        # GIVEN
+        #      a model whose encoder has a Linear layer of 64 weights
+        model = MagicMock()
+        model.mods = nn.ModuleDict(
+            {"encoder": nn.Sequential(nn.Linear(8, 8)), "decoder": nn.Linear(8, 8)}
+        )
+
+        # WHEN
+        #      the size of the encoder in 4 bits is projected
+        projected = projected_low_bit_size(model, {"encoder": 4})
+
+        # THEN
+        #      the weights take 32 bytes plus 8 for the scale and zero point
+        #      the bias and the decoder keep their size
+        assert projected["modules"]["encoder"] == 32 + 8 + 8 * 4
+        assert projected["total"] == 32 + 8 + 8 * 4 + (64 + 8) * 4
+
+
+class TestPeakRSS:
+    def test_records_peak(self):
+        # GIVEN
+        #      a monitor
+        monitor = PeakRSS(interval=0.001)
+
+        # WHEN
+        #      memory is allocated while it is running
+        with monitor:
+            buffer = torch.ones(2**22)
+            del buffer
+
+        # THEN
+        #      a peak of at least the allocated size is recorded
+        assert monitor.peak >= 2**24
+
+    @pytest.mark.parametrize(
+        "platform, peak", [("linux", 2048 * 1024), ("darwin", 2048)]
+    )
+    def test_without_proc(self, monkeypatch, platform, peak):
+        # GIVEN
+        #      a platform without /proc, whose peak RSS since the start of the
+        #      process is 2048 units of ru_maxrss
+        monkeypatch.setattr(memory, "current_rss", lambda: None)
+        monkeypatch.setattr(memory.sys, "platform", platform)
+        usage = MagicMock(ru_maxrss=2048)
+        monkeypatch.setattr(memory.resource, "getrusage", lambda who: usage)
+
+        # WHEN
+        #      the monitor is used
+        with PeakRSS() as monitor:
+            pass
+
+        # THEN
+        #      the peak is in bytes, whichever unit ru_maxrss is in
+        assert monitor.peak == peak
@@ -0,0 +1,100 @@
+import itertools
+from unittest.mock import MagicMock
+
+import pytest
+import torch
+import torch.nn as nn
+
+from benchmark.profiler import ModuleProfiler
+
+
+class StepDecoder(nn.Module):
+    # decoder that is run one step at a time, like SpeechBrain's RNN decoders
+    def __init__(self):
+        super().__init__()
+        self.linear = nn.Linear(2, 2)
+
+    def forward_step(self, x):
+        return self.linear(x)
+
+
+def make_model():
+    model = MagicMock()
+    model.mods = nn.ModuleDict(
+        {
+            "encoder": nn.Sequential(nn.Linear(2, 2), nn.ReLU()),
+            "layers": nn.ModuleList([nn.Linear(2, 2), nn.Linear(2, 2)]),
+            "decoder": StepDecoder(),
+        }
+    )
+    return model
+
+
+class TestModuleProfiler:
+    def test_times_modules(self):
+        # GIVEN
+        #      a clock that advances by one second every time it is read
+        #      modules including a ModuleList and a step-wise decoder
+        model = make_model()
+        modules = ["encoder", "encoder.0", "layers", "decoder"]
+        profiler = ModuleProfiler(model, modules, clock=itertools.count().__next__)
+        x = torch.ones(1, 2)
+
+        # WHEN
+        #      the modules are run while the profiler is attached
+        with profiler:
+            model.mods.encoder(x)
+            for layer in model.mods.layers:
+                layer(x)
+            for _ in range(3):
+                model.mods.decoder.forward_step(x)
+
+        # THEN
+        #      each call is counted, with the time between its pre and post hooks
+        #      the ModuleList is timed as the sum of its elements
+        #      forward_step calls are timed
+        assert profiler.calls == {
+            "encoder": 1,
+            "encoder.0": 1,
+            "layers": 2,
+            "decoder": 3,
+        }
+        assert profiler.times["encoder"] == pytest.approx(3.0)
+        assert profiler.times["encoder.0"] == pytest.approx(1.0)
+        assert profiler.times["layers"] == pytest.approx(2.0)
+        assert profiler.times["decoder"] == pytest.approx(3.0)
+
+    def test_detach(self):
+        # GIVEN
+        #      a profiler that has been attached and detached
+        model = make_model()
+        profiler = ModuleProfiler(model, ["encoder", "decoder"])
+        with profiler:
+            pass
+
+        # WHEN
+        #      the modules are run
+        model.mods.encoder(torch.ones(1, 2))
+        model.mods.decoder.forward_step(torch.ones(1, 2))
+
+        # THEN
+        #      nothing is recorded, and the decoder is restored
+        assert profiler.calls == {"encoder": 0, "decoder": 0}
+        assert "forward_step" not in model.mods.decoder.__dict__
+
+    def test_table_is_ranked(self):
+        # GIVEN
+        #      times have been recorded for several modules
+        profiler = ModuleProfiler(make_model(), ["encoder", "layers", "decoder"])
+        profiler.times = {"encoder": 1.0, "layers": 4.0, "decoder": 2.0}
+        profiler.calls = {"encoder": 1, "layers": 2, "decoder": 3}
+
+        # WHEN
+        #      the table is computed for 2 seconds of audio
+        table = profiler.table(audio_length=2.0, total_time=8.0)
+
+        # THEN
+        #      modules are ranked by time, normalized by audio length
+        assert [row["module"] for row in table] == ["layers", "decoder", "encoder"]
+        assert table[0]["time_per_second"] == pytest.approx(2.0)
+        assert table[0]["share"] == pytest.approx(0.5)
@@ -0,0 +1,89 @@
+from unittest.mock import MagicMock
+
+import pytest
+import torch
+
+from benchmark.runner import bootstrap_ci, compare, repeated_benchmark
+
+
+class TestBootstrapCI:
+    def test_interval_contains_mean(self):
+        # GIVEN
+        #      noisy measurements
+        values = [1.0, 1.2, 0.9, 1.1, 1.05]
+
+        # WHEN
+        #      the confidence interval is computed
+        lower, upper = bootstrap_ci(values)
+
+        # THEN
+        #      it contains the mean and lies within the range of the values
+        assert 0.9 <= lower <= sum(values) / len(values) <= upper <= 1.2
+
+    def test_constant_values(self):
+        # GIVEN
+        #      measurements without noise
+        # WHEN
+        #      the confidence interval is computed
+        # THEN
+        #      it is a single point
+        assert bootstrap_ci([2.0, 2.0, 2.0]) == (2.0, 2.0)
+
+
+class TestCompare:
+    @pytest.mark.parametrize(
+        "candidate,significant",
+        [([0.5, 0.52, 0.49, 0.51], True), ([1.1, 0.9, 1.05, 0.95], False)],
+    )
+    def test_significance(self, candidate, significant):
+        # GIVEN
+        #      baseline measurements around 1.0
+        baseline = [1.0, 1.1, 0.9, 1.0]
+
+        # WHEN
+        #      a candidate is compared against the baseline
+        comparison = compare(baseline, candidate)
+
+        # THEN
+        #      only a clear difference is significant
+        assert comparison["significant"] == significant
+        lower, upper = comparison["ci"]
+        assert lower <= comparison["difference"] <= upper
+
+
+class TestRepeatedBenchmark:
+    def test_runs_and_restores_threads(self):
+        # GIVEN
+        #      a benchmark whose RTF differs between runs
+        benchmark_fn = MagicMock(
+            side_effect=[
+                {"wer": 10.0, "rtf": rtf, "e2e_rtf": 2 * rtf, "throughput": 1 / rtf}
+                for rtf in [0.1, 0.2, 0.3]
+            ]
+        )
+        previous_threads = torch.get_num_threads()
+
+        # WHEN
+        #      it is repeated with one thread
+        results = repeated_benchmark(
+            MagicMock(),
+            [],
+            [],
+            repeats=3,
+            num_threads=1,
+            benchmark_fn=benchmark_fn,
+            batch_size=4,
+        )
+
+        # THEN
+        #      each run is benchmarked with the given options
+        #      the mean RTF and thread count are reported
+        #      the previous thread count is restored
+        assert benchmark_fn.call_count == 3
+        assert benchmark_fn.call_args.kwargs == {"batch_size": 4}
+        assert results["rtfs"] == [0.1, 0.2, 0.3]
+        assert results["e2e_rtfs"] == [0.2, 0.4, 0.6]
+        assert results["rtf"] == pytest.approx(0.2)
+        assert results["rtf_ci"][0] <= 0.2 <= results["rtf_ci"][1]
+        assert results["num_threads"] == 1
+        assert torch.get_num_threads() == previous_threads
@@ -0,0 +1,209 @@
+import os
+import time
+from unittest.mock import MagicMock
+
+import pytest
+import torch
+import torch.nn as nn
+
+from benchmark.benchmark import make_wrapper
+from benchmark.scaling import replica_benchmark, scaling_sweep
+from config.config import ModelConfig
+
+
+def random_audio(num_samples, seconds=1.0):
+    generator = torch.Generator().manual_seed(0)
+    return [
+        0.1 * torch.randn(int(seconds * 16000), generator=generator)
+        for _ in range(num_samples)
+    ]
+
+
+class Crash(nn.Module):
+    # a model whose unpickling kills the replica, as if it was OOM-killed
+    def __reduce__(self):
+        return os._exit, (9,)
+
+
+class Hang(nn.Module):
+    # a model whose unpickling leaves the replica stuck
+    def __reduce__(self):
+        return time.sleep, (600,)
+
+
+@pytest.fixture(scope="module")
+def tiny_model():
+    # a tiny wav2vec2, with the weight-norm convolution of the real one,
+    # and its own transcripts of 4 one-second samples
+    model = ModelConfig.tiny_wav2vec2().load()
+    model.eval()
+    samples = random_audio(4)
+    wrapper = make_wrapper(model)
+    return model, samples, [wrapper(sample) for sample in samples]
+
+
+class TestReplicaBenchmark:
+    def test_two_replicas(self, tiny_model):
+        # GIVEN
+        #      a tiny model, and its own transcripts of 4 one-second samples
+        model, samples, references = tiny_model
+
+        # WHEN
+        #      2 replicas of 1 thread each transcribe them
+        result = replica_benchmark(
+            model, samples, references, num_replicas=2, num_threads=1, warmup=1
+        )
+
+        # THEN
+        #      each replica transcribed half of the audio
+        #      the replicas transcribe as the model does
+        #      throughput is all of the audio over the span of the replicas
+        #      latency of each stage is reported
+        #      the model is left as it was
+        runs = result["runs"]
+        assert (result["replicas"], result["threads"]) == (2, 1)
+        assert [run["audio"] for run in runs] == [pytest.approx(2.0)] * 2
+        assert result["wer"] == 0
+        span = max(run["end"] for run in runs) - min(run["start"] for run in runs)
+        assert result["throughput"] == pytest.approx(4.0 / span)
+        assert set(result["latency"]) == set(runs[0]["stages"])
+        for stage, latency in result["latency"].items():
+            assert latency["p50"] <= latency["p90"]
+            assert latency["p90"] == max(
+                run["stages"][stage]["wall"]["p90"] for run in runs
+            )
+        assert make_wrapper(model)(samples[0]) == references[0]
+
+    def test_threads_after_multithreaded_parent(self, tiny_model):
+        # GIVEN
+        #      a parent process that has run a multi-threaded op
+        model, samples, references = tiny_model
+        previous_threads = torch.get_num_threads()
+        torch.set_num_threads(4)
+        try:
+            torch.ones(512, 512) @ torch.ones(512, 512)
+
+            # WHEN
+            #      a replica of 2 threads transcribes the samples
+            result = replica_benchmark(
+                model,
+                samples,
+                references,
+                num_replicas=1,
+                num_threads=2,
+                warmup=1,
+                timeout=120,
+            )
+        finally:
+            torch.set_num_threads(previous_threads)
+
+        # THEN
+        #      the replica finishes instead of hanging
+        assert result["threads"] == 2
+        assert result["runs"][0]["audio"] == pytest.approx(4.0)
+
+    def test_failing_replica_raises(self):
+        # GIVEN
+        #      a model that no replica can benchmark
+        model = nn.Linear(1, 1)
+
+        # WHEN
+        #      2 replicas are benchmarked
+        # THEN
+        #      the error of the replicas is raised instead of hanging
+        with pytest.raises(RuntimeError, match="NotImplementedError"):
+            replica_benchmark(
+                model, random_audio(2), ["a", "b"], num_replicas=2, num_threads=1
+            )
+
+    def test_killed_replica_raises(self):
+        # GIVEN
+        #      replicas that die without reporting
+        model = Crash()
+
+        # WHEN
+        #      2 replicas are benchmarked
+        # THEN
+        #      their exit code is raised instead of hanging
+        with pytest.raises(RuntimeError, match="exited with code 9"):
+            replica_benchmark(
+                model, random_audio(2), ["a", "b"], num_replicas=2, num_threads=1
+            )
+
+    def test_stuck_replica_times_out(self):
+        # GIVEN
+        #      replicas that never finish
+        model = Hang()
+
+        # WHEN
+        #      2 replicas are benchmarked with a timeout
+        # THEN
+        #      the timeout is raised instead of hanging
+        with pytest.raises(RuntimeError, match="did not finish within 1s"):
+            replica_benchmark(
+                model,
+                random_audio(2),
+                ["a", "b"],
+                num_replicas=2,
+                num_threads=1,
+                timeout=1,
+            )
+
+
+class TestScalingSweep:
+    def test_efficiency_relative_to_fewest_cpus(self):
+        # GIVEN
+        #      throughput grows with replicas but not with threads
+        def replica_benchmark_fn(
+            model, samples, references, num_replicas, num_threads, **kwargs
+        ):
+            return {"throughput": 10.0 * num_replicas}
+
+        # WHEN
+        #      thread and replica counts are swept on 4 CPUs
+        results = scaling_sweep(
+            MagicMock(),
+            [],
+            [],
+            thread_counts=[1, 2, 4],
+            replica_counts=[1, 2, 4],
+            max_cpus=4,
+            replica_benchmark_fn=replica_benchmark_fn,
+        )
+
+        # THEN
+        #      configurations using more than 4 CPUs are skipped
+        #      configurations are sorted by CPUs used
+        #      efficiency is relative to perfect scaling from 1 CPU
+        assert [(r["cpus"], r["efficiency"]) for r in results] == [
+            (1, pytest.approx(1.0)),
+            (2, pytest.approx(0.5)),
+            (2, pytest.approx(1.0)),
+            (4, pytest.approx(0.25)),
+            (4, pytest.approx(0.5)),
+            (4, pytest.approx(1.0)),
+        ]
+
+    def test_benchmark_options_are_passed_on(self):
+        # GIVEN
+        #      a replica benchmark
+        replica_benchmark_fn = MagicMock(return_value={"throughput": 1.0})
+
+        # WHEN
+        #      a single configuration is swept with a batch size
+        scaling_sweep(
+            MagicMock(),
+            [],
+            [],
+            thread_counts=[2],
+            replica_counts=[3],
+            max_cpus=8,
+            replica_benchmark_fn=replica_benchmark_fn,
+            batch_size=4,
+        )
+
+        # THEN
+        #      the configuration and batch size are passed on
+        replica_benchmark_fn.assert_called_once()
+        assert replica_benchmark_fn.call_args.args[3:] == (3, 2)
+        assert replica_benchmark_fn.call_args.kwargs == {"batch_size": 4}
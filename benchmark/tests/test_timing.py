@@ -0,0 +1,77 @@
+from unittest.mock import MagicMock
+
+import pytest
+
+from benchmark.timing import StageTimer
+
+
+class TestStageTimer:
+    def test_stage_records_wall_and_cpu_time(self):
+        # GIVEN
+        #      wall and cpu clocks advance by known amounts
+        wall_clock = MagicMock(side_effect=[1.0, 3.5])
+        cpu_clock = MagicMock(side_effect=[10.0, 14.0])
+        timer = StageTimer(wall_clock=wall_clock, cpu_clock=cpu_clock)
+
+        # WHEN
+        #      a stage is timed
+        with timer.stage("encoder"):
+            pass
+
+        # THEN
+        #      both the wall and cpu durations are recorded for the stage
+        assert timer.stages() == ["encoder"]
+        assert timer.last("encoder") == pytest.approx(2.5)
+        assert timer.total("encoder") == pytest.approx(2.5)
+        assert timer.total("encoder", cpu=True) == pytest.approx(4.0)
+
+    def test_stage_records_time_when_exception_is_raised(self):
+        # GIVEN
+        #      the timed code raises an exception
+        wall_clock = MagicMock(side_effect=[0.0, 1.0])
+        cpu_clock = MagicMock(side_effect=[0.0, 1.0])
+        timer = StageTimer(wall_clock=wall_clock, cpu_clock=cpu_clock)
+
+        # WHEN
+        #      a stage is timed
+        with pytest.raises(RuntimeError):
+            with timer.stage("decoder"):
+                raise RuntimeError
+
+        # THEN
+        #      the exception propagates and the time is still recorded
+        assert timer.last("decoder") == pytest.approx(1.0)
+
+    def test_summary_percentiles(self):
+        # GIVEN
+        #      a stage has been run with durations 1, 2, ..., 100
+        timer = StageTimer()
+        timer.wall_times["encoder"] = [float(i) for i in range(1, 101)]
+        timer.cpu_times["encoder"] = [2.0 * i for i in range(1, 101)]
+
+        # WHEN
+        #      the summary is computed
+        summary = timer.summary(percentiles=(50, 90))
+
+        # THEN
+        #      percentiles and totals are reported for both clocks
+        assert summary["encoder"]["wall"]["p50"] == pytest.approx(50.5)
+        assert summary["encoder"]["wall"]["p90"] == pytest.approx(90.1)
+        assert summary["encoder"]["wall"]["total"] == pytest.approx(5050.0)
+        assert summary["encoder"]["cpu"]["p50"] == pytest.approx(101.0)
+
+    def test_reset(self):
+        # GIVEN
+        #      stages have been timed
+        timer = StageTimer()
+        with timer.stage("preprocess"):
+            pass
+
+        # WHEN
+        #      the timer is reset
+        timer.reset()
+
+        # THEN
+        #      no stages remain
+        assert timer.stages() == []
+        assert timer.summary() == {}
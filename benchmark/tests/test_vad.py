@@ -0,0 +1,128 @@
+from unittest.mock import MagicMock
+
+import pytest
+import torch
+
+from benchmark.vad import EnergyVAD
+from benchmark.wrapper import EncoderASRWrapper
+
+
+def tone(seconds, amplitude=0.5):
+    t = torch.arange(int(seconds * 16000)) / 16000
+    return amplitude * torch.sin(2 * torch.pi * 440 * t)
+
+
+def silence(seconds):
+    return torch.zeros(int(seconds * 16000))
+
+
+class TestEnergyVAD:
+    def test_speech_regions_are_found(self):
+        # GIVEN
+        #      two bursts of 1s separated and surrounded by 2s of silence
+        wav = torch.cat([silence(2), tone(1), silence(2), tone(1), silence(2)])
+        vad = EnergyVAD(padding=0.0)
+
+        # WHEN
+        #      the speech regions are found
+        regions = vad(wav)
+
+        # THEN
+        #      each burst is a region, to within a frame
+        assert len(regions) == 2
+        for (start, end), expected in zip(regions, [(32000, 48000), (80000, 96000)]):
+            assert start == pytest.approx(expected[0], abs=400)
+            assert end == pytest.approx(expected[1], abs=400)
+
+    def test_short_gaps_are_bridged_and_short_bursts_dropped(self):
+        # GIVEN
+        #      two bursts separated by 0.1s of silence, and a 0.05s click
+        wav = torch.cat(
+            [tone(1), silence(0.1), tone(1), silence(2), tone(0.05), silence(1)]
+        )
+        vad = EnergyVAD(min_speech=0.25, min_silence=0.5, padding=0.1)
+
+        # WHEN
+        #      the speech regions are found
+        regions = vad(wav)
+
+        # THEN
+        #      the bursts form a single padded region, and the click is dropped
+        assert len(regions) == 1
+        start, end = regions[0]
+        assert start == 0
+        assert end == pytest.approx(int(2.1 * 16000) + 1600, abs=400)
+
+    def test_silence_has_no_regions(self):
+        # GIVEN
+        #      quiet noise only, with one loud sample
+        wav = 1e-4 * torch.randn(32000)
+        wav[16000] = 1.0
+
+        # WHEN
+        #      the speech regions are found
+        regions = EnergyVAD()(wav)
+
+        # THEN
+        #      the single loud frame is too short to be speech
+        assert regions == []
+
+    @pytest.mark.parametrize(
+        "wav", [silence(2), 1e-4 * torch.randn(32000)], ids=["zeros", "faint noise"]
+    )
+    def test_silent_input_has_no_regions(self, wav):
+        # GIVEN
+        #      an utterance without speech, whose frames are all within the
+        #      relative threshold of the loudest one
+
+        # WHEN
+        #      the speech regions are found
+        regions = EnergyVAD()(wav)
+
+        # THEN
+        #      no frame is above the absolute floor, so there are no regions
+        assert regions == []
+
+    def test_pcm_audio(self):
+        # GIVEN
+        #      a burst of 16-bit PCM audio surrounded by silence
+        wav = torch.cat([silence(1), tone(1), silence(1)])
+        pcm = torch.round(wav * 32767).to(torch.int16)
+        vad = EnergyVAD(padding=0.0)
+
+        # WHEN
+        #      the speech regions are found
+        regions = vad(pcm)
+
+        # THEN
+        #      they are those of the float audio
+        assert regions == vad(wav)
+
+
+class TestSpeechOnlyTranscription:
+    def test_transcripts_are_reassembled_in_order(self):
+        # GIVEN
+        #      a VAD that finds two regions in the first input and none in the
+        #      second, and a model that transcribes each region as its first value
+        vad = MagicMock(side_effect=[[(0, 2), (4, 6)], []])
+        model = MagicMock()
+        model.device = "cpu"
+        wrapper = EncoderASRWrapper(model, vad=vad)
+        wrapper.encode = MagicMock(side_effect=lambda wavs, wav_lens: (wavs, wav_lens))
+        wrapper.generate = MagicMock(
+            side_effect=lambda predictions: [str(int(p[0])) for p in predictions]
+        )
+        model.decoding_function = MagicMock(side_effect=lambda out, lens: out)
+        inputs = [torch.arange(8, dtype=torch.float), torch.zeros(8)]
+
+        # WHEN
+        #      the batch is transcribed
+        words, _ = wrapper.timed_transcribe_batch(inputs)
+
+        # THEN
+        #      the regions of all inputs are encoded together
+        #      each input's transcripts are joined in order
+        #      only the speech regions count as encoded audio
+        assert wrapper.encode.call_count == 1
+        assert words == ["0 4", ""]
+        assert wrapper.encoded_seconds == pytest.approx(4 / 16000)
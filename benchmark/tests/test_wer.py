@@ -1,6 +1,13 @@
+import numpy as np
 import pytest
 
-from benchmark.wer import compute_wer
+from benchmark.wer import (
+    StreamingWER,
+    compute_wer,
+    edit_operations,
+    levenshtein,
+    wer_details,
+)
 
 
 class TestWER:
@@ -61,3 +68,151 @@ class TestWER:
         #          and the lcoal levenshtein version
         #          return the same result
         assert wer == pytest.approx(expected_wer)
+
+
+class TestEditOperations:
+    @pytest.mark.parametrize(
+        "reference,hypothesis,expected",
+        [
+            ([], [], [0, 0, 0]),
+            (["a"], [], [0, 0, 1]),
+            ([], ["a", "b"], [0, 2, 0]),
+            (["a", "b", "c"], ["a", "x", "c"], [1, 0, 0]),
+            (["a", "b", "c"], ["a", "c"], [0, 0, 1]),
+            (["a", "c"], ["a", "b", "c"], [0, 1, 0]),
+            (["a", "b", "c", "d"], ["x", "a", "b", "d"], [0, 1, 1]),
+        ],
+    )
+    def test_single_pair(self, reference, hypothesis, expected):
+        # GIVEN
+        #      a single pair of reference and hypothesis token sequences
+        # WHEN
+        #      the edit operations are counted
+        ops = edit_operations([reference], [hypothesis])
+
+        # THEN
+        #      the substitutions, insertions and deletions are correct
+        assert ops.tolist() == [expected]
+
+    @pytest.mark.parametrize("processes,max_cells", [(1, 50), (1, 2**21), (2, 50)])
+    def test_matches_levenshtein(self, processes, max_cells):
+        # GIVEN
+        #      many pairs of random sequences of different lengths
+        #      which are split into several batches
+        rng = np.random.default_rng(0)
+        references = [list(rng.integers(0, 5, rng.integers(0, 12))) for _ in range(50)]
+        hypotheses = [list(rng.integers(0, 5, rng.integers(0, 12))) for _ in range(50)]
+
+        # WHEN
+        #      the edit operations are counted
+        ops = edit_operations(references, hypotheses, processes, max_cells)
+
+        # THEN
+        #      the number of edits of each pair is the levenshtein distance
+        #      the edits turn the reference length into the hypothesis length
+        for k, (reference, hypothesis) in enumerate(zip(references, hypotheses)):
+            substitutions, insertions, deletions = ops[k]
+            assert substitutions + insertions + deletions == levenshtein(
+                reference, hypothesis
+            )
+            assert len(reference) - deletions + insertions == len(hypothesis)
+
+
+class TestWERDetails:
+    def test_wer_details(self):
+        # GIVEN
+        #      references and hypotheses with a substitution,
+        #      an insertion and a deletion
+        references = ["the cat sat", "on the mat"]
+        hypotheses = ["the bat sat down", "on mat"]
+
+        # WHEN
+        #      the detailed statistics are computed
+        details = wer_details(references, hypotheses)
+
+        # THEN
+        #      the error counts, WER and CER are correct
+        #      the WER agrees with compute_wer
+        assert details["substitutions"] == 1
+        assert details["insertions"] == 1
+        assert details["deletions"] == 1
+        assert details["num_ref_words"] == 6
+        assert details["num_ref_chars"] == 21
+        assert details["WER"] == pytest.approx(50.0)
+        assert details["WER"] == pytest.approx(compute_wer(references, hypotheses))
+        assert details["CER"] == pytest.approx(10 / 21 * 100)
+
+
+class TestStreamingWER:
+    def test_matches_compute_wer(self):
+        # GIVEN
+        #      pairs of references and hypotheses
+        references = ["both of these are lists", "this reference is a list", "a b"]
+        hypotheses = ["this is a list too", "hypothesis", "a b c"]
+
+        # WHEN
+        #      the pairs are added one at a time and as a batch
+        scorer = StreamingWER()
+        for reference, hypothesis in zip(references, hypotheses):
+            scorer.update(reference, hypothesis)
+        batch_scorer = StreamingWER()
+        batch_scorer.update_batch(references, hypotheses)
+
+        # THEN
+        #      both give the same WER as computing it at the end
+        expected_wer = compute_wer(references, hypotheses)
+        assert scorer.wer() == pytest.approx(expected_wer)
+        assert batch_scorer.wer() == pytest.approx(expected_wer)
+        assert scorer.num_utterances == 3
+        assert scorer.num_ref_words == 12
+
+    def test_merge(self):
+        # GIVEN
+        #      two scorers of separate shards of a corpus
+        references = ["the cat sat", "on the mat"]
+        hypotheses = ["the bat sat down", "on mat"]
+        first = StreamingWER()
+        first.update(references[0], hypotheses[0])
+        second = StreamingWER()
+        second.update(references[1], hypotheses[1])
+
+        # WHEN
+        #      the scorers are merged
+        merged = first.merge(second)
+
+        # THEN
+        #      the result is the same as scoring the whole corpus
+        assert merged.stats() == {
+            "WER": pytest.approx(50.0),
+            "substitutions": 1,
+            "insertions": 1,
+            "deletions": 1,
+            "num_ref_words": 6,
+            "num_utterances": 2,
+        }
+
+    def test_empty_scorer(self):
+        # GIVEN
+        #      no pairs have been added
+        scorer = StreamingWER()
+
+        # WHEN
+        #      the running WER is read
+        # THEN
+        #      it is zero
+        assert scorer.wer() == 0.0
+
+    def test_lower_bound(self):
+        # GIVEN
+        #      part of a corpus of 10 reference words has been scored
+        scorer = StreamingWER()
+        scorer.update("a b", "c d")
+
+        # WHEN
+        #      the lower bound of the final WER is computed
+        bound = scorer.lower_bound(total_ref_words=10)
+
+        # THEN
+        #      it assumes every remaining word is correct
+        assert bound == pytest.approx(20.0)
+        assert scorer.wer() == pytest.approx(100.0)
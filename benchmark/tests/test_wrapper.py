@@ -0,0 +1,76 @@
+from unittest.mock import MagicMock
+
+import pytest
+import torch
+
+from benchmark.wrapper import EncoderASRWrapper
+
+
+def frame_per_sample_model():
+    # encoder that outputs one "frame" per input sample, holding its value
+    model = MagicMock()
+    model.device = "cpu"
+    model.mods.encoder = MagicMock(side_effect=lambda wavs, wav_lens: wavs[..., None])
+    return model
+
+
+class TestChunkedEncoding:
+    @pytest.mark.parametrize(
+        "length,chunk_batch_size", [(16000, 1), (40000, 1), (40000, 2), (48001, 3)]
+    )
+    def test_chunks_are_stitched_in_order(self, length, chunk_batch_size):
+        # GIVEN
+        #      an encoder whose output frames map one-to-one to input samples
+        #      chunks of 1s starting every 0.75s
+        model = frame_per_sample_model()
+        wrapper = EncoderASRWrapper(
+            model,
+            chunk_window=1.0,
+            chunk_stride=0.75,
+            chunk_batch_size=chunk_batch_size,
+        )
+        wav = torch.arange(length, dtype=torch.float)
+
+        # WHEN
+        #      the waveform is encoded in chunks
+        output = wrapper.encode_chunked(wav)
+
+        # THEN
+        #      every frame appears exactly once, in order
+        #      the encoder never sees more than a window per chunk
+        assert torch.equal(output[:, 0], wav)
+        for call in model.mods.encoder.call_args_list:
+            chunks = call.args[0]
+            assert chunks.shape[0] <= chunk_batch_size
+            assert chunks.shape[1] <= 16000
+
+    def test_batch_of_utterances(self):
+        # GIVEN
+        #      a padded batch of two utterances of different lengths
+        model = frame_per_sample_model()
+        wrapper = EncoderASRWrapper(model, chunk_window=1.0, chunk_stride=0.5)
+        long_wav = torch.arange(40000, dtype=torch.float)
+        short_wav = torch.arange(10000, dtype=torch.float)
+        wavs, wav_lens = wrapper.preprocess_batch([long_wav, short_wav])
+
+        # WHEN
+        #      the batch is encoded
+        encoder_out, out_lens = wrapper.encode(wavs, wav_lens)
+
+        # THEN
+        #      each utterance's frames are stitched and padded into a batch
+        #      relative lengths are those of the stitched outputs
+        assert encoder_out.shape == (2, 40000, 1)
+        assert torch.equal(encoder_out[0, :, 0], long_wav)
+        assert torch.equal(encoder_out[1, :10000, 0], short_wav)
+        assert out_lens.tolist() == pytest.approx([1.0, 0.25])
+
+    def test_invalid_stride(self):
+        # GIVEN
+        #      a stride longer than the window, which would skip audio
+        # WHEN
+        #      the wrapper is created
+        # THEN
+        #      a ValueError is raised
+        with pytest.raises(ValueError):
+            EncoderASRWrapper(MagicMock(), chunk_window=1.0, chunk_stride=2.0)
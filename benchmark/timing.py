@@ -0,0 +1,84 @@
+"""
+Timing of the separate stages of inference (preprocessing, encoder, decoder,
+tokenizer), recording both wall-clock and CPU time, with percentile statistics.
+"""
+
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class StageTimer:
+    """Records the wall-clock and CPU time of every run of each named stage.
+
+    Wall time uses a monotonic high resolution clock, CPU time is summed
+    across all threads of the process, so it can exceed the wall time when
+    torch runs intra-op parallelism.
+
+    Arguments
+    ---------
+    wall_clock : Callable[[], float]
+        Clock used for wall time, in seconds.
+    cpu_clock : Callable[[], float]
+        Clock used for CPU time, in seconds.
+    """
+
+    def __init__(self, wall_clock=time.perf_counter, cpu_clock=time.process_time):
+        self.wall_clock = wall_clock
+        self.cpu_clock = cpu_clock
+        self.wall_times = defaultdict(list)
+        self.cpu_times = defaultdict(list)
+
+    @contextmanager
+    def stage(self, name):
+        wall_start = self.wall_clock()
+        cpu_start = self.cpu_clock()
+        try:
+            yield
+        finally:
+            self.cpu_times[name].append(self.cpu_clock() - cpu_start)
+            self.wall_times[name].append(self.wall_clock() - wall_start)
+
+    def reset(self):
+        self.wall_times.clear()
+        self.cpu_times.clear()
+
+    def stages(self):
+        return list(self.wall_times.keys())
+
+    def last(self, name):
+        return self.wall_times[name][-1]
+
+    def total(self, name, cpu=False):
+        times = self.cpu_times if cpu else self.wall_times
+        return sum(times[name])
+
+    def summary(self, percentiles=(50, 90, 99)):
+        """Percentiles of the recorded times of each stage.
+
+        Arguments
+        ---------
+        percentiles : tuple[int]
+            Percentiles to be computed, e.g. 50 for the median.
+
+        Returns
+        -------
+        dict[str, dict[str, dict[str, float]]]
+            For each stage, ``wall`` and ``cpu`` map ``p50``, ``p90``, ...
+            as well as ``total`` to times in seconds.
+        """
+        output = {}
+        for name in self.stages():
+            output[name] = {}
+            for clock, times in (
+                ("wall", self.wall_times[name]),
+                ("cpu", self.cpu_times[name]),
+            ):
+                values = np.percentile(times, percentiles)
+                output[name][clock] = {
+                    f"p{p}": float(value) for p, value in zip(percentiles, values)
+                }
+                output[name][clock]["total"] = float(sum(times))
+        return output
@@ -0,0 +1,101 @@
+"""
+Energy-based voice activity detection, to find the speech regions of an
+utterance so that silences need not be sent to the encoder.
+"""
+
+import torch
+
+from data.data import pcm_to_float
+
+
+class EnergyVAD:
+    """Finds speech regions from the energy of short frames.
+
+    A frame is speech if its energy is within ``threshold`` dB of the loudest
+    frame of the utterance, and above ``min_energy`` dB relative to full
+    scale, so that an utterance of silence or faint noise has no speech.
+    Gaps between speech regions shorter than ``min_silence`` seconds are
+    bridged, regions shorter than ``min_speech`` seconds are dropped, and
+    ``padding`` seconds are kept around each region so that word onsets and
+    endings are not cut.
+
+    Arguments
+    ---------
+    frame_length : float
+        Length of the frames, in seconds.
+    hop_length : float
+        Distance between the starts of consecutive frames, in seconds.
+    threshold : float
+        Energy below that of the loudest frame, in dB, under which a frame
+        is silence.
+    min_energy : float
+        Energy relative to full scale, in dB, under which a frame is silence,
+        however loud it is within the utterance.
+    min_speech : float
+        Minimum length of a speech region, in seconds.
+    min_silence : float
+        Minimum length of a silence between speech regions, in seconds.
+    padding : float
+        Audio kept on either side of each speech region, in seconds.
+    sample_rate : int
+        Sample rate of the audio.
+    """
+
+    def __init__(
+        self,
+        frame_length=0.025,
+        hop_length=0.01,
+        threshold=40.0,
+        min_energy=-60.0,
+        min_speech=0.25,
+        min_silence=0.5,
+        padding=0.2,
+        sample_rate=16000,
+    ):
+        self.frame_length = int(frame_length * sample_rate)
+        self.hop_length = int(hop_length * sample_rate)
+        self.threshold = threshold
+        self.min_energy = min_energy
+        self.min_speech = int(min_speech * sample_rate)
+        self.min_silence = int(min_silence * sample_rate)
+        self.padding = int(padding * sample_rate)
+
+    def speech_frames(self, wav):
+        """Whether each frame of a 1D waveform is speech, as a bool tensor."""
+        if wav.shape[0] < self.frame_length:
+            wav = torch.nn.functional.pad(wav, (0, self.frame_length - wav.shape[0]))
+        # in full scale units, also for 16-bit PCM audio
+        frames = pcm_to_float(wav).unfold(0, self.frame_length, self.hop_length)
+        energy = 10 * torch.log10(frames.pow(2).mean(dim=1) + 1e-10)
+        return (energy > energy.max() - self.threshold) & (energy > self.min_energy)
+
+    def __call__(self, wav):
+        """Speech regions of a 1D waveform.
+
+        Returns
+        -------
+        list[tuple[int, int]]
+            Start and end sample of each region, in order.
+        """
+        is_speech = self.speech_frames(wav).int()
+        # starts and ends of runs of speech frames, from the changes in value
+        changes = torch.diff(
+            is_speech, prepend=is_speech.new_zeros(1), append=is_speech.new_zeros(1)
+        )
+        starts = torch.nonzero(changes == 1).flatten() * self.hop_length
+        ends = (torch.nonzero(changes == -1).flatten() - 1) * self.hop_length
+        ends = ends + self.frame_length
+
+        regions = []
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            if regions and start - regions[-1][1] < self.min_silence:
+                regions[-1] = (regions[-1][0], end)
+            else:
+                regions.append((start, end))
+
+        length = wav.shape[0]
+        return [
+            (max(start - self.padding, 0), min(end + self.padding, length))
+            for start, end in regions
+            if end - start >= self.min_speech
+        ]
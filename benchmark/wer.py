@@ -1,12 +1,20 @@
 """
 Functions for computing WER, either using the inbuilt SpeechBrain library or
-a more lightweight self-implemented version that does not compute additional statistics
+a more lightweight self-implemented version that does not compute additional statistics.
+The lightweight version maps tokens to integer ids and computes the edit distance
+of many utterances at once with NumPy, optionally across a process pool.
 """
 
 from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
 
+import numpy as np
 from speechbrain.utils.edit_distance import accumulatable_wer_stats
 
+# upper bound on batch * (len(reference) + 1) * (len(hypothesis) + 1), the
+# number of dynamic programming cells (including padding) computed per batch
+MAX_BATCH_CELLS = 2**21
+
 
 def compute_wer(
     references: str | list[str], hypotheses: str | list[str], lightweight=True
@@ -44,13 +52,299 @@ def levenshtein(x, y):
                     prev[j],  # Deletion
                     prev[j - 1],  # Substitution
                 )
-        prev = curr.copy()
-    return curr[len(y)]
+        prev, curr = curr, prev
+    return prev[len(y)]
 
 
-def leven_wer(references, hypotheses):
-    total_error = 0
+def leven_wer(references, hypotheses, processes=1):
     total_length = sum(len(reference) for reference in references)
-    for reference, hypothesis in zip(references, hypotheses):
-        total_error += levenshtein(reference, hypothesis)
+    total_error = edit_operations(references, hypotheses, processes).sum()
     return total_error / total_length * 100
+
+
+def wer_details(references: str | list[str], hypotheses: str | list[str], processes=1):
+    """Computes WER and CER, along with the number of each type of word error.
+
+    Arguments
+    ---------
+    references : str | list[str]
+        Reference transcript(s).
+    hypotheses : str | list[str]
+        Hypothesis transcript(s), in the same order as the references.
+    processes : int
+        Number of worker processes used to compute edit distances.
+
+    Returns
+    -------
+    dict
+        ``WER`` and ``CER`` (%), word level ``substitutions``, ``insertions``
+        and ``deletions``, ``num_ref_words`` and ``num_ref_chars``.
+    """
+    if isinstance(references, str):
+        references = [references]
+    if isinstance(hypotheses, str):
+        hypotheses = [hypotheses]
+    if len(references) != len(hypotheses):
+        raise Exception("Number of references is not equal to the number of hypotheses")
+
+    ref_words = [ref.split() for ref in references]
+    hyp_words = [hyp.split() for hyp in hypotheses]
+    word_ops = edit_operations(ref_words, hyp_words, processes).sum(axis=0)
+
+    # characters of the transcripts after whitespace normalization
+    ref_chars = [" ".join(words) for words in ref_words]
+    hyp_chars = [" ".join(words) for words in hyp_words]
+    char_ops = edit_operations(ref_chars, hyp_chars, processes).sum(axis=0)
+
+    num_ref_words = sum(len(words) for words in ref_words)
+    num_ref_chars = sum(len(chars) for chars in ref_chars)
+    return {
+        "WER": word_ops.sum() / num_ref_words * 100,
+        "CER": char_ops.sum() / num_ref_chars * 100,
+        "substitutions": int(word_ops[0]),
+        "insertions": int(word_ops[1]),
+        "deletions": int(word_ops[2]),
+        "num_ref_words": num_ref_words,
+        "num_ref_chars": num_ref_chars,
+    }
+
+
+class StreamingWER:
+    """Accumulates word error counts of (reference, hypothesis) pairs as they
+    are produced, so that the WER can be read at any point of an evaluation
+    without holding every transcript in memory.
+
+    Scorers of separate shards of a corpus can be combined with ``merge``.
+    """
+
+    def __init__(self):
+        self.substitutions = 0
+        self.insertions = 0
+        self.deletions = 0
+        self.num_ref_words = 0
+        self.num_utterances = 0
+
+    def update(self, reference: str, hypothesis: str):
+        self.update_batch([reference], [hypothesis])
+
+    def update_batch(self, references: list[str], hypotheses: list[str]):
+        if len(references) != len(hypotheses):
+            raise Exception(
+                "Number of references is not equal to the number of hypotheses"
+            )
+        ref_words = [ref.split() for ref in references]
+        hyp_words = [hyp.split() for hyp in hypotheses]
+        substitutions, insertions, deletions = edit_operations(
+            ref_words, hyp_words
+        ).sum(axis=0)
+        self.substitutions += int(substitutions)
+        self.insertions += int(insertions)
+        self.deletions += int(deletions)
+        self.num_ref_words += sum(len(words) for words in ref_words)
+        self.num_utterances += len(references)
+
+    def merge(self, other):
+        self.substitutions += other.substitutions
+        self.insertions += other.insertions
+        self.deletions += other.deletions
+        self.num_ref_words += other.num_ref_words
+        self.num_utterances += other.num_utterances
+        return self
+
+    @property
+    def errors(self):
+        return self.substitutions + self.insertions + self.deletions
+
+    def wer(self):
+        """WER (%) of the pairs seen so far."""
+        if self.num_ref_words == 0:
+            return 0.0
+        return self.errors / self.num_ref_words * 100
+
+    def lower_bound(self, total_ref_words):
+        """Lowest WER (%) that the whole corpus can end up with, given that
+        it has ``total_ref_words`` reference words. Errors never decrease
+        as more pairs are added, so this holds whatever the remaining
+        hypotheses are."""
+        return self.errors / total_ref_words * 100
+
+    def stats(self):
+        return {
+            "WER": self.wer(),
+            "substitutions": self.substitutions,
+            "insertions": self.insertions,
+            "deletions": self.deletions,
+            "num_ref_words": self.num_ref_words,
+            "num_utterances": self.num_utterances,
+        }
+
+
+def edit_operations(references, hypotheses, processes=1, max_cells=MAX_BATCH_CELLS):
+    """Counts the substitutions, insertions and deletions needed to turn each
+    hypothesis into its reference, with a minimum number of total edits.
+
+    Tokens are mapped to integer ids once for the whole corpus. Pairs of
+    similar length are then batched together, so that the edit distance
+    of a whole batch is computed with vectorized NumPy operations.
+
+    Arguments
+    ---------
+    references : list[Sequence]
+        Reference token sequences, e.g. lists of words or strings of characters.
+    hypotheses : list[Sequence]
+        Hypothesis token sequences, in the same order as the references.
+    processes : int
+        Number of worker processes. Batches are computed in-process if 1.
+    max_cells : int
+        Maximum number of dynamic programming cells computed per batch.
+
+    Returns
+    -------
+    np.ndarray
+        Array of shape ``[len(references), 3]``, holding the number of
+        substitutions, insertions and deletions of each pair.
+    """
+    vocab = {}
+    ref_ids = [_to_ids(ref, vocab) for ref in references]
+    hyp_ids = [_to_ids(hyp, vocab) for hyp in hypotheses]
+
+    batches = _batch_indices(ref_ids, hyp_ids, max_cells)
+    jobs = [([ref_ids[i] for i in b], [hyp_ids[i] for i in b]) for b in batches]
+    if processes > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as executor:
+            results = list(executor.map(_batch_edit_operations, *zip(*jobs)))
+    else:
+        results = [_batch_edit_operations(refs, hyps) for refs, hyps in jobs]
+
+    output = np.zeros((len(references), 3), dtype=np.int64)
+    for indices, result in zip(batches, results):
+        output[indices] = result
+    return output
+
+
+def _to_ids(tokens, vocab):
+    return np.array(
+        [vocab.setdefault(token, len(vocab)) for token in tokens], dtype=np.int32
+    )
+
+
+def _batch_indices(ref_ids, hyp_ids, max_cells):
+    # group pairs of similar lengths, so little of each table is padding
+    order = sorted(
+        range(len(ref_ids)), key=lambda i: (len(ref_ids[i]), len(hyp_ids[i]))
+    )
+    batches = []
+    batch = []
+    max_ref = max_hyp = 0
+    for i in order:
+        new_max_ref = max(max_ref, len(ref_ids[i]))
+        new_max_hyp = max(max_hyp, len(hyp_ids[i]))
+        cells = (len(batch) + 1) * (new_max_ref + 1) * (new_max_hyp + 1)
+        if batch and cells > max_cells:
+            batches.append(batch)
+            batch = []
+            new_max_ref, new_max_hyp = len(ref_ids[i]), len(hyp_ids[i])
+        batch.append(i)
+        max_ref, max_hyp = new_max_ref, new_max_hyp
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _batch_edit_operations(refs, hyps):
+    """Edit distance of a batch of id sequences, computed one anti-diagonal
+    of the dynamic programming table at a time. Cell ``(i, j)`` only depends
+    on cells of the two previous anti-diagonals, so a whole anti-diagonal
+    (across the whole batch) is computed with a few vectorized operations.
+    Anti-diagonals are indexed by ``i``, which turns the three predecessors
+    of each cell into contiguous slices of the previous two anti-diagonals.
+
+    Returns an array of shape ``[len(refs), 3]``: substitutions, insertions
+    and deletions of an optimal alignment of each pair.
+    """
+    batch = len(refs)
+    ref_lens = np.array([len(ref) for ref in refs], dtype=np.int64)
+    hyp_lens = np.array([len(hyp) for hyp in hyps], dtype=np.int64)
+    n = int(ref_lens.max(initial=0))
+    m = int(hyp_lens.max(initial=0))
+
+    # padding ids never match, padded cells are never read for the results
+    ref = np.full((batch, n), -1, dtype=np.int32)
+    hyp = np.full((batch, m), -2, dtype=np.int32)
+    for b in range(batch):
+        ref[b, : ref_lens[b]] = refs[b]
+        hyp[b, : hyp_lens[b]] = hyps[b]
+    # cells (i, k - i) of anti-diagonal k compare ref[i - 1] with
+    # hyp[k - i - 1], which is a contiguous slice of the reversed hypotheses
+    hyp_reversed = np.ascontiguousarray(hyp[:, ::-1])
+
+    # the results of each pair are read from cell (ref_len, hyp_len)
+    output = np.zeros((batch, 3), dtype=np.int64)
+    finished = {}
+    for b, k in enumerate(ref_lens + hyp_lens):
+        finished.setdefault(int(k), []).append(b)
+
+    def collect(k, counts):
+        if k in finished:
+            indices = np.array(finished[k])
+            output[indices] = counts[:, indices, ref_lens[indices]].T
+
+    # cost of the best alignment ending at each cell of the anti-diagonal,
+    # with its number of substitutions, insertions and deletions
+    cost_prev2 = np.zeros((batch, n + 1), dtype=np.int32)
+    counts_prev2 = np.zeros((3, batch, n + 1), dtype=np.int32)
+    collect(0, counts_prev2)
+    cost_prev1 = np.zeros((batch, n + 1), dtype=np.int32)
+    counts_prev1 = np.zeros((3, batch, n + 1), dtype=np.int32)
+    if n >= 1:
+        cost_prev1[:, 1] = 1
+        counts_prev1[2, :, 1] = 1
+    if m >= 1:
+        cost_prev1[:, 0] = 1
+        counts_prev1[1, :, 0] = 1
+    collect(1, counts_prev1)
+
+    for k in range(2, n + m + 1):
+        cost = np.zeros((batch, n + 1), dtype=np.int32)
+        counts = np.zeros((3, batch, n + 1), dtype=np.int32)
+        if k <= n:
+            cost[:, k] = k
+            counts[2, :, k] = k
+        if k <= m:
+            cost[:, 0] = k
+            counts[1, :, 0] = k
+
+        lo, hi = max(1, k - m), min(n, k - 1)
+        if lo <= hi:
+            cells = slice(lo, hi + 1)
+            above = slice(lo - 1, hi)
+            mismatch = (
+                ref[:, lo - 1 : hi] != hyp_reversed[:, m - k + lo : m - k + hi + 1]
+            )
+            diagonal = cost_prev2[:, above] + mismatch
+            deletion = cost_prev1[:, above] + 1
+            insertion = cost_prev1[:, cells] + 1
+            best = np.minimum(diagonal, np.minimum(deletion, insertion))
+
+            # ties are broken in favour of substitutions, then deletions
+            take_diagonal = diagonal == best
+            take_deletion = ~take_diagonal & (deletion == best)
+            take_insertion = ~take_diagonal & ~take_deletion
+            chosen = np.where(
+                take_diagonal,
+                counts_prev2[:, :, above],
+                np.where(
+                    take_deletion, counts_prev1[:, :, above], counts_prev1[:, :, cells]
+                ),
+            )
+            chosen[0] += take_diagonal & mismatch
+            chosen[1] += take_insertion
+            chosen[2] += take_deletion
+            cost[:, cells] = best
+            counts[:, :, cells] = chosen
+
+        collect(k, counts)
+        cost_prev2, counts_prev2 = cost_prev1, counts_prev1
+        cost_prev1, counts_prev1 = cost, counts
+
+    return output
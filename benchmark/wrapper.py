@@ -5,17 +5,37 @@ other functions (in particular, to have it only return a single value and not a
 """
 
 import functools
-import time
 
 import speechbrain
 import torch
 import torch.nn as nn
+from speechbrain.utils.data_utils import batch_pad_right
+
+from benchmark.timing import StageTimer
+from data.data import pcm_to_float
 
 
 class Wrapper(nn.Module):
-    def __init__(self, model):
+    """Base of the wrappers.
+
+    If ``vad`` is given, e.g. an ``EnergyVAD``, timed calls only transcribe
+    the speech regions that it finds in each input: the regions of a whole
+    batch are encoded together as one padded batch, and the transcripts of
+    each input's regions are joined in order.
+    """
+
+    def __init__(self, model, vad=None):
         super().__init__()
         self.model = model
+        self.vad = vad
+        # records vad/preprocess/encoder/decoder/tokenizer times of timed calls
+        self.timer = StageTimer()
+        # seconds of audio sent to the encoder by timed calls
+        self.encoded_seconds = 0.0
+
+    def reset(self):
+        self.timer.reset()
+        self.encoded_seconds = 0.0
 
     def __getattr__(self, name):
         if name in self.__dict__:
@@ -25,16 +45,130 @@ class Wrapper(nn.Module):
         else:
             return getattr(self.__dict__["_modules"]["model"], name)
 
-
-class EncoderASRWrapper(Wrapper):
     def preprocess_input(self, input):
+        return self.preprocess_batch([input])
+
+    def preprocess_batch(self, inputs):
+        # pads the waveforms on the right to the longest one,
+        # wav_lens holds each length relative to the longest
         with torch.no_grad():
-            wavs = input.unsqueeze(0)
-            wav_lens = torch.tensor([1.0])
-            wavs = wavs.float()
+            wavs, wav_lens = batch_pad_right(list(inputs))
+            wavs = pcm_to_float(wavs)
             wavs, wav_lens = wavs.to(self.model.device), wav_lens.to(self.model.device)
         return wavs, wav_lens
 
+    def timed_transcribe(self, input):
+        predicted_words, duration = self.timed_transcribe_batch([input])
+        return predicted_words[0], duration
+
+    def timed_transcribe_batch(self, inputs):
+        if self.vad is not None:
+            return self.timed_transcribe_speech(inputs)
+        with self.timer.stage("preprocess"):
+            wavs, wav_lens = self.preprocess_batch(inputs)
+        return self.timed_transcribe_padded(wavs, wav_lens)
+
+    def timed_transcribe_speech(self, inputs):
+        # transcribes only the speech regions found by the VAD
+        with self.timer.stage("vad"):
+            segments, owners = [], []
+            for i, input in enumerate(inputs):
+                for start, end in self.vad(input):
+                    segments.append(input[start:end])
+                    owners.append(i)
+        if not segments:
+            return [""] * len(inputs), 0.0
+
+        with self.timer.stage("preprocess"):
+            wavs, wav_lens = self.preprocess_batch(segments)
+        segment_words, duration = self.timed_transcribe_padded(wavs, wav_lens)
+        words = [[] for _ in inputs]
+        for owner, text in zip(owners, segment_words):
+            if text:
+                words[owner].append(text)
+        return [" ".join(text) for text in words], duration
+
+    def count_encoded(self, wavs, wav_lens):
+        lengths = torch.round(wav_lens * wavs.shape[1])
+        self.encoded_seconds += float(lengths.sum()) / 16000
+
+
+class EncoderASRWrapper(Wrapper):
+    """Wrapper of an EncoderASR (CTC) model.
+
+    Optionally, long inputs are encoded in overlapping chunks of
+    ``chunk_window`` seconds, starting every ``chunk_stride`` seconds, so
+    that encoder memory and latency grow linearly with input length rather
+    than quadratically (through self-attention). ``chunk_batch_size`` chunks
+    are encoded together. The CTC posteriors of neighbouring chunks are cut
+    in the middle of their overlap (of ``chunk_window - chunk_stride``
+    seconds) and stitched together before decoding.
+    """
+
+    def __init__(
+        self,
+        model,
+        chunk_window=None,
+        chunk_stride=None,
+        chunk_batch_size=1,
+        vad=None,
+    ):
+        super().__init__(model, vad)
+        if chunk_window is not None:
+            if chunk_stride is None:
+                chunk_stride = chunk_window
+            if not 0 < chunk_stride <= chunk_window:
+                raise ValueError("chunk_stride must be in (0, chunk_window]")
+        self.chunk_window = chunk_window
+        self.chunk_stride = chunk_stride
+        self.chunk_batch_size = chunk_batch_size
+
+    def encode(self, wavs, wav_lens):
+        if self.chunk_window is None:
+            return self.model.mods.encoder(wavs, wav_lens), wav_lens
+        lengths = torch.round(wav_lens * wavs.shape[1]).long()
+        posteriors = [
+            self.encode_chunked(wav[:length]) for wav, length in zip(wavs, lengths)
+        ]
+        encoder_out, wav_lens = batch_pad_right(posteriors)
+        return encoder_out, wav_lens.to(encoder_out.device)
+
+    def encode_chunked(self, wav):
+        """Encodes a single 1D waveform in overlapping chunks.
+
+        Returns the encoder output of the whole waveform, of shape [frames, ...].
+        """
+        window = int(self.chunk_window * 16000)
+        stride = int(self.chunk_stride * 16000)
+        length = wav.shape[0]
+        if length <= window:
+            wav_lens = torch.ones(1, device=wav.device)
+            return self.model.mods.encoder(wav.unsqueeze(0), wav_lens)[0]
+
+        # every chunk is a full window, the last one is aligned to the end
+        starts = list(range(0, length - window, stride)) + [length - window]
+        # chunks are cut halfway through their overlap with the next chunk
+        cuts = [0]
+        for start, next_start in zip(starts[:-1], starts[1:]):
+            cuts.append((next_start + start + window) // 2)
+        cuts.append(length)
+
+        outputs = []
+        for i in range(0, len(starts), self.chunk_batch_size):
+            batch_starts = starts[i : i + self.chunk_batch_size]
+            chunks = torch.stack(
+                [wav[start : start + window] for start in batch_starts]
+            )
+            wav_lens = torch.ones(len(batch_starts), device=wav.device)
+            encoder_out = self.model.mods.encoder(chunks, wav_lens)
+            frames_per_sample = encoder_out.shape[1] / window
+            for j, (start, chunk_out) in enumerate(zip(batch_starts, encoder_out)):
+                first = round((cuts[i + j] - start) * frames_per_sample)
+                last = round((cuts[i + j + 1] - start) * frames_per_sample)
+                # copy, so that the rest of the batch output can be freed
+                outputs.append(chunk_out[first:last].clone())
+        return torch.cat(outputs)
+
     def generate(self, predictions):
         is_ctc_text_encoder_tokenizer = isinstance(
             self.model.tokenizer, speechbrain.dataio.encoder.CTCTextEncoder
@@ -57,41 +191,41 @@ class EncoderASRWrapper(Wrapper):
     def forward(self, input):
         with torch.no_grad():
             wavs, wav_lens = self.preprocess_input(input)
-            encoder_out = self.model.mods.encoder(wavs, wav_lens)
+            encoder_out, wav_lens = self.encode(wavs, wav_lens)
             predictions = self.model.decoding_function(encoder_out, wav_lens)
             predicted_words = self.generate(predictions)
         return predicted_words[0]
 
-    def timed_transcribe(self, input):
+    def timed_transcribe_padded(self, wavs, wav_lens):
+        # transcribes a batch that is already preprocessed, e.g. by a Prefetcher
+        self.count_encoded(wavs, wav_lens)
         with torch.no_grad():
-            wavs, wav_lens = self.preprocess_input(input)
-            start = time.time()
-            encoder_out = self.model.mods.encoder(wavs, wav_lens)
-            end = time.time()
-            duration = end - start
-            predictions = self.model.decoding_function(encoder_out, wav_lens)
-            predicted_words = self.generate(predictions)
-        return predicted_words[0], duration
+            with self.timer.stage("encoder"):
+                encoder_out, wav_lens = self.encode(wavs, wav_lens)
+            with self.timer.stage("decoder"):
+                predictions = self.model.decoding_function(encoder_out, wav_lens)
+            with self.timer.stage("tokenizer"):
+                predicted_words = self.generate(predictions)
+        return predicted_words, self.timer.last("encoder")
 
 
 class EncoderDecoderASRWrapper(Wrapper):
-    def preprocess_input(self, input):
-        with torch.no_grad():
-            wavs = input.unsqueeze(0)
-            wav_lens = torch.tensor([1.0])
-            wavs = wavs.float()
-            wavs, wav_lens = wavs.to(self.model.device), wav_lens.to(self.model.device)
-        return wavs, wav_lens
-
-    def generate(self, encoder_out, wav_lens):
+    def decode(self, encoder_out, wav_lens):
         if self.model.transducer_beam_search:
             inputs = [encoder_out]
         else:
             inputs = [encoder_out, wav_lens]
         predicted_tokens, _, _, _ = self.model.mods.decoder(*inputs)
-        predicted_words = [
+        return predicted_tokens
+
+    def detokenize(self, predicted_tokens):
+        return [
             self.model.tokenizer.decode_ids(token_seq) for token_seq in predicted_tokens
         ]
+
+    def generate(self, encoder_out, wav_lens):
+        predicted_tokens = self.decode(encoder_out, wav_lens)
+        predicted_words = self.detokenize(predicted_tokens)
         return predicted_words, predicted_tokens
 
     def forward(self, input):
@@ -101,12 +235,14 @@ class EncoderDecoderASRWrapper(Wrapper):
             predicted_words = self.generate(encoder_out, wav_lens)[0]
         return predicted_words[0]
 
-    def timed_transcribe(self, input):
+    def timed_transcribe_padded(self, wavs, wav_lens):
+        # transcribes a batch that is already preprocessed, e.g. by a Prefetcher
+        self.count_encoded(wavs, wav_lens)
         with torch.no_grad():
-            wavs, wav_lens = self.preprocess_input(input)
-            start = time.time()
-            encoder_out = self.model.mods.encoder(wavs, wav_lens)
-            end = time.time()
-            duration = end - start
-            predicted_words = self.generate(encoder_out, wav_lens)[0]
-        return predicted_words[0], duration
+            with self.timer.stage("encoder"):
+                encoder_out = self.model.mods.encoder(wavs, wav_lens)
+            with self.timer.stage("decoder"):
+                predicted_tokens = self.decode(encoder_out, wav_lens)
+            with self.timer.stage("tokenizer"):
+                predicted_words = self.detokenize(predicted_tokens)
+        return predicted_words, self.timer.last("encoder")
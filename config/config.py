@@ -3,7 +3,7 @@ from enum import Enum
 
 from copy import deepcopy
 from enum import Enum
-from typing import Type
+from typing import Callable, Optional, Type
 
 from speechbrain.inference.ASR import EncoderASR, EncoderDecoderASR, Pretrained
 
@@ -20,7 +20,8 @@ class ModelConfig:
     valid quantization methods per module, and module type.
 
     wav2vec2 and crdnn (commonvoice-14-en) are pre-coded with the above information
-    for ease of use.
+    for ease of use. tiny_wav2vec2 and tiny_crdnn are small random-weight
+    stand-ins with the same modules, built by a factory instead of downloaded.
     """
     def __init__(
         self,
@@ -28,13 +29,22 @@ class ModelConfig:
         savedir: str,
         module_config: dict[str, list[QuantMethod]],
         type: Type[Pretrained],
+        factory: Optional[Callable[[], Pretrained]] = None,
     ):
         self.src = src
         self.savedir = savedir
         self.type = type
+        self.factory = factory
         self.module_config = deepcopy(module_config)
         self.modules = list(self.module_config.keys())
 
+    def load(self) -> Pretrained:
+        """Builds the model with the factory if any, else loads the pretrained
+        model, downloading it to savedir on first use."""
+        if self.factory is not None:
+            return self.factory()
+        return self.type.from_hparams(source=self.src, savedir=self.savedir)
+
     @staticmethod
     def wav2vec2() -> ModelConfig:
         return ModelConfig(
@@ -67,3 +77,30 @@ class ModelConfig:
             },
             type=EncoderDecoderASR,
         )
+
+    @staticmethod
+    def tiny_wav2vec2() -> ModelConfig:
+        # imported here, as the stand-ins import transformers' wav2vec2
+        from config.tiny import tiny_wav2vec2
+
+        config = ModelConfig.wav2vec2()
+        return ModelConfig(
+            src="tiny-wav2vec2",
+            savedir=None,
+            module_config=config.module_config,
+            type=config.type,
+            factory=tiny_wav2vec2,
+        )
+
+    @staticmethod
+    def tiny_crdnn() -> ModelConfig:
+        from config.tiny import tiny_crdnn
+
+        config = ModelConfig.crdnn()
+        return ModelConfig(
+            src="tiny-crdnn",
+            savedir=None,
+            module_config=config.module_config,
+            type=config.type,
+            factory=tiny_crdnn,
+        )
@@ -0,0 +1,141 @@
+"""
+Small random-weight stand-ins of the pretrained models, built without any
+download. Their submodules sit at the same paths as those of the pretrained
+models (e.g. ``encoder.wav2vec2.model.encoder.layers``, ``decoder.fc.w``),
+so that the quantization and benchmarking code runs on them unchanged, e.g.
+to catch performance regressions offline. Their transcripts are gibberish.
+"""
+
+import functools
+import string
+from collections import OrderedDict
+
+import torch
+import torch.nn as nn
+from speechbrain.dataio.encoder import CTCTextEncoder
+from speechbrain.decoders import S2SRNNBeamSearcher, ctc_greedy_decode
+from speechbrain.inference.ASR import EncoderASR, EncoderDecoderASR
+from speechbrain.lobes.features import Fbank
+from speechbrain.lobes.models.CRDNN import CRDNN
+from speechbrain.nnet.activations import Softmax
+from speechbrain.nnet.containers import LengthsCapableSequential
+from speechbrain.nnet.embedding import Embedding
+from speechbrain.nnet.linear import Linear
+from speechbrain.nnet.RNN import LSTM, AttentionalRNNDecoder
+from transformers import Wav2Vec2Config, Wav2Vec2Model
+
+LABELS = list(" " + string.ascii_lowercase + "'")
+
+
+class TinyWav2Vec2(nn.Module):
+    """Randomly initialized wav2vec2, in place of SpeechBrain's HuggingFace
+    wrapper, whose ``model`` it has too."""
+
+    def __init__(self, hidden_size=32, num_layers=2):
+        super().__init__()
+        config = Wav2Vec2Config(
+            hidden_size=hidden_size,
+            num_hidden_layers=num_layers,
+            num_attention_heads=2,
+            intermediate_size=2 * hidden_size,
+            conv_dim=(16,) * 7,
+            num_conv_pos_embeddings=16,
+            num_conv_pos_embedding_groups=2,
+            feat_extract_norm="layer",
+            do_stable_layer_norm=True,
+            apply_spec_augment=False,
+        )
+        self.model = Wav2Vec2Model(config)
+
+    def forward(self, wav, wav_lens=None):
+        return self.model(wav).last_hidden_state
+
+
+class CharTokenizer:
+    """Maps token ids to characters, ids 0 and 1 are bos/eos."""
+
+    def decode_ids(self, ids):
+        return "".join(LABELS[i - 2] for i in ids if i >= 2)
+
+
+def tiny_wav2vec2(seed=0):
+    """EncoderASR with the layout of ``ModelConfig.wav2vec2()``."""
+    torch.manual_seed(seed)
+    tokenizer = CTCTextEncoder()
+    tokenizer.insert_blank(index=0)
+    tokenizer.update_from_iterable(LABELS, sequence_input=False)
+    hidden_size = 32
+    encoder = LengthsCapableSequential(
+        wav2vec2=TinyWav2Vec2(hidden_size),
+        enc=nn.Sequential(
+            OrderedDict(
+                linear1=Linear(input_size=hidden_size, n_neurons=hidden_size),
+                act1=nn.LeakyReLU(),
+                linear2=Linear(input_size=hidden_size, n_neurons=hidden_size),
+                act2=nn.LeakyReLU(),
+            )
+        ),
+        ctc_lin=Linear(input_size=hidden_size, n_neurons=len(tokenizer)),
+        log_softmax=Softmax(apply_log=True),
+    )
+    model = EncoderASR(
+        modules={"encoder": encoder},
+        hparams={
+            "tokenizer": tokenizer,
+            "encoder": encoder,
+            "decoding_function": functools.partial(ctc_greedy_decode, blank_id=0),
+        },
+    )
+    model.eval()
+    return model
+
+
+def tiny_crdnn(seed=0):
+    """EncoderDecoderASR with the layout of ``ModelConfig.crdnn()``."""
+    torch.manual_seed(seed)
+    n_mels = 20
+    neurons = 16
+    vocab = len(LABELS) + 2
+    encoder = LengthsCapableSequential(
+        compute_features=Fbank(n_mels=n_mels),
+        model=CRDNN(
+            input_shape=[None, None, n_mels],
+            cnn_blocks=1,
+            cnn_channels=(8,),
+            cnn_kernelsize=(3, 3),
+            time_pooling=True,
+            rnn_class=LSTM,
+            rnn_layers=1,
+            rnn_neurons=neurons,
+            rnn_bidirectional=True,
+            dnn_blocks=1,
+            dnn_neurons=neurons,
+            inter_layer_pooling_size=(2,),
+        ),
+    )
+    decoder = S2SRNNBeamSearcher(
+        embedding=Embedding(num_embeddings=vocab, embedding_dim=8),
+        decoder=AttentionalRNNDecoder(
+            rnn_type="gru",
+            attn_type="location",
+            hidden_size=neurons,
+            attn_dim=neurons,
+            num_layers=1,
+            enc_dim=neurons,
+            input_size=8,
+            channels=4,
+            kernel_size=5,
+        ),
+        linear=Linear(input_size=neurons, n_neurons=vocab),
+        bos_index=0,
+        eos_index=1,
+        min_decode_ratio=0.0,
+        max_decode_ratio=0.2,
+        beam_size=2,
+    )
+    model = EncoderDecoderASR(
+        modules={"encoder": encoder, "decoder": decoder},
+        hparams={"tokenizer": CharTokenizer()},
+    )
+    model.eval()
+    return model
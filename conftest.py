@@ -0,0 +1,23 @@
+"""
+Options of the performance regression suite in ``perf``. They are
+registered here, at the root, so that the suite can be enabled from any
+directory, e.g. with ``python -m pytest --perf``.
+"""
+
+
+def pytest_addoption(parser):
+    group = parser.getgroup("perf")
+    group.addoption(
+        "--perf", action="store_true", help="run the performance regression suite"
+    )
+    group.addoption(
+        "--update-baselines",
+        action="store_true",
+        help="record the timings of the performance suite as its baselines",
+    )
+    group.addoption(
+        "--perf-tolerance",
+        type=float,
+        default=0.5,
+        help="slowdown over a baseline, as a fraction, before a test fails",
+    )
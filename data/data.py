@@ -1,11 +1,86 @@
 import os
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from operator import itemgetter
 
 import numpy as np
-from speechbrain.dataio.dataio import read_audio
+import torch
+import tqdm
 
+from data.resample import load_audio, num_samples
 
-def get_librispeech_data(root):
+
+class LibriSpeechDataset:
+    """Audio of a corpus, decoded only when an utterance is accessed.
+
+    Supports ``len()``, iteration and indexing by int, slice or list of
+    indices. Slices and lists give a dataset over the selected utterances
+    without decoding any audio, and share the cache of decoded utterances.
+    Audio recorded at other rates is resampled to 16kHz as it is decoded,
+    so the cache holds resampled audio.
+
+    Arguments
+    ---------
+    paths : list[str]
+        Paths of the audio files, one per utterance.
+    cache_size : int
+        Maximum number of decoded utterances kept in memory.
+    lengths : list[int]
+        Number of audio samples of each utterance at 16kHz, if known, e.g.
+        from a manifest. Otherwise read from file headers when needed.
+    """
+
+    def __init__(self, paths, cache_size=128, lengths=None, _cache=None):
+        self.paths = list(paths)
+        self.cache_size = cache_size
+        self._lengths = None if lengths is None else list(lengths)
+        # maps paths to decoded audio, least recently used first
+        self._cache = OrderedDict() if _cache is None else _cache
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.subset(range(len(self))[index])
+        if isinstance(index, (list, tuple, np.ndarray)):
+            return self.subset(index)
+        return self._load(self.paths[index])
+
+    def __iter__(self):
+        for path in self.paths:
+            yield self._load(path)
+
+    def subset(self, indices):
+        """Dataset over the utterances at the given indices, without decoding."""
+        lengths = None
+        if self._lengths is not None:
+            lengths = [self._lengths[i] for i in indices]
+        return LibriSpeechDataset(
+            [self.paths[i] for i in indices], self.cache_size, lengths, self._cache
+        )
+
+    def lengths(self):
+        """Number of audio samples of each utterance, without decoding."""
+        if self._lengths is None:
+            self._lengths = [num_samples(path) for path in self.paths]
+        return list(self._lengths)
+
+    def _load(self, path):
+        if path in self._cache:
+            self._cache.move_to_end(path)
+            return self._cache[path]
+        audio = load_audio(path)
+        if self.cache_size > 0:
+            self._cache[path] = audio
+            if len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return audio
+
+
+def get_librispeech_data(
+    root, lazy=False, cache_size=128, num_workers=1, processes=False
+):
     """Gets audio samples and references from downloaded LibriSpeech data.
     Assumes that the data is downloaded, and the directory structure matches LibriSpeech.
     Download by:
@@ -19,14 +94,85 @@ def get_librispeech_data(root):
     ---------
     root : str
         Path to root of directory
+    lazy : bool
+        Whether to return a LibriSpeechDataset, which decodes audio only
+        when it is accessed, instead of decoding all of the audio up front
+    cache_size : int
+        Maximum number of decoded utterances kept in memory, if lazy
+    num_workers : int
+        Number of workers decoding audio in parallel, if not lazy
+    processes : bool
+        Whether the workers are processes rather than threads
 
     Returns
     -------
-    tuple[list[torch.Tensor], list[str]]
-        tuple of list of audio tensors and list of corresponding reference texts
+    tuple[list[torch.Tensor] | LibriSpeechDataset, list[str]]
+        tuple of audio tensors and list of corresponding reference texts
     """
-    audios = []
+    audio_paths = []
     references = []
+    for _, audio_path, _, _, reference in librispeech_utterances(root):
+        audio_paths.append(audio_path)
+        references.append(reference)
+    if lazy:
+        return LibriSpeechDataset(audio_paths, cache_size), references
+    return list(decode_audio(audio_paths, num_workers, processes)), references
+
+
+def decode_audio(paths, num_workers=1, processes=False):
+    """Decodes audio files in parallel, yielding them in the order of paths.
+
+    Progress and decoding throughput are reported by a progress bar.
+
+    Arguments
+    ---------
+    paths : list[str]
+        Paths of the audio files.
+    num_workers : int
+        Number of workers decoding audio in parallel.
+    processes : bool
+        Whether the workers are processes rather than threads. Decoding
+        mostly releases the GIL, so threads usually suffice.
+
+    Yields
+    ------
+    torch.Tensor
+        Decoded audio.
+    """
+    progress = tqdm.tqdm(total=len(paths), desc="decoding", unit="utt")
+    if num_workers <= 1:
+        for path in paths:
+            yield load_audio(path)
+            progress.update()
+    else:
+        executor_type = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        with executor_type(num_workers) as executor:
+            # map yields results in the order of paths, whichever finishes first
+            for audio in executor.map(_decode_to_numpy, paths, chunksize=8):
+                yield torch.from_numpy(audio)
+                progress.update()
+    progress.close()
+
+
+def _decode_to_numpy(path):
+    # numpy arrays are cheaper to send between processes than tensors,
+    # which would each be moved to shared memory
+    return load_audio(path).numpy()
+
+
+def librispeech_utterances(root):
+    """Walks a LibriSpeech directory and reads its transcripts.
+
+    Arguments
+    ---------
+    root : str
+        Path to root of directory
+
+    Yields
+    ------
+    tuple[str, str, str, str, str]
+        utterance id, audio path, speaker, chapter and reference text
+    """
     for book in os.listdir(root):
         for chapter in os.listdir(f"{root}/{book}"):
             for file in os.listdir(f"{root}/{book}/{chapter}"):
@@ -37,9 +183,7 @@ def get_librispeech_data(root):
                             full_audio_path = (
                                 f"{root}/{book}/{chapter}/{audio_path}.flac"
                             )
-                            audios.append(read_audio(full_audio_path))
-                            references.append(reference)
-    return audios, references
+                            yield audio_path, full_audio_path, book, chapter, reference
 
 
 def random_choice(items, n, seed=None):
@@ -55,9 +199,59 @@ def random_choice(items, n, seed=None):
 
     Returns
     -------
-    list of chosen items
+    list of chosen items, or a subset if items is a lazy dataset
     """
     if seed is not None:
         np.random.seed(seed)
     indices = np.random.choice(len(items), n)
+    if hasattr(items, "subset"):
+        # lazy datasets are chosen from without decoding any audio
+        return items.subset(indices)
     return list(itemgetter(*indices)(items))
+
+
+def length_bucketed_batches(lengths, batch_size):
+    """Groups item indices into batches of similar length, so that padding
+    a batch to its longest item wastes as little compute as possible.
+
+    Arguments
+    ---------
+    lengths : list[int]
+        length of each item, e.g. number of audio samples
+    batch_size : int
+        maximum number of items per batch
+
+    Returns
+    -------
+    list[list[int]]
+        batches of indices into the original items, longest batch first
+    """
+    if batch_size < 1:
+        raise ValueError("batch_size must be at least 1")
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i], reverse=True)
+    return [order[i : i + batch_size] for i in range(0, len(order), batch_size)]
+
+
+def sample_lengths(samples):
+    """Number of audio samples of each utterance, without decoding the audio
+    of a LibriSpeechDataset or AudioStore.
+
+    Arguments
+    ---------
+    samples : list[torch.Tensor] | LibriSpeechDataset | AudioStore
+
+    Returns
+    -------
+    list[int]
+    """
+    if hasattr(samples, "lengths"):
+        return samples.lengths()
+    return [sample.shape[0] for sample in samples]
+
+
+def pcm_to_float(wavs):
+    """Converts 16-bit PCM audio to float audio in [-1, 1), as decoded by
+    ``load_audio``. Float audio is returned as float32, without scaling."""
+    if wavs.dtype == torch.int16:
+        return wavs.float() / 32768
+    return wavs.float()
@@ -0,0 +1,187 @@
+"""
+Manifest of a LibriSpeech corpus: an index of its utterances, built by
+scanning the corpus once and stored as a TSV file, so that later loads need
+neither walk the directory tree nor open any audio.
+"""
+
+import csv
+import os
+from typing import NamedTuple
+
+from speechbrain.dataio import audio_io
+
+from data.data import LibriSpeechDataset, librispeech_utterances
+from data.resample import resampled_length
+
+FIELDS = [
+    "id",
+    "path",
+    "num_samples",
+    "sample_rate",
+    "speaker",
+    "chapter",
+    "transcript",
+]
+
+
+class ManifestEntry(NamedTuple):
+    id: str
+    path: str
+    num_samples: int
+    sample_rate: int
+    speaker: str
+    chapter: str
+    transcript: str
+
+    @property
+    def duration(self):
+        return self.num_samples / self.sample_rate
+
+
+class Manifest:
+    """Utterances of a corpus, in the order of the scan.
+
+    Arguments
+    ---------
+    entries : list[ManifestEntry]
+    """
+
+    def __init__(self, entries):
+        self.entries = list(entries)
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return Manifest(self.entries[index])
+        return self.entries[index]
+
+    def __iter__(self):
+        return iter(self.entries)
+
+    @staticmethod
+    def build(root):
+        """Scans a LibriSpeech directory, reading only audio file headers."""
+        entries = []
+        for utterance_id, path, speaker, chapter, transcript in librispeech_utterances(
+            root
+        ):
+            info = audio_io.info(path)
+            entries.append(
+                ManifestEntry(
+                    utterance_id,
+                    path,
+                    info.frames,
+                    info.sample_rate,
+                    speaker,
+                    chapter,
+                    transcript.strip(),
+                )
+            )
+        return Manifest(entries)
+
+    @staticmethod
+    def load(path):
+        with open(path, newline="") as f:
+            reader = csv.DictReader(
+                f, delimiter="\t", quoting=csv.QUOTE_NONE, escapechar="\\"
+            )
+            return Manifest(
+                ManifestEntry(
+                    row["id"],
+                    row["path"],
+                    int(row["num_samples"]),
+                    int(row["sample_rate"]),
+                    row["speaker"],
+                    row["chapter"],
+                    row["transcript"],
+                )
+                for row in reader
+            )
+
+    def save(self, path):
+        with open(path, "w", newline="") as f:
+            # tabs, quotes and newlines in transcripts are escaped
+            writer = csv.writer(
+                f, delimiter="\t", quoting=csv.QUOTE_NONE, escapechar="\\"
+            )
+            writer.writerow(FIELDS)
+            writer.writerows(self.entries)
+
+    def filter(
+        self,
+        min_duration=None,
+        max_duration=None,
+        speakers=None,
+        chapters=None,
+    ):
+        """Utterances matching all of the given criteria.
+
+        Arguments
+        ---------
+        min_duration : float
+            Minimum duration in seconds, inclusive.
+        max_duration : float
+            Maximum duration in seconds, inclusive.
+        speakers : Iterable[str]
+            Speakers to be kept.
+        chapters : Iterable[str]
+            Chapters to be kept.
+
+        Returns
+        -------
+        Manifest
+        """
+        speakers = None if speakers is None else set(speakers)
+        chapters = None if chapters is None else set(chapters)
+        return Manifest(
+            entry
+            for entry in self.entries
+            if (min_duration is None or entry.duration >= min_duration)
+            and (max_duration is None or entry.duration <= max_duration)
+            and (speakers is None or entry.speaker in speakers)
+            and (chapters is None or entry.chapter in chapters)
+        )
+
+    def select(self, indices):
+        return Manifest(self.entries[i] for i in indices)
+
+    def durations(self):
+        return [entry.duration for entry in self.entries]
+
+    def references(self):
+        return [entry.transcript for entry in self.entries]
+
+    def dataset(self, cache_size=128):
+        """Lazily decoded audio of the utterances, at 16kHz, see
+        ``LibriSpeechDataset``."""
+        return LibriSpeechDataset(
+            [entry.path for entry in self.entries],
+            cache_size,
+            lengths=[
+                resampled_length(entry.num_samples, entry.sample_rate)
+                for entry in self.entries
+            ],
+        )
+
+
+def get_manifest(root, path):
+    """Loads the manifest of a corpus, building and saving it on first use.
+
+    Arguments
+    ---------
+    root : str
+        Path to root of the LibriSpeech directory.
+    path : str
+        Path of the manifest file.
+
+    Returns
+    -------
+    Manifest
+    """
+    if os.path.exists(path):
+        return Manifest.load(path)
+    manifest = Manifest.build(root)
+    manifest.save(path)
+    return manifest
@@ -0,0 +1,110 @@
+"""
+Background prefetching of audio, so that decoding and preprocessing of the
+upcoming batches overlap with inference on the current one.
+"""
+
+import collections
+from concurrent.futures import ThreadPoolExecutor
+
+from speechbrain.utils.data_utils import batch_pad_right
+
+from data.data import pcm_to_float, sample_lengths
+
+
+def pad_batch(inputs):
+    """Pads 1D audio tensors on the right into a float batch.
+
+    Returns
+    -------
+    tuple[torch.Tensor, torch.Tensor]
+        Batch of waveforms, and each length relative to the longest one.
+    """
+    wavs, wav_lens = batch_pad_right(list(inputs))
+    return pcm_to_float(wavs), wav_lens
+
+
+class Prefetcher:
+    """Samples whose batches are loaded on background threads ahead of use.
+
+    Wraps a list of tensors, LibriSpeechDataset or AudioStore. Indexing,
+    ``len()`` and ``lengths()`` are passed through, while ``iter_batches``
+    loads and preprocesses up to ``depth`` batches ahead of the one being
+    used. Decoding and torch ops mostly release the GIL, so threads run
+    them alongside inference.
+
+    Arguments
+    ---------
+    samples : list[torch.Tensor] | LibriSpeechDataset | AudioStore
+        1D audio tensors, sampled at 16kHz.
+    num_workers : int
+        Number of background threads.
+    depth : int
+        Maximum number of batches loaded ahead, bounding the memory used.
+    """
+
+    def __init__(self, samples, num_workers=1, depth=2):
+        if depth < 1:
+            raise ValueError("depth must be at least 1")
+        self.samples = samples
+        self.num_workers = num_workers
+        self.depth = depth
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.subset(range(len(self))[index])
+        return self.samples[index]
+
+    def __iter__(self):
+        return iter(self.samples)
+
+    def subset(self, indices):
+        if hasattr(self.samples, "subset"):
+            samples = self.samples.subset(indices)
+        else:
+            samples = [self.samples[i] for i in indices]
+        return Prefetcher(samples, self.num_workers, self.depth)
+
+    def lengths(self):
+        return sample_lengths(self.samples)
+
+    def iter_batches(self, batches, preprocess=pad_batch):
+        """Loads and preprocesses batches in the background, in order.
+
+        Arguments
+        ---------
+        batches : list[list[int]]
+            Indices of the samples of each batch.
+        preprocess : Callable[[list[torch.Tensor]], Any]
+            Applied to the samples of each batch on the background thread,
+            e.g. ``pad_batch``.
+
+        Yields
+        ------
+        tuple[list[int], Any]
+            Indices of each batch and its preprocessed samples.
+        """
+        batches = iter(batches)
+        pending = collections.deque()
+        with ThreadPoolExecutor(self.num_workers) as executor:
+            try:
+                for indices in batches:
+                    pending.append(
+                        (indices, executor.submit(self._load, indices, preprocess))
+                    )
+                    if len(pending) <= self.depth:
+                        continue
+                    indices, future = pending.popleft()
+                    yield indices, future.result()
+                while pending:
+                    indices, future = pending.popleft()
+                    yield indices, future.result()
+            finally:
+                # the consumer may stop early, e.g. when a WER budget is exceeded
+                for _, future in pending:
+                    future.cancel()
+
+    def _load(self, indices, preprocess):
+        return preprocess([self.samples[i] for i in indices])
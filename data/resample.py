@@ -0,0 +1,64 @@
+"""
+Loading of audio at the 16kHz sample rate that the models expect, resampling
+audio recorded at other rates with cached polyphase filters.
+"""
+
+import math
+from functools import lru_cache
+
+import torchaudio
+from speechbrain.dataio import audio_io
+
+# sample rate expected by the models, and assumed throughout benchmarking
+SAMPLE_RATE = 16000
+
+
+@lru_cache(maxsize=None)
+def get_resampler(orig_freq, new_freq=SAMPLE_RATE):
+    """Resampler between two rates, whose filter kernel is computed once.
+
+    The returned transform works on tensors of shape [..., time], so a
+    padded batch is resampled with a single convolution.
+    """
+    return torchaudio.transforms.Resample(orig_freq, new_freq)
+
+
+def resample(wavs, orig_freq, new_freq=SAMPLE_RATE):
+    """Resamples audio of shape [..., time], a no-op if the rates match."""
+    if orig_freq == new_freq:
+        return wavs
+    return get_resampler(orig_freq, new_freq)(wavs)
+
+
+def resampled_length(num_samples, orig_freq, new_freq=SAMPLE_RATE):
+    """Number of samples of audio of num_samples samples once resampled."""
+    gcd = math.gcd(orig_freq, new_freq)
+    return math.ceil(num_samples * (new_freq // gcd) / (orig_freq // gcd))
+
+
+def load_audio(path, sample_rate=SAMPLE_RATE):
+    """Decodes an audio file into a 1D float tensor at the given sample rate.
+
+    Channels of multi-channel audio are averaged.
+
+    Arguments
+    ---------
+    path : str
+        Path of the audio file.
+    sample_rate : int
+        Sample rate of the returned audio.
+
+    Returns
+    -------
+    torch.Tensor
+    """
+    audio, orig_freq = audio_io.load(path)
+    # audio is [channels, time]
+    return resample(audio.mean(dim=0), orig_freq, sample_rate)
+
+
+def num_samples(path, sample_rate=SAMPLE_RATE):
+    """Number of samples of an audio file at the given sample rate, read from
+    its header."""
+    info = audio_io.info(path)
+    return resampled_length(info.frames, info.sample_rate, sample_rate)
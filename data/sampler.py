@@ -0,0 +1,81 @@
+"""
+Sampling of utterances from a manifest, e.g. for calibration, without
+replacement and without loading any audio.
+"""
+
+import numpy as np
+
+
+def sample_manifest(manifest, n, seed=None, num_strata=1, max_seconds=None):
+    """Randomly chooses up to n distinct utterances of a manifest.
+
+    Utterances are split by duration into ``num_strata`` strata of equal
+    size, and chosen from each stratum in turn, so that short and long
+    utterances are represented alike. If ``max_seconds`` is given, an
+    utterance is skipped if it would take the total duration over it, so
+    fewer than n utterances may be chosen.
+
+    Arguments
+    ---------
+    manifest : Manifest
+        Utterances to choose from.
+    n : int
+        Number of utterances to choose.
+    seed : int
+        Seed of the generator, which is local, so the global numpy state
+        is left untouched.
+    num_strata : int
+        Number of duration strata.
+    max_seconds : float
+        Maximum total duration of the chosen utterances.
+
+    Returns
+    -------
+    Manifest
+        The chosen utterances.
+    """
+    if n > len(manifest):
+        raise ValueError("Cannot choose more utterances than the manifest holds")
+    if num_strata < 1:
+        raise ValueError("num_strata must be at least 1")
+    rng = np.random.default_rng(seed)
+    durations = np.asarray(manifest.durations())
+    strata = np.array_split(np.argsort(durations, kind="stable"), num_strata)
+    # each stratum in random order, then interleaved
+    shuffled = [rng.permutation(stratum) for stratum in strata]
+    order = [
+        stratum[i]
+        for i in range(max(len(stratum) for stratum in shuffled))
+        for stratum in shuffled
+        if i < len(stratum)
+    ]
+
+    chosen = []
+    total = 0.0
+    for index in order:
+        if len(chosen) == n:
+            break
+        if max_seconds is not None and total + durations[index] > max_seconds:
+            continue
+        chosen.append(int(index))
+        total += durations[index]
+    return manifest.select(chosen)
+
+
+def calibration_set(manifest):
+    """Calibration samples of the benchmark scripts: 10 distinct utterances
+    across the range of durations, at most 2 minutes in total.
+
+    Arguments
+    ---------
+    manifest : Manifest
+        Utterances to choose from.
+
+    Returns
+    -------
+    LibriSpeechDataset
+        Lazily decoded audio of the chosen utterances.
+    """
+    return sample_manifest(
+        manifest, 10, seed=1337, num_strata=5, max_seconds=120
+    ).dataset()
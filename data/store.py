@@ -0,0 +1,160 @@
+"""
+Audio store: the audio of a corpus decoded once into a single contiguous
+array on disk, plus an index of where each utterance starts. The array is
+memory-mapped, so that utterances are read without decoding, and processes
+reading the same store share its pages in the page cache.
+"""
+
+import os
+
+import numpy as np
+import torch
+
+from data.data import LibriSpeechDataset, decode_audio, sample_lengths
+
+
+class AudioStore:
+    """Utterances of an audio store, as zero-copy views of the memory map.
+
+    Supports ``len()``, iteration and indexing by int, slice or list of
+    indices, like ``LibriSpeechDataset``. Audio stored as int16 is returned
+    as int16, see ``data.data.pcm_to_float``.
+
+    Arguments
+    ---------
+    audio : numpy.ndarray
+        Audio of all utterances, concatenated.
+    offsets : numpy.ndarray
+        Start of each utterance in audio, followed by the end of the last one.
+    indices : list[int]
+        Utterances of the store in this view, or None for all of them.
+    """
+
+    def __init__(self, audio, offsets, indices=None):
+        self.audio = audio
+        self.offsets = offsets
+        if indices is None:
+            indices = range(len(offsets) - 1)
+        self.indices = list(indices)
+
+    @staticmethod
+    def open(path):
+        # copy-on-write mapping, so that tensors are writable as torch
+        # expects, while writes never reach the file
+        audio = np.load(os.path.join(path, "audio.npy"), mmap_mode="c")
+        offsets = np.load(os.path.join(path, "offsets.npy"))
+        return AudioStore(audio, offsets)
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.subset(range(len(self))[index])
+        if isinstance(index, (list, tuple, np.ndarray)):
+            return self.subset(index)
+        i = self.indices[index]
+        return torch.from_numpy(self.audio[self.offsets[i] : self.offsets[i + 1]])
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def subset(self, indices):
+        return AudioStore(self.audio, self.offsets, [self.indices[i] for i in indices])
+
+    def lengths(self):
+        return [int(self.offsets[i + 1] - self.offsets[i]) for i in self.indices]
+
+
+def build_audio_store(samples, path, dtype=np.float32, num_workers=1, processes=False):
+    """Decodes every utterance and writes them to an audio store.
+
+    Arguments
+    ---------
+    samples : list[torch.Tensor] | LibriSpeechDataset
+        1D float audio tensors, decoded one at a time if lazy.
+    path : str
+        Directory of the store, created if needed.
+    dtype : numpy.dtype
+        ``np.float32``, or ``np.int16`` to store 16-bit PCM in half the space.
+    num_workers : int
+        Number of workers decoding the audio of a LibriSpeechDataset in parallel.
+    processes : bool
+        Whether the workers are processes rather than threads.
+
+    Returns
+    -------
+    AudioStore
+    """
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float32, np.int16):
+        raise ValueError("dtype must be float32 or int16")
+    os.makedirs(path, exist_ok=True)
+    offsets = _offsets(samples)
+    audio = np.lib.format.open_memmap(
+        os.path.join(path, "audio.npy"),
+        mode="w+",
+        dtype=dtype,
+        shape=(int(offsets[-1]),),
+    )
+    _fill(audio, offsets, samples, num_workers, processes)
+    audio.flush()
+    del audio
+    # the index is written last, so that a store is only opened once complete
+    np.save(os.path.join(path, "offsets.npy"), offsets)
+    return AudioStore.open(path)
+
+
+def get_audio_store(samples, path, dtype=np.float32, num_workers=1, processes=False):
+    """Opens the audio store at path, building it from samples on first use."""
+    if os.path.exists(os.path.join(path, "offsets.npy")):
+        return AudioStore.open(path)
+    return build_audio_store(samples, path, dtype, num_workers, processes)
+
+
+def pack_audio(samples, dtype=np.int16, num_workers=1, processes=False):
+    """Packs every utterance into one in-memory buffer.
+
+    Holding 16-bit PCM in a single int16 buffer takes half the memory of
+    float32 tensors, and saves the overhead of thousands of small tensors.
+    Batches are converted to float only when they are preprocessed, see
+    ``data.data.pcm_to_float``.
+
+    Arguments
+    ---------
+    samples : list[torch.Tensor] | LibriSpeechDataset
+        1D float audio tensors, decoded one at a time if lazy.
+    dtype : numpy.dtype
+        ``np.int16``, or ``np.float32``.
+    num_workers, processes
+        See ``build_audio_store``.
+
+    Returns
+    -------
+    AudioStore
+        Utterances as views of the buffer.
+    """
+    dtype = np.dtype(dtype)
+    if dtype not in (np.float32, np.int16):
+        raise ValueError("dtype must be float32 or int16")
+    offsets = _offsets(samples)
+    audio = np.empty(int(offsets[-1]), dtype=dtype)
+    _fill(audio, offsets, samples, num_workers, processes)
+    return AudioStore(audio, offsets)
+
+
+def _offsets(samples):
+    offsets = np.zeros(len(samples) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(sample_lengths(samples))
+    return offsets
+
+
+def _fill(audio, offsets, samples, num_workers, processes):
+    if isinstance(samples, LibriSpeechDataset):
+        samples = decode_audio(samples.paths, num_workers, processes)
+    for i, sample in enumerate(samples):
+        sample = sample.numpy()
+        if audio.dtype == np.int16:
+            sample = np.clip(np.round(sample * 32768), -32768, 32767)
+        audio[offsets[i] : offsets[i + 1]] = sample
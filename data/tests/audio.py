@@ -0,0 +1,45 @@
+"""
+Small synthetic audio files and corpora for the tests of the data layer.
+"""
+
+import numpy as np
+import soundfile
+
+
+def write_audio(path, audio, sample_rate=16000):
+    # 16-bit PCM, as LibriSpeech is, so audio of multiples of 1/32768 is
+    # decoded exactly
+    soundfile.write(str(path), audio, sample_rate, subtype="PCM_16")
+
+
+def pcm_audio(num_samples, seed):
+    rng = np.random.default_rng(seed)
+    return rng.integers(-8192, 8192, num_samples).astype(np.float32) / 32768
+
+
+# utterances of a small corpus: id, number of samples and transcript
+UTTERANCES = [
+    ("1-10-0000", 1600, "A SHORT ONE"),
+    ("1-10-0001", 4800, "THE LONGEST ONE"),
+    ("2-20-0000", 800, "TINY"),
+    ("2-20-0001", 3200, "A MEDIUM ONE"),
+]
+
+
+def librispeech_corpus(root):
+    """Writes a directory laid out like LibriSpeech, and returns the audio of
+    each utterance by id, at 16kHz."""
+    audio = {}
+    transcripts = {}
+    for i, (utterance_id, num_samples, transcript) in enumerate(UTTERANCES):
+        speaker, chapter, _ = utterance_id.split("-")
+        directory = root / speaker / chapter
+        directory.mkdir(parents=True, exist_ok=True)
+        audio[utterance_id] = pcm_audio(num_samples, seed=i)
+        write_audio(directory / f"{utterance_id}.flac", audio[utterance_id])
+        transcripts.setdefault(directory / f"{speaker}-{chapter}.trans.txt", []).append(
+            f"{utterance_id} {transcript}\n"
+        )
+    for path, lines in transcripts.items():
+        path.write_text("".join(lines))
+    return audio
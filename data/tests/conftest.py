@@ -0,0 +1,10 @@
+import pytest
+
+from data.tests.audio import librispeech_corpus
+
+
+@pytest.fixture
+def corpus(tmp_path):
+    """Root of a small LibriSpeech corpus, and the audio of each utterance."""
+    root = tmp_path / "corpus"
+    return root, librispeech_corpus(root)
@@ -0,0 +1,184 @@
+import pytest
+
+from data import data
+from data.data import (
+    LibriSpeechDataset,
+    decode_audio,
+    get_librispeech_data,
+    length_bucketed_batches,
+)
+from data.tests.audio import pcm_audio, write_audio
+
+
+@pytest.fixture
+def paths(tmp_path):
+    # 4 one-channel FLAC files of 100, 200, 300 and 400 samples
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"{i}.flac"
+        write_audio(path, pcm_audio(100 * (i + 1), seed=i))
+        paths.append(str(path))
+    return paths
+
+
+@pytest.fixture
+def decoded(monkeypatch):
+    # paths decoded by the dataset, in order
+    decoded = []
+    load_audio = data.load_audio
+
+    def record(path):
+        decoded.append(path)
+        return load_audio(path)
+
+    monkeypatch.setattr(data, "load_audio", record)
+    return decoded
+
+
+class TestLibriSpeechDataset:
+    def test_slicing_does_not_decode(self, paths, decoded):
+        # GIVEN
+        #      a dataset of 4 utterances
+        dataset = LibriSpeechDataset(paths)
+
+        # WHEN
+        #      it is sliced, indexed by a list, and its lengths are read
+        sliced = dataset[1:3]
+        listed = dataset[[3, 0]]
+        lengths = listed.lengths()
+
+        # THEN
+        #      the subsets hold the selected utterances
+        #      no audio is decoded
+        assert sliced.paths == paths[1:3]
+        assert listed.paths == [paths[3], paths[0]]
+        assert lengths == [400, 100]
+        assert decoded == []
+
+    def test_subsets_share_the_cache(self, paths, decoded):
+        # GIVEN
+        #      a dataset, and a subset of it
+        dataset = LibriSpeechDataset(paths)
+        subset = dataset[2:]
+
+        # WHEN
+        #      an utterance is read from the subset, then from the dataset
+        first = subset[0]
+        second = dataset[2]
+
+        # THEN
+        #      it is decoded once, and the same tensor is returned
+        assert decoded == [paths[2]]
+        assert second is first
+        assert first.shape == (300,)
+
+    def test_least_recently_used_is_evicted(self, paths, decoded):
+        # GIVEN
+        #      a dataset caching up to 2 utterances
+        dataset = LibriSpeechDataset(paths, cache_size=2)
+
+        # WHEN
+        #      utterances 0 and 1 are read, 0 is read again, 2 is read, then
+        #      0 and 1 are read again
+        for index in [0, 1, 0, 2, 0, 1]:
+            dataset[index]
+
+        # THEN
+        #      utterance 1, the least recently used, was evicted for 2
+        #      utterance 0 stayed cached
+        assert decoded == [paths[0], paths[1], paths[2], paths[1]]
+        assert list(dataset._cache) == [paths[0], paths[1]]
+
+    def test_no_cache(self, paths, decoded):
+        # GIVEN
+        #      a dataset without a cache
+        dataset = LibriSpeechDataset(paths, cache_size=0)
+
+        # WHEN
+        #      an utterance is read twice
+        dataset[0]
+        dataset[0]
+
+        # THEN
+        #      it is decoded every time
+        assert decoded == [paths[0], paths[0]]
+
+
+class TestDecodeAudio:
+    @pytest.mark.parametrize(
+        "num_workers,processes", [(1, False), (3, False), (2, True)]
+    )
+    def test_order_of_paths(self, paths, num_workers, processes):
+        # GIVEN
+        #      files of different lengths, the longest last
+        #      the audio decoded one file at a time
+        expected = [data.load_audio(path) for path in paths]
+
+        # WHEN
+        #      they are decoded by several workers, in reverse order
+        decoded = list(decode_audio(paths[::-1], num_workers, processes))
+
+        # THEN
+        #      the audio is yielded in the order of the paths
+        assert len(decoded) == len(paths)
+        for sample, expected_sample in zip(decoded, expected[::-1]):
+            assert sample.equal(expected_sample)
+
+
+class TestGetLibriSpeechData:
+    def test_lazy_and_eager_agree(self, corpus):
+        # GIVEN
+        #      a LibriSpeech corpus
+        root, audio = corpus
+
+        # WHEN
+        #      it is loaded lazily, and decoded up front
+        lazy, lazy_references = get_librispeech_data(str(root), lazy=True)
+        eager, eager_references = get_librispeech_data(str(root), num_workers=2)
+
+        # THEN
+        #      both hold the same utterances and references, in the same order
+        assert lazy_references == eager_references
+        assert len(lazy) == len(eager) == len(audio)
+        for lazy_sample, eager_sample in zip(lazy, eager):
+            assert lazy_sample.equal(eager_sample)
+
+
+class TestLengthBucketedBatches:
+    def test_longest_batch_first(self):
+        # GIVEN
+        #      items of unsorted lengths
+        lengths = [3, 9, 1, 7, 5, 8, 2]
+
+        # WHEN
+        #      they are grouped into batches of up to 3
+        batches = length_bucketed_batches(lengths, 3)
+
+        # THEN
+        #      each batch holds items of similar lengths, longest batch first
+        #      every item is in exactly one batch
+        assert batches == [[1, 5, 3], [4, 0, 6], [2]]
+
+    def test_batch_size_of_one(self):
+        # GIVEN
+        #      items of unsorted lengths
+        lengths = [2, 5, 4]
+
+        # WHEN
+        #      they are grouped into batches of 1
+        batches = length_bucketed_batches(lengths, 1)
+
+        # THEN
+        #      each item is its own batch, longest first
+        assert batches == [[1], [2], [0]]
+
+    @pytest.mark.parametrize("batch_size", [0, -1])
+    def test_batch_size_below_one(self, batch_size):
+        # GIVEN
+        #      a batch size below 1
+        # WHEN
+        #      items are grouped into batches
+        # THEN
+        #      a ValueError is raised
+        with pytest.raises(ValueError):
+            length_bucketed_batches([1, 2, 3], batch_size)
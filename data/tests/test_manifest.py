@@ -0,0 +1,125 @@
+import shutil
+
+import pytest
+
+from data.manifest import Manifest, ManifestEntry, get_manifest
+from data.tests.audio import UTTERANCES
+
+
+def by_id(manifest):
+    return {entry.id: entry for entry in manifest}
+
+
+class TestManifest:
+    def test_build(self, corpus):
+        # GIVEN
+        #      a LibriSpeech corpus
+        root, audio = corpus
+
+        # WHEN
+        #      its manifest is built
+        manifest = Manifest.build(str(root))
+
+        # THEN
+        #      every utterance is indexed with its length, speaker, chapter
+        #      and transcript
+        entries = by_id(manifest)
+        assert set(entries) == {utterance_id for utterance_id, _, _ in UTTERANCES}
+        for utterance_id, num_samples, transcript in UTTERANCES:
+            entry = entries[utterance_id]
+            assert (entry.num_samples, entry.sample_rate) == (num_samples, 16000)
+            assert [entry.speaker, entry.chapter] == utterance_id.split("-")[:2]
+            assert entry.transcript == transcript
+
+    def test_round_trip(self, corpus, tmp_path):
+        # GIVEN
+        #      the manifest of a corpus
+        root, _ = corpus
+        manifest = Manifest.build(str(root))
+
+        # WHEN
+        #      it is saved and loaded again
+        manifest.save(tmp_path / "manifest.tsv")
+        loaded = Manifest.load(tmp_path / "manifest.tsv")
+
+        # THEN
+        #      the entries are the same, in the same order
+        assert loaded.entries == manifest.entries
+
+    def test_round_trip_of_special_characters(self, tmp_path):
+        # GIVEN
+        #      transcripts with quotes, a tab and a backslash
+        transcripts = ['SAY "HELLO"', "TAB\tHERE", "IT'S", "BACK\\SLASH"]
+        manifest = Manifest(
+            ManifestEntry(f"u{i}", f"u{i}.flac", 16000, 16000, "1", "10", transcript)
+            for i, transcript in enumerate(transcripts)
+        )
+
+        # WHEN
+        #      the manifest is saved and loaded again
+        manifest.save(tmp_path / "manifest.tsv")
+        loaded = Manifest.load(tmp_path / "manifest.tsv")
+
+        # THEN
+        #      the transcripts are unchanged
+        assert loaded.references() == transcripts
+
+    def test_filter(self, corpus):
+        # GIVEN
+        #      the manifest of a corpus
+        root, _ = corpus
+        manifest = Manifest.build(str(root))
+
+        # WHEN
+        #      it is filtered by duration, and by speaker
+        short = manifest.filter(max_duration=0.1)
+        long = manifest.filter(min_duration=0.1, max_duration=0.2)
+        speaker = manifest.filter(speakers=["2"])
+
+        # THEN
+        #      the bounds are inclusive
+        assert set(by_id(short)) == {"1-10-0000", "2-20-0000"}
+        assert set(by_id(long)) == {"1-10-0000", "2-20-0001"}
+        assert set(by_id(speaker)) == {"2-20-0000", "2-20-0001"}
+
+    def test_dataset(self, corpus):
+        # GIVEN
+        #      the manifest of a corpus
+        root, audio = corpus
+        manifest = Manifest.build(str(root))
+
+        # WHEN
+        #      its utterances are loaded
+        dataset = manifest.dataset()
+
+        # THEN
+        #      lengths are those of the entries
+        #      the audio is that of each entry, in order
+        assert dataset.lengths() == [entry.num_samples for entry in manifest]
+        for entry, sample in zip(manifest, dataset):
+            assert sample.numpy().tolist() == pytest.approx(audio[entry.id].tolist())
+
+
+class TestGetManifest:
+    def test_built_once_and_rebuilt_once_removed(self, corpus, tmp_path):
+        # GIVEN
+        #      a corpus without a saved manifest
+        root, _ = corpus
+        path = tmp_path / "manifest.tsv"
+
+        # WHEN
+        #      the manifest is got, the corpus loses a chapter and it is got
+        #      again, then again once the saved manifest is removed
+        first = get_manifest(str(root), str(path))
+        shutil.rmtree(root / "2")
+        cached = get_manifest(str(root), str(path))
+        path.unlink()
+        rebuilt = get_manifest(str(root), str(path))
+
+        # THEN
+        #      the manifest is saved on first use, and loaded without a scan
+        #      it is only rescanned once removed
+        assert len(first) == len(cached) == 4
+        assert cached.entries == first.entries
+        assert set(by_id(rebuilt)) == {"1-10-0000", "1-10-0001"}
+        assert path.exists()
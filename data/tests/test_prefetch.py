@@ -0,0 +1,125 @@
+import threading
+
+import pytest
+import torch
+
+from data.prefetch import Prefetcher, pad_batch
+
+
+def samples():
+    # int16 audio of 4, 2 and 3 samples
+    return [
+        torch.tensor([1, 2, 3, 4], dtype=torch.int16),
+        torch.tensor([-16384, 16384], dtype=torch.int16),
+        torch.tensor([5, 6, 7], dtype=torch.int16),
+    ]
+
+
+class TestPadBatch:
+    def test_pcm_audio(self):
+        # GIVEN
+        #      int16 audio of different lengths
+        inputs = [
+            torch.tensor([16384, -32768], dtype=torch.int16),
+            torch.tensor([8192], dtype=torch.int16),
+        ]
+
+        # WHEN
+        #      it is padded into a batch
+        wavs, wav_lens = pad_batch(inputs)
+
+        # THEN
+        #      the batch is float audio, padded on the right with zeros
+        #      each length is relative to the longest input
+        assert wavs.dtype == torch.float32
+        assert wavs.tolist() == [[0.5, -1.0], [0.25, 0.0]]
+        assert wav_lens.tolist() == [1.0, 0.5]
+
+
+class TestPrefetcher:
+    def test_batches_in_order(self):
+        # GIVEN
+        #      a prefetcher over 3 samples, loading 2 batches ahead
+        prefetcher = Prefetcher(samples(), num_workers=2, depth=2)
+        batches = [[1], [0, 2], [2], [0]]
+
+        # WHEN
+        #      batches of the samples are iterated
+        loaded = list(prefetcher.iter_batches(batches))
+
+        # THEN
+        #      the batches are yielded in order, with their indices
+        #      each batch is padded as by pad_batch
+        assert [indices for indices, _ in loaded] == batches
+        for indices, (wavs, wav_lens) in loaded:
+            expected_wavs, expected_lens = pad_batch([samples()[i] for i in indices])
+            assert wavs.equal(expected_wavs)
+            assert wav_lens.equal(expected_lens)
+
+    def test_custom_preprocess(self):
+        # GIVEN
+        #      a prefetcher, and a preprocess function recording its thread
+        prefetcher = Prefetcher(samples())
+        threads = []
+
+        def preprocess(inputs):
+            threads.append(threading.current_thread())
+            return [input.shape[0] for input in inputs]
+
+        # WHEN
+        #      batches are iterated with the preprocess function
+        loaded = list(prefetcher.iter_batches([[0, 1], [2]], preprocess=preprocess))
+
+        # THEN
+        #      each batch is preprocessed on a background thread
+        assert loaded == [([0, 1], [4, 2]), ([2], [3])]
+        assert threading.main_thread() not in threads
+
+    def test_stops_early(self):
+        # GIVEN
+        #      a prefetcher over many batches
+        prefetcher = Prefetcher(samples(), depth=1)
+        batches = iter([[i % 3] for i in range(100)])
+
+        # WHEN
+        #      only the first batch is used
+        for indices, _ in prefetcher.iter_batches(batches):
+            break
+
+        # THEN
+        #      at most depth batches are loaded ahead of it
+        assert indices == [0]
+        assert len(list(batches)) >= 100 - 2
+
+    def test_passes_through_samples(self):
+        # GIVEN
+        #      a prefetcher
+        expected = samples()
+        prefetcher = Prefetcher(expected, num_workers=2, depth=3)
+
+        # WHEN
+        #      it is indexed, sliced and its lengths are read
+        sliced = prefetcher[1:]
+
+        # THEN
+        #      the samples are passed through
+        #      slices are prefetchers over the selected samples
+        assert len(prefetcher) == 3
+        assert prefetcher[1] is expected[1]
+        assert list(prefetcher) == expected
+        assert prefetcher.lengths() == [4, 2, 3]
+        assert isinstance(sliced, Prefetcher)
+        assert (sliced.num_workers, sliced.depth) == (2, 3)
+        assert sliced.lengths() == [2, 3]
+
+    def test_invalid_depth(self):
+        # GIVEN
+        #      a depth of 0
+        depth = 0
+
+        # WHEN
+        #      a prefetcher is made
+        # THEN
+        #      an error is raised
+        with pytest.raises(ValueError, match="depth"):
+            Prefetcher(samples(), depth=depth)
@@ -0,0 +1,92 @@
+import numpy as np
+import pytest
+import torch
+
+from data.resample import (
+    get_resampler,
+    load_audio,
+    num_samples,
+    resample,
+    resampled_length,
+)
+from data.tests.audio import pcm_audio, write_audio
+
+
+class TestLoadAudio:
+    def test_16khz(self, tmp_path):
+        # GIVEN
+        #      a 16kHz FLAC file of 16-bit PCM audio
+        path = tmp_path / "audio.flac"
+        audio = pcm_audio(1600, seed=0)
+        write_audio(path, audio)
+
+        # WHEN
+        #      it is loaded
+        loaded = load_audio(str(path))
+
+        # THEN
+        #      the audio is decoded exactly
+        assert loaded.dtype == torch.float32
+        assert np.array_equal(loaded.numpy(), audio)
+        assert num_samples(str(path)) == 1600
+
+    def test_8khz_stereo(self, tmp_path):
+        # GIVEN
+        #      an 8kHz WAV file with two channels
+        path = tmp_path / "audio.wav"
+        left, right = pcm_audio(800, seed=0), pcm_audio(800, seed=1)
+        write_audio(path, np.stack([left, right], axis=1), sample_rate=8000)
+
+        # WHEN
+        #      it is loaded at 16kHz
+        loaded = load_audio(str(path))
+
+        # THEN
+        #      the channels are averaged, then resampled to 16kHz
+        #      its length matches the one read from the header
+        expected = resample(torch.from_numpy((left + right) / 2), 8000)
+        assert loaded.shape == (1600,)
+        assert torch.allclose(loaded, expected, atol=1e-6)
+        assert num_samples(str(path)) == loaded.shape[0]
+
+
+class TestResample:
+    def test_same_rate(self):
+        # GIVEN
+        #      audio at 16kHz
+        wavs = torch.randn(2, 100)
+
+        # WHEN
+        #      it is resampled to 16kHz
+        resampled = resample(wavs, 16000)
+
+        # THEN
+        #      the audio is returned as it is
+        assert resampled is wavs
+
+    def test_resampler_is_cached(self):
+        # GIVEN
+        #      a resampler from 8kHz to 16kHz
+        resampler = get_resampler(8000, 16000)
+
+        # WHEN
+        #      a resampler between the same rates is asked for again
+        again = get_resampler(8000, 16000)
+
+        # THEN
+        #      the same resampler is returned
+        assert again is resampler
+
+    @pytest.mark.parametrize("orig_freq", [8000, 22050, 44100, 48000])
+    def test_resampled_length(self, orig_freq):
+        # GIVEN
+        #      audio of an odd number of samples at another rate
+        wavs = torch.randn(2, 1001)
+
+        # WHEN
+        #      it is resampled to 16kHz
+        resampled = resample(wavs, orig_freq)
+
+        # THEN
+        #      its length is as predicted without resampling
+        assert resampled.shape == (2, resampled_length(1001, orig_freq))
@@ -0,0 +1,124 @@
+import numpy as np
+import pytest
+
+from data.data import LibriSpeechDataset
+from data.manifest import Manifest, ManifestEntry
+from data.sampler import calibration_set, sample_manifest
+
+
+def manifest(durations):
+    # utterances of the given durations in seconds, at 16kHz
+    return Manifest(
+        ManifestEntry(
+            f"1-1-{i:04d}",
+            f"1-1-{i:04d}.flac",
+            int(duration * 16000),
+            16000,
+            "1",
+            "1",
+            "",
+        )
+        for i, duration in enumerate(durations)
+    )
+
+
+class TestSampleManifest:
+    def test_distinct_utterances(self):
+        # GIVEN
+        #      a manifest of 20 utterances
+        utterances = manifest(range(1, 21))
+
+        # WHEN
+        #      all of its utterances are chosen
+        chosen = sample_manifest(utterances, 20, seed=0)
+
+        # THEN
+        #      each utterance is chosen exactly once
+        assert sorted(entry.id for entry in chosen) == [
+            entry.id for entry in utterances
+        ]
+
+    def test_seed(self):
+        # GIVEN
+        #      a manifest, and the global numpy state
+        utterances = manifest(range(1, 21))
+        np.random.seed(0)
+        expected = np.random.random()
+        np.random.seed(0)
+
+        # WHEN
+        #      utterances are chosen twice with the same seed
+        first = sample_manifest(utterances, 5, seed=1337)
+        second = sample_manifest(utterances, 5, seed=1337)
+
+        # THEN
+        #      the same utterances are chosen
+        #      the global numpy state is left untouched
+        assert first.entries == second.entries
+        assert np.random.random() == expected
+
+    def test_strata(self):
+        # GIVEN
+        #      a manifest of 10 short and 10 long utterances, shuffled
+        durations = [1] * 10 + [100] * 10
+        np.random.default_rng(0).shuffle(durations)
+        utterances = manifest(durations)
+
+        # WHEN
+        #      4 utterances are chosen from 2 strata
+        chosen = sample_manifest(utterances, 4, seed=0, num_strata=2)
+
+        # THEN
+        #      short and long utterances are chosen in turn
+        assert chosen.durations() == [1, 100, 1, 100]
+
+    def test_max_seconds(self):
+        # GIVEN
+        #      a manifest of utterances of 10 and 100 seconds
+        utterances = manifest([10] * 5 + [100] * 5)
+
+        # WHEN
+        #      up to 10 utterances are chosen, of at most 120 seconds
+        chosen = sample_manifest(utterances, 10, seed=0, max_seconds=120)
+
+        # THEN
+        #      the total is at most 120 seconds
+        #      only utterances that would take the total over it are skipped
+        total = sum(chosen.durations())
+        skipped = set(utterances.entries) - set(chosen.entries)
+        assert total <= 120
+        assert all(total + entry.duration > 120 for entry in skipped)
+
+    @pytest.mark.parametrize(
+        "n, num_strata, match",
+        [(4, 1, "more utterances"), (2, 0, "num_strata")],
+    )
+    def test_invalid_arguments(self, n, num_strata, match):
+        # GIVEN
+        #      a manifest of 3 utterances
+        utterances = manifest([1, 2, 3])
+
+        # WHEN
+        #      too many utterances or too few strata are asked for
+        # THEN
+        #      an error is raised
+        with pytest.raises(ValueError, match=match):
+            sample_manifest(utterances, n, num_strata=num_strata)
+
+
+class TestCalibrationSet:
+    def test_calibration_set(self):
+        # GIVEN
+        #      a manifest of 100 utterances of 1 to 30 seconds
+        utterances = manifest(np.linspace(1, 30, 100))
+
+        # WHEN
+        #      the calibration set is chosen
+        samples = calibration_set(utterances)
+
+        # THEN
+        #      it is a lazy dataset of 10 distinct utterances
+        #      of at most 2 minutes in total
+        assert isinstance(samples, LibriSpeechDataset)
+        assert len(set(samples.paths)) == 10
+        assert sum(samples.lengths()) <= 120 * 16000
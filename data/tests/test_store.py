@@ -0,0 +1,163 @@
+import numpy as np
+import pytest
+import torch
+
+from data.data import LibriSpeechDataset, pcm_to_float
+from data.store import AudioStore, build_audio_store, get_audio_store, pack_audio
+from data.tests.audio import pcm_audio, write_audio
+
+
+def samples():
+    # float audio of 16-bit PCM values, of different lengths
+    return [torch.from_numpy(pcm_audio(length, seed=length)) for length in [5, 3, 8]]
+
+
+class TestAudioStore:
+    @pytest.mark.parametrize(
+        "dtype,torch_dtype", [(np.float32, torch.float32), (np.int16, torch.int16)]
+    )
+    def test_round_trip(self, tmp_path, dtype, torch_dtype):
+        # GIVEN
+        #      float audio tensors of 16-bit PCM values
+        expected = samples()
+
+        # WHEN
+        #      a store is built from them, and opened again
+        build_audio_store(expected, tmp_path / "store", dtype=dtype)
+        store = AudioStore.open(tmp_path / "store")
+
+        # THEN
+        #      utterances are in the stored dtype, with their lengths
+        #      they convert back to the original float audio
+        assert len(store) == 3
+        assert store.lengths() == [5, 3, 8]
+        for sample, expected_sample in zip(store, expected):
+            assert sample.dtype == torch_dtype
+            assert pcm_to_float(sample).equal(expected_sample)
+
+    def test_utterances_are_views_of_the_map(self, tmp_path):
+        # GIVEN
+        #      a store
+        store = build_audio_store(samples(), tmp_path / "store")
+
+        # WHEN
+        #      an utterance is read, and written to
+        sample = store[1]
+        sample[0] = 1.0
+
+        # THEN
+        #      it is a view of the memory-mapped audio, not a copy
+        #      the write is not written to the file
+        assert isinstance(store.audio, np.memmap)
+        assert np.shares_memory(sample.numpy(), store.audio)
+        assert AudioStore.open(tmp_path / "store")[1][0] != 1.0
+
+    def test_subsets(self, tmp_path):
+        # GIVEN
+        #      a store
+        expected = samples()
+        store = build_audio_store(expected, tmp_path / "store")
+
+        # WHEN
+        #      it is sliced, and indexed by a list
+        sliced = store[1:]
+        listed = store[[2, 0]]
+
+        # THEN
+        #      the subsets hold the selected utterances
+        assert sliced.lengths() == [3, 8]
+        assert listed.lengths() == [8, 5]
+        assert listed[0].equal(expected[2])
+        assert sliced[[1]][0].equal(expected[2])
+
+    def test_from_dataset(self, tmp_path):
+        # GIVEN
+        #      a lazily decoded dataset of audio files
+        paths = []
+        for length in [5, 3, 8]:
+            path = tmp_path / f"{length}.flac"
+            write_audio(path, pcm_audio(length, seed=length))
+            paths.append(str(path))
+        dataset = LibriSpeechDataset(paths)
+
+        # WHEN
+        #      a store is built from it by 2 workers
+        store = build_audio_store(dataset, tmp_path / "store", num_workers=2)
+
+        # THEN
+        #      the store holds the decoded audio, in order
+        for sample, expected_sample in zip(store, samples()):
+            assert sample.equal(expected_sample)
+
+    def test_unsupported_dtype(self, tmp_path):
+        # GIVEN
+        #      a dtype other than float32 or int16
+        # WHEN
+        #      a store is built
+        # THEN
+        #      a ValueError is raised
+        with pytest.raises(ValueError):
+            build_audio_store(samples(), tmp_path / "store", dtype=np.float64)
+
+
+class TestGetAudioStore:
+    def test_built_once(self, tmp_path):
+        # GIVEN
+        #      a store built on first use
+        get_audio_store(samples(), tmp_path / "store")
+
+        # WHEN
+        #      it is got again, from other samples
+        store = get_audio_store([torch.zeros(2)], tmp_path / "store")
+
+        # THEN
+        #      the existing store is opened
+        assert store.lengths() == [5, 3, 8]
+
+
+class TestPackAudio:
+    def test_int16_buffer(self):
+        # GIVEN
+        #      float audio tensors of 16-bit PCM values
+        expected = samples()
+
+        # WHEN
+        #      they are packed
+        store = pack_audio(expected)
+
+        # THEN
+        #      utterances are int16 views of a single in-memory buffer
+        #      they convert back to the original float audio
+        assert store.audio.dtype == np.int16
+        assert store.audio.shape == (16,)
+        for sample, expected_sample in zip(store, expected):
+            assert sample.dtype == torch.int16
+            assert np.shares_memory(sample.numpy(), store.audio)
+            assert pcm_to_float(sample).equal(expected_sample)
+
+    def test_clipping(self):
+        # GIVEN
+        #      float audio at and beyond full scale
+        audio = [torch.tensor([-1.5, -1.0, 0.5, 1.0, 1.5])]
+
+        # WHEN
+        #      it is packed as int16
+        store = pack_audio(audio)
+
+        # THEN
+        #      values beyond the int16 range are clipped
+        assert store[0].tolist() == [-32768, -32768, 16384, 32767, 32767]
+
+    def test_float32(self):
+        # GIVEN
+        #      float audio tensors
+        expected = samples()
+
+        # WHEN
+        #      they are packed as float32
+        store = pack_audio(expected, dtype=np.float32)
+
+        # THEN
+        #      the audio is unchanged
+        for sample, expected_sample in zip(store, expected):
+            assert sample.equal(expected_sample)
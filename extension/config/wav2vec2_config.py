@@ -42,10 +42,7 @@ def encoder_layers_config():
 
 def wav2vec2_config():
     model_config = ModelConfig.wav2vec2()
-    model = model_config.type.from_hparams(
-        source=model_config.src,
-        savedir=model_config.savedir,
-    )
+    model = model_config.load()
     module_config = {
         "encoder.enc": encoder_enc_config(),
         "encoder.wav2vec2.model.encoder.layers": encoder_layers_config(),
@@ -9,7 +9,9 @@ from torchquant import QModuleState, set_qmodule_state
 from torchquant.quantizers import AffineQuantizer
 from torchquant.range_observers import ExpAvgMinMax
 
-from benchmark.wer import compute_wer
+from benchmark.wer import StreamingWER
+from data.data import pcm_to_float
+from data.prefetch import Prefetcher
 from extension.extend_qwrapper import ExtendedQWrapper
 from quantization.utils import get_module, set_module
 
@@ -69,17 +71,32 @@ def set_module_modes(model, modules, mode):
         set_qmodule_state(get_module(model, module), mode)
 
 
+def _single_batches(samples):
+    # a Prefetcher decodes and pads upcoming samples in the background
+    if isinstance(samples, Prefetcher):
+        for _, batch in samples.iter_batches([[i] for i in range(len(samples))]):
+            yield batch
+    else:
+        for sample in samples:
+            yield pcm_to_float(sample).unsqueeze(0), torch.tensor([1.0])
+
+
 def calibrate(model, samples):
-    for sample in samples:
-        _ = model.transcribe_batch(sample.unsqueeze(0), torch.tensor([1.0]))
+    for wavs, wav_lens in _single_batches(samples):
+        _ = model.transcribe_batch(wavs, wav_lens)
 
 
-def measure_wer(model, samples, references):
-    hypotheses = []
-    for sample in samples:
-        output, _ = model.transcribe_batch(sample.unsqueeze(0), torch.tensor([1.0]))
-        hypotheses.append(output[0])
-    return compute_wer(references, hypotheses)
+def measure_wer(model, samples, references, max_wer=None):
+    # transcripts are scored as they are produced instead of being stored,
+    # if max_wer is given, stop once the final WER is certain to exceed it
+    scorer = StreamingWER()
+    total_ref_words = sum(len(reference.split()) for reference in references)
+    for (wavs, wav_lens), reference in zip(_single_batches(samples), references):
+        output, _ = model.transcribe_batch(wavs, wav_lens)
+        scorer.update(reference, output[0])
+        if max_wer is not None and scorer.lower_bound(total_ref_words) > max_wer:
+            break
+    return scorer.wer()
 
 
 def low_bit_benchmark(
@@ -9,9 +9,9 @@ sys.path.append("/home/justinlam19/dissertation")
 import gc
 from copy import deepcopy
 
-import numpy as np
-
-from data.data import get_librispeech_data, random_choice
+from benchmark.memory import model_memory, projected_low_bit_size
+from data.manifest import get_manifest
+from data.sampler import calibration_set
 from extension.config.wav2vec2_config import wav2vec2_config
 from extension.quantization import (
     calibrate,
@@ -23,10 +23,12 @@ from extension.quantization import (
 
 output_file_path = "output/extension_overall.txt"
 
-audios, references = get_librispeech_data("librispeech_dev_clean/LibriSpeech/dev-clean")
+manifest = get_manifest(
+    "librispeech_dev_clean/LibriSpeech/dev-clean", "output/dev_clean_manifest.tsv"
+)
+audios, references = manifest.dataset(), manifest.references()
 assert len(audios) == len(references)
-np.random.seed(1337)
-calibration_samples = random_choice(audios, 10)
+calibration_samples = calibration_set(manifest)
 n = 20
 audio_subset = audios[:n]
 ref_subset = references[:n]
@@ -56,6 +58,13 @@ bits_config = {
     "encoder.wav2vec2.model.feature_extractor": 5,
 }
 
+projected = projected_low_bit_size(model, bits_config)
+with open(output_file_path, "a+") as f:
+    f.write(
+        f"Original size (MB): {sum(model_memory(model).values()) / 2**20}\n"
+        f"Projected mixed resolution size (MB): {projected['total'] / 2**20}\n\n"
+    )
+
 quantize_weights = True
 quantize_activations = False
 quant_modes = get_quant_modes(quantize_weights, quantize_activations)
@@ -10,20 +10,21 @@ sys.path.append("/home/justinlam19/dissertation")
 
 
 import gc
-from copy import deepcopy
 
-import numpy as np
-
-from data.data import get_librispeech_data, random_choice
+from data.manifest import get_manifest
+from data.sampler import calibration_set
 from extension.config.wav2vec2_config import wav2vec2_config
 from extension.quantization import low_bit_benchmark
+from quantization.utils import clone_for_quantization
 
 output_file_path = "output/extension_per_layer_quant.txt"
 
-audios, references = get_librispeech_data("librispeech_dev_clean/LibriSpeech/dev-clean")
+manifest = get_manifest(
+    "librispeech_dev_clean/LibriSpeech/dev-clean", "output/dev_clean_manifest.tsv"
+)
+audios, references = manifest.dataset(), manifest.references()
 assert len(audios) == len(references)
-np.random.seed(1337)
-calibration_samples = random_choice(audios, 10)
+calibration_samples = calibration_set(manifest)
 n = 20
 audio_subset = audios[:n]
 ref_subset = references[:n]
@@ -33,7 +34,7 @@ asr_model, module_config = wav2vec2_config()
 with open(output_file_path, "w+") as f:
     for module, submodules in module_config.items():
         for bits in range(8, 0, -1):
-            m = deepcopy(asr_model)
+            m = clone_for_quantization(asr_model, submodules)
             wer = low_bit_benchmark(
                 model=m,
                 modules=submodules,
@@ -11,18 +11,19 @@ import gc
 import itertools
 from copy import deepcopy
 
-import numpy as np
-
-from data.data import get_librispeech_data, random_choice
+from data.manifest import get_manifest
+from data.sampler import calibration_set
 from extension.config.wav2vec2_config import wav2vec2_config
 from extension.quantization import low_bit_benchmark
 
 output_file_path = "output/extension_uniform_4bit.txt"
 
-audios, references = get_librispeech_data("librispeech_dev_clean/LibriSpeech/dev-clean")
+manifest = get_manifest(
+    "librispeech_dev_clean/LibriSpeech/dev-clean", "output/dev_clean_manifest.tsv"
+)
+audios, references = manifest.dataset(), manifest.references()
 assert len(audios) == len(references)
-np.random.seed(1337)
-calibration_samples = random_choice(audios, 10)
+calibration_samples = calibration_set(manifest)
 n = 20
 audio_subset = audios[:n]
 ref_subset = references[:n]
@@ -1,5 +1,5 @@
 from collections import OrderedDict
-from unittest.mock import MagicMock, call
+from unittest.mock import MagicMock
 
 import pytest
 import torch
@@ -155,20 +155,12 @@ class TestMeasureWER:
 class TestCalibrate:
     def test_calibrate(self):
         # GIVEN
-        #      model, modules, and mode are specified
-        #      modules are QWrapped
+        #      a float sample, and a 16-bit PCM sample as held by an AudioStore
         model = MagicMock()
         model.transcribe_batch = MagicMock()
-        mock_sample1_unsqueeze = 42
-        mock_sample2_unsqueeze = 1337
-        sample1 = MagicMock()
-        sample1.unsqueeze.return_value = mock_sample1_unsqueeze
-        sample2 = MagicMock()
-        sample2.unsqueeze.return_value = mock_sample2_unsqueeze
-        samples = [sample1, sample2]
-        expected_transcribe_calls = [
-            call(mock_sample1_unsqueeze, torch.tensor([1.0])),
-            call(mock_sample2_unsqueeze, torch.tensor([1.0])),
+        samples = [
+            torch.tensor([0.5, -0.25]),
+            torch.tensor([16384, -8192], dtype=torch.int16),
         ]
 
         # WHEN
@@ -176,8 +168,12 @@ class TestCalibrate:
         calibrate(model=model, samples=samples)
 
         # THEN
-        #      transcribe_batch is given correct inputs
-        model.transcribe_batch.assert_has_calls(expected_transcribe_calls)
+        #      transcribe_batch is given each sample as a float batch of one
+        calls = model.transcribe_batch.call_args_list
+        assert len(calls) == 2
+        for (wavs, wav_lens), _ in calls:
+            assert torch.equal(wavs, torch.tensor([[0.5, -0.25]]))
+            assert torch.equal(wav_lens, torch.tensor([1.0]))
 
 
 class TestMeasureWER:
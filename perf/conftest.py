@@ -0,0 +1,108 @@
+"""
+Performance regression suite, run offline on the tiny stand-in models of
+``config.tiny`` with
+
+    python -m pytest perf --perf [--update-baselines] [--perf-tolerance=0.5]
+
+The options are registered by the ``conftest.py`` at the root.
+
+Each test times a stage of the pipeline, keeping the best of a few runs, and
+fails if it is slower than its baseline in ``baselines.json`` by more than
+the tolerance. Baselines depend on the machine, so they should be recorded
+again with ``--update-baselines`` before comparing on another one.
+"""
+
+import json
+import os
+import time
+
+import pytest
+
+BASELINES_PATH = os.path.join(os.path.dirname(__file__), "baselines.json")
+
+
+def pytest_collection_modifyitems(config, items):
+    if config.getoption("--perf"):
+        return
+    skip = pytest.mark.skip(reason="performance suite, run with --perf")
+    perf_dir = os.path.dirname(__file__)
+    for item in items:
+        if str(item.path).startswith(perf_dir):
+            item.add_marker(skip)
+
+
+class Baselines:
+    """Best timings of the tests, stored in a JSON file.
+
+    Arguments
+    ---------
+    path : str
+        Path of the JSON file.
+    update : bool
+        Whether timings replace the baselines rather than being compared.
+    tolerance : float
+        Slowdown over a baseline, as a fraction, that is still a pass.
+    """
+
+    def __init__(self, path, update=False, tolerance=0.5):
+        self.path = path
+        self.update = update
+        self.tolerance = tolerance
+        self.entries = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                self.entries = json.load(f)
+
+    def check(self, name, seconds):
+        if self.update:
+            self.entries[name] = seconds
+            return
+        baseline = self.entries.get(name)
+        if baseline is None:
+            pytest.skip(f"no baseline for {name}, record one with --update-baselines")
+        assert seconds <= baseline * (1 + self.tolerance), (
+            f"{name} took {seconds:.4f}s, over its baseline of {baseline:.4f}s "
+            f"by more than {self.tolerance:.0%}"
+        )
+
+    def save(self):
+        with open(self.path, "w") as f:
+            json.dump(dict(sorted(self.entries.items())), f, indent=2)
+            f.write("\n")
+
+
+def best_time(fn, setup=None, repeats=5):
+    """Best wall time of ``repeats`` calls of ``fn``. If given, ``setup`` is
+    called before each, untimed, and its output passed to ``fn``."""
+    times = []
+    for _ in range(repeats):
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        fn(*args)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+@pytest.fixture(scope="session")
+def baselines(request):
+    baselines = Baselines(
+        BASELINES_PATH,
+        update=request.config.getoption("--update-baselines"),
+        tolerance=request.config.getoption("--perf-tolerance"),
+    )
+    yield baselines
+    if baselines.update:
+        baselines.save()
+
+
+@pytest.fixture
+def perf(request, baselines):
+    """Times a function with ``best_time`` and checks it against the
+    baseline of the test."""
+
+    def measure(fn, setup=None, repeats=5):
+        seconds = best_time(fn, setup, repeats)
+        baselines.check(request.node.nodeid.split("::", 1)[1], seconds)
+        return seconds
+
+    return measure
@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+import torch
+
+from benchmark.benchmark import benchmark
+from benchmark.wer import compute_wer
+from config.config import ModelConfig
+from quantization.quantization import custom_quantize
+
+# modules quantized by the overall scripts
+QUANTIZED_MODULES = {
+    "tiny_wav2vec2": {
+        "dynamic": ["encoder.wav2vec2.model.encoder.layers", "encoder.enc"],
+        "static": [
+            "encoder.wav2vec2.model.feature_projection",
+            "encoder.wav2vec2.model.feature_extractor",
+        ],
+    },
+    "tiny_crdnn": {
+        "dynamic": [
+            "encoder.model.RNN.rnn",
+            "encoder.model.DNN",
+            "decoder.dec",
+            "decoder.fc.w",
+        ],
+        "static": ["encoder.model.CNN"],
+    },
+}
+
+
+def random_audio(num_samples, seconds=(1.0, 3.0), seed=0):
+    generator = torch.Generator().manual_seed(seed)
+    lengths = torch.linspace(*seconds, num_samples) * 16000
+    return [0.1 * torch.randn(int(length), generator=generator) for length in lengths]
+
+
+def random_transcripts(num_transcripts, num_words=(5, 30), seed=0):
+    rng = np.random.default_rng(seed)
+    vocab = [f"word{i}" for i in range(500)]
+    return [
+        " ".join(rng.choice(vocab, rng.integers(*num_words)))
+        for _ in range(num_transcripts)
+    ]
+
+
+class TestQuantizationPerf:
+    @pytest.mark.parametrize("name", ["tiny_wav2vec2", "tiny_crdnn"])
+    def test_custom_quantize(self, perf, name):
+        model_config = getattr(ModelConfig, name)()
+        calibration_samples = random_audio(4)
+
+        perf(
+            lambda model: custom_quantize(
+                model=model,
+                dynamic_modules=QUANTIZED_MODULES[name]["dynamic"],
+                static_modules=QUANTIZED_MODULES[name]["static"],
+                calibration_samples=calibration_samples,
+            ),
+            setup=model_config.load,
+            repeats=3,
+        )
+
+    @pytest.mark.parametrize("name", ["tiny_wav2vec2", "tiny_crdnn"])
+    def test_wrap_and_calibrate(self, perf, name):
+        pytest.importorskip("torchquant")
+        from extension.quantization import (
+            calibrate,
+            get_quant_modes,
+            set_module_modes,
+            wrap_modules,
+        )
+
+        model_config = getattr(ModelConfig, name)()
+        modules = QUANTIZED_MODULES[name]["dynamic"]
+        calibration_samples = random_audio(4)
+        modes = get_quant_modes(weight=True, act=False)
+
+        def wrap_and_calibrate(model):
+            wrap_modules(model, modules, 8, True, False)
+            set_module_modes(model, modules, modes["calibration"])
+            calibrate(model, calibration_samples)
+
+        perf(wrap_and_calibrate, setup=model_config.load, repeats=3)
+
+
+class TestBenchmarkPerf:
+    @pytest.mark.parametrize("name", ["tiny_wav2vec2", "tiny_crdnn"])
+    @pytest.mark.parametrize("batch_size", [1, 4])
+    def test_benchmark(self, perf, name, batch_size):
+        model = getattr(ModelConfig, name)().load()
+        samples = random_audio(8)
+        references = random_transcripts(8)
+
+        perf(
+            lambda: benchmark(
+                model, samples, references, batch_size=batch_size, warmup=2
+            ),
+            repeats=3,
+        )
+
+    @pytest.mark.parametrize("num_transcripts", [100, 2000])
+    def test_compute_wer(self, perf, num_transcripts):
+        references = random_transcripts(num_transcripts, seed=0)
+        hypotheses = random_transcripts(num_transcripts, seed=1)
+
+        perf(lambda: compute_wer(references, hypotheses))
@@ -0,0 +1,102 @@
+"""
+Calibration of the observers inserted by static quantization.
+
+Observers only need the activations of the modules that they sit in, so when
+all of these modules are inside the encoder, calibration runs the encoder
+alone, on padded batches, and stops it as soon as every observed module has
+run, skipping both the rest of the encoder and all of the decoding.
+"""
+
+import torch
+
+from data.data import length_bucketed_batches, pcm_to_float, sample_lengths
+from data.prefetch import pad_batch
+from quantization.utils import get_module
+
+
+class _StopForward(Exception):
+    """Raised by a forward hook to cut a forward pass short."""
+
+
+def calibration_part(modules):
+    """Part of the model (a key of ``model.mods``) that is enough to run all
+    of the modules, or None if they span several parts, e.g. both the
+    encoder and the decoder."""
+    parts = {module.split(".")[0] for module in modules}
+    return parts.pop() if len(parts) == 1 else None
+
+
+def calibration_batches(samples, batch_size):
+    """Padded batches of samples of similar lengths, and their relative lengths.
+
+    At a batch size of 1, samples are used unpadded, in order. 16-bit PCM
+    samples, e.g. from an AudioStore, are scaled to float either way."""
+    if batch_size == 1:
+        for sample in samples:
+            yield pcm_to_float(sample).unsqueeze(0), torch.tensor([1.0])
+        return
+    batches = length_bucketed_batches(sample_lengths(samples), batch_size)
+    for indices in batches:
+        yield pad_batch([samples[i] for i in indices])
+
+
+def calibrate_observers(model, modules, samples, batch_size=1):
+    """Runs the calibration samples through as little of the model as feeds
+    the observed modules, see ``run_modules``.
+
+    Arguments
+    ---------
+    model : EncoderASR | EncoderDecoderASR
+        Model prepared for static quantization.
+    modules : list[str]
+        Names of the observed modules, e.g. ``encoder.model.CNN``.
+    samples : list[torch.Tensor] | LibriSpeechDataset | AudioStore
+        1D audio tensors, sampled at 16kHz.
+    batch_size : int
+        Maximum number of samples run together.
+    """
+    run_modules(model, modules, calibration_batches(samples, batch_size))
+
+
+def run_modules(model, modules, batches):
+    """Runs batches through as little of the model as runs all of the modules.
+
+    If the modules are all in the encoder, only the encoder is run, up to
+    the last of the modules to run, assuming that each module runs once per
+    forward pass. Otherwise, whole batches are transcribed.
+
+    Arguments
+    ---------
+    model : EncoderASR | EncoderDecoderASR
+        Model to be run.
+    modules : list[str]
+        Names of the modules, e.g. ``encoder.model.CNN``.
+    batches : Iterable[tuple[torch.Tensor, torch.Tensor]]
+        Padded waveforms and their relative lengths.
+    """
+    if calibration_part(modules) != "encoder":
+        for wavs, wav_lens in batches:
+            model.transcribe_batch(wavs, wav_lens)
+        return
+
+    # modules that have not run yet in the current forward pass
+    pending = set()
+
+    def stop_when_done(module, inputs, output):
+        pending.discard(module)
+        if not pending:
+            raise _StopForward
+
+    targets = [get_module(model, module) for module in modules]
+    handles = [module.register_forward_hook(stop_when_done) for module in targets]
+    try:
+        with torch.no_grad():
+            for wavs, wav_lens in batches:
+                pending.update(targets)
+                try:
+                    model.encode_batch(wavs, wav_lens)
+                except _StopForward:
+                    pass
+    finally:
+        for handle in handles:
+            handle.remove()
@@ -0,0 +1,142 @@
+"""
+Planning of chains of statically quantized modules that feed each other, so
+that activations stay quantized from one module to the next, instead of being
+dequantized at the exit of one module only to be quantized again at the
+entry of the next.
+
+Chains are found by running a sample through the model and recording which
+tensors each module takes and returns. A module feeds the next one if the
+next one's input is its output, or a view of it (e.g. a transpose), not
+modified in place in between, and no other module takes that output.
+Functional ops are not seen, so a module whose output is also used by a
+functional op, e.g. in a residual sum, must not be passed to the planner
+along with the module after it.
+"""
+
+import torch
+
+from quantization.calibration import calibration_batches, calibration_part
+from quantization.utils import get_module
+
+
+def _snapshot(tensor):
+    # the tensor is kept alive until the trace is compared, so that the
+    # storage of a freed output cannot be reused by an unrelated tensor, and
+    # its version tells whether it was modified in place since
+    return (tensor, tensor._version) if torch.is_tensor(tensor) else None
+
+
+def _same_tensor(a, b):
+    # whether b is a, or a view of it, unmodified in between
+    return (
+        a is not None
+        and b is not None
+        and a[0].untyped_storage().data_ptr() == b[0].untyped_storage().data_ptr()
+        and a[1] == b[1]
+    )
+
+
+def _trace(model, modules, sample):
+    # inputs and outputs of the modules, and inputs of every leaf module
+    inputs = {module: [] for module in modules}
+    outputs = {module: [] for module in modules}
+    leaf_inputs = []
+    handles = []
+    for module in modules:
+
+        def record_input(_, args, module=module):
+            inputs[module].append(_snapshot(args[0]) if args else None)
+
+        def record_output(_, args, output, module=module):
+            outputs[module].append(_snapshot(output))
+
+        handles.append(
+            get_module(model, module).register_forward_pre_hook(record_input)
+        )
+        handles.append(get_module(model, module).register_forward_hook(record_output))
+    for name, leaf in model.mods.named_modules():
+        if len(leaf._modules) == 0:
+
+            def record_leaf(_, args, name=name):
+                if args and torch.is_tensor(args[0]):
+                    leaf_inputs.append((name, _snapshot(args[0])))
+
+            handles.append(leaf.register_forward_pre_hook(record_leaf))
+
+    # the whole part is run, so that every use of the outputs is seen
+    wavs, wav_lens = next(calibration_batches([sample], 1))
+    try:
+        with torch.no_grad():
+            if calibration_part(modules) == "encoder":
+                model.encode_batch(wavs, wav_lens)
+            else:
+                model.transcribe_batch(wavs, wav_lens)
+    finally:
+        for handle in handles:
+            handle.remove()
+    calls = {module: list(zip(inputs[module], outputs[module])) for module in modules}
+    return calls, leaf_inputs
+
+
+def _inside(name, module):
+    return name == module or name.startswith(module + ".")
+
+
+def plan_chains(model, modules, samples):
+    """Finds chains of statically quantized modules, each feeding the next.
+
+    Only the first sample is run. Modules that run more than once, or whose
+    output is not a single tensor, neither feed nor are fed by another.
+
+    Arguments
+    ---------
+    model : EncoderASR | EncoderDecoderASR
+        Model to be quantized, with the modules not yet wrapped.
+    modules : list[str]
+        Names of the modules to be statically quantized.
+    samples : list[torch.Tensor]
+        1D audio tensors, sampled at 16kHz.
+
+    Returns
+    -------
+    list[list[str]]
+        Chains of at least two modules, in the order that they run.
+    """
+    model.eval()
+    calls, leaf_inputs = _trace(model, modules, samples[0])
+    once = {module: calls[module][0] for module in modules if len(calls[module]) == 1}
+
+    next_module = {}
+    for producer, (_, output) in once.items():
+        # modules taking the output, other than the leaves of the producer
+        consumers = {
+            module
+            for module, (input, _) in once.items()
+            if module != producer and _same_tensor(input, output)
+        }
+        if len(consumers) != 1:
+            continue
+        consumer = consumers.pop()
+        others = [
+            name
+            for name, input in leaf_inputs
+            if _same_tensor(input, output)
+            and not _inside(name, producer)
+            and not _inside(name, consumer)
+        ]
+        if not others:
+            next_module[producer] = consumer
+
+    chains = []
+    starts = set(next_module) - set(next_module.values())
+    for module in sorted(starts, key=modules.index):
+        chain = [module]
+        while chain[-1] in next_module:
+            chain.append(next_module[chain[-1]])
+        chains.append(chain)
+    return chains
+
+
+def format_chains(chains):
+    """Formats the output of ``plan_chains`` as lines of text."""
+    return "".join(f"Quantized chain: {' -> '.join(chain)}\n" for chain in chains)
@@ -0,0 +1,177 @@
+"""
+Fusion of modules before static quantization, so that e.g. a convolution and
+the activation after it run as a single quantized op, without quantizing and
+dequantizing in between.
+
+Patterns are found by running a sample through the model and recording the
+order in which the leaf modules under the given paths run, and which of them
+feed each other directly. Patterns that PyTorch has no fused kernel for, e.g.
+a convolution followed by a LayerNorm and a GELU, are reported instead.
+"""
+
+import itertools
+
+import torch
+import torch.nn as nn
+from torch.ao.quantization.fuser_method_mappings import get_fuser_method
+
+from quantization.calibration import calibration_batches, run_modules
+
+# modules that can start a fused op
+HEADS = (nn.Conv1d, nn.Conv2d, nn.Conv3d, nn.Linear, nn.modules.batchnorm._BatchNorm)
+
+# modules that could be folded into the op before them
+FOLLOWERS = (
+    nn.modules.batchnorm._BatchNorm,
+    nn.modules.instancenorm._InstanceNorm,
+    nn.LayerNorm,
+    nn.GroupNorm,
+    nn.ReLU,
+    nn.ReLU6,
+    nn.LeakyReLU,
+    nn.GELU,
+    nn.ELU,
+    nn.SiLU,
+    nn.Hardswish,
+    nn.Tanh,
+    nn.Sigmoid,
+)
+
+# modules that return their input in eval mode, so do not break a pattern
+PASSTHROUGH = (nn.Identity, nn.modules.dropout._DropoutNd)
+
+
+def _is_fusable(types):
+    try:
+        return get_fuser_method(tuple(types)) is not None
+    except AssertionError:
+        return False
+
+
+def _leaf_calls(model, modules, sample):
+    # leaf modules under the paths, in the order that they run, with the
+    # storage of their first input and of their output
+    calls = []
+    handles = []
+    for path in modules:
+        root = model.mods.get_submodule(path)
+        for name, module in root.named_modules(prefix=path):
+            if len(module._modules) > 0 or isinstance(module, PASSTHROUGH):
+                continue
+
+            def record(module, inputs, output, name=name, path=path):
+                if inputs and torch.is_tensor(inputs[0]) and torch.is_tensor(output):
+                    calls.append(
+                        (
+                            name,
+                            path,
+                            module,
+                            inputs[0].untyped_storage().data_ptr(),
+                            output.untyped_storage().data_ptr(),
+                        )
+                    )
+
+            handles.append(module.register_forward_hook(record))
+    try:
+        run_modules(
+            model, modules, itertools.islice(calibration_batches([sample], 1), 1)
+        )
+    finally:
+        for handle in handles:
+            handle.remove()
+    return calls
+
+
+def find_fusions(model, modules, sample):
+    """Finds chains of modules under the given paths that could be fused.
+
+    A chain is a convolution, linear or batch norm module followed by up to
+    two normalization or activation modules, each fed directly by the output
+    of the one before, all under the same path and each run only once.
+
+    Arguments
+    ---------
+    model : EncoderASR | EncoderDecoderASR
+        Model to be searched.
+    modules : list[str]
+        Paths to search under, e.g. ``encoder.model.CNN``.
+    sample : torch.Tensor
+        1D audio tensor, sampled at 16kHz, run to find the chains.
+
+    Returns
+    -------
+    dict
+        ``fused`` lists the names of each chain that PyTorch can fuse,
+        ``unsupported`` the names and types of each chain that it cannot.
+    """
+    model.eval()
+    calls = _leaf_calls(model, modules, sample)
+    num_calls = {}
+    for name, *_ in calls:
+        num_calls[name] = num_calls.get(name, 0) + 1
+
+    fused = []
+    unsupported = []
+    i = 0
+    while i < len(calls):
+        name, path, module, _, _ = calls[i]
+        if not isinstance(module, HEADS) or num_calls[name] > 1:
+            i += 1
+            continue
+        chain = [calls[i]]
+        for call in calls[i + 1 : i + 3]:
+            next_name, next_path, next_module, input_ptr, _ = call
+            if (
+                not isinstance(next_module, FOLLOWERS)
+                or num_calls[next_name] > 1
+                or next_path != path
+                or input_ptr != chain[-1][4]
+            ):
+                break
+            chain.append(call)
+        if len(chain) == 1:
+            i += 1
+            continue
+
+        # the longest fusable start of the chain
+        for length in range(len(chain), 1, -1):
+            if _is_fusable(type(call[2]) for call in chain[:length]):
+                fused.append([call[0] for call in chain[:length]])
+                i += length
+                break
+        else:
+            unsupported.append(
+                {
+                    "modules": [call[0] for call in chain],
+                    "types": [type(call[2]).__name__ for call in chain],
+                }
+            )
+            i += len(chain)
+    return {"fused": fused, "unsupported": unsupported}
+
+
+def fuse_for_quantization(model, modules, samples):
+    """Fuses the fusable chains of modules under the given paths, in place.
+
+    Only the first sample is run, to find the chains, see ``find_fusions``.
+
+    Returns
+    -------
+    dict
+        The chains found by ``find_fusions``.
+    """
+    report = find_fusions(model, modules, samples[0])
+    if report["fused"]:
+        torch.ao.quantization.fuse_modules(model.mods, report["fused"], inplace=True)
+    return report
+
+
+def format_fusions(report):
+    """Formats the output of ``fuse_for_quantization`` as lines of text."""
+    lines = [f"Fused: {' + '.join(names)}" for names in report["fused"]]
+    lines += [
+        f"No fused kernel: {' + '.join(chain['modules'])} "
+        f"({', '.join(chain['types'])})"
+        for chain in report["unsupported"]
+    ]
+    return "\n".join(lines) + "\n"
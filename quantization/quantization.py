@@ -5,6 +5,9 @@ Custom function for quantizing a given model with a mix of quantization approach
 import torch
 import torch.nn as nn
 
+from quantization.calibration import calibrate_observers
+from quantization.chains import plan_chains
+from quantization.fusion import fuse_for_quantization
 from quantization.static_quant import StaticQuant
 from quantization.utils import get_module, set_module
 
@@ -17,6 +20,9 @@ def custom_quantize(
     dynamic_targets=None,
     dynamic_dtype=torch.qint8,
     static_qconfig=torch.ao.quantization.default_qconfig,
+    calibration_batch_size=1,
+    fuse=False,
+    keep_quantized=False,
 ):
     """Performs in-place quantization of an ASR model
 
@@ -53,10 +59,25 @@ def custom_quantize(
         The quantization config for static quantization, which, among other
         things, specifies the observer modules that will be inserted
         and the resolution of quantization.
+    calibration_batch_size : int
+        Maximum number of calibration samples run together. Larger batches
+        are faster, but padding is seen by the observers too.
+    fuse : bool
+        Whether to fuse chains of modules inside the static modules, such as
+        a convolution and its activation, before static quantization.
+    keep_quantized : bool
+        Whether activations stay quantized between static modules that feed
+        each other, so that only the first module of such a chain quantizes
+        its input and only the last one dequantizes its output.
 
     Returns
     -------
-    None
+    dict | None
+        If ``fuse``, the chains of modules that were fused and those that
+        could not be (``fused`` and ``unsupported``, see
+        ``fuse_for_quantization``). If ``keep_quantized``, the chains of
+        static modules that activations stay quantized across (``chains``,
+        see ``plan_chains``).
     """
 
     ##################################################
@@ -73,13 +94,16 @@ def custom_quantize(
     ##################################################
     # Static Quantization                            #
     ##################################################
-    static_quantize(
+    return static_quantize(
         model=model,
         modules=static_modules,
         calibration_samples=calibration_samples,
         qconfig=static_qconfig,
         prepare_fn=torch.ao.quantization.prepare,
         convert_fn=torch.ao.quantization.convert,
+        batch_size=calibration_batch_size,
+        fuse_fn=fuse_for_quantization if fuse else None,
+        plan_fn=plan_chains if keep_quantized else None,
     )
 
 
@@ -105,25 +129,57 @@ def dynamic_quantize(model, modules, targets, dtype, quantize_fn):
             )
 
 
-# Get prepare_fn, convert_fn as parameters so the dependencies can be mocked
+# Get prepare_fn, convert_fn, fuse_fn, plan_fn as parameters so the dependencies
+# can be mocked
 def static_quantize(
-    model, modules, calibration_samples, qconfig, prepare_fn, convert_fn
+    model,
+    modules,
+    calibration_samples,
+    qconfig,
+    prepare_fn,
+    convert_fn,
+    batch_size=1,
+    fuse_fn=None,
+    plan_fn=None,
 ):
     if modules is not None and len(modules) > 0:
         if calibration_samples is None or len(calibration_samples) == 0:
             raise Exception("No calibration samples provided for static quantization.")
 
-        for module in modules:
-            set_module(
-                model,
-                module,
-                StaticQuant(get_module(model, module)),
-            )
-            get_module(model, module).qconfig = qconfig
+        # fusion and planning find modules by name, so precede wrapping
+        plan = {}
+        if fuse_fn is not None:
+            plan.update(fuse_fn(model, modules, calibration_samples))
+        if plan_fn is not None:
+            plan["chains"] = plan_fn(model, modules, calibration_samples)
 
+        wrap_static(model, modules, qconfig, plan.get("chains", []))
         prepare_fn(model=model, inplace=True)
 
-        for sample in calibration_samples:
-            model.transcribe_batch(sample.unsqueeze(0), torch.tensor([1.0]))
+        # only runs as much of the model as feeds the observers
+        calibrate_observers(model, modules, calibration_samples, batch_size)
 
         convert_fn(module=model, inplace=True)
+        return plan or None
+
+
+def wrap_static(model, modules, qconfig, chains=()):
+    """Wraps the modules with StaticQuant, to be statically quantized with qconfig.
+
+    Activations stay quantized between consecutive modules of each of the
+    chains, see ``plan_chains``.
+    """
+    # modules that are fed, or feed, another one in a chain
+    fed = {module for chain in chains for module in chain[1:]}
+    feeding = {module for chain in chains for module in chain[:-1]}
+    for module in modules:
+        set_module(
+            model,
+            module,
+            StaticQuant(
+                get_module(model, module),
+                quantize_input=module not in fed,
+                dequantize_output=module not in feeding,
+            ),
+        )
+        get_module(model, module).qconfig = qconfig
@@ -0,0 +1,270 @@
+"""
+Saving and loading of quantized models, so that a quantized model is ready
+to run after a single load, without quantizing and calibrating again.
+
+An artifact holds the ModelConfig of the model, its hyperparams YAML, the
+files of the pretrained state that the modules do not hold (e.g. the
+tokenizer and normalization statistics), the configs and feature extractors
+of its HuggingFace models, the arguments of ``custom_quantize`` (which
+modules were quantized, and how) and the state dict of the modules,
+including the packed quantized weights and the scales and zero points of the
+``StaticQuant`` wrappers. Loading builds a skeleton of the model from the
+YAML, without fetching anything from the hub or loading any pretrained
+weights, turns it into an uncalibrated quantized model with the same module
+layout, and loads the state dict into it.
+"""
+
+import contextlib
+import copy
+import tempfile
+import types
+import warnings
+from pathlib import Path
+
+import torch
+from hyperpyyaml import load_hyperpyyaml
+from speechbrain.utils.checkpoints import (
+    DEFAULT_TRANSFER_HOOKS,
+    PARAMFILE_EXT,
+    get_default_hook,
+    torch_parameter_transfer,
+)
+from speechbrain.utils.parameter_transfer import Pretrainer
+
+from quantization.quantization import dynamic_quantize, wrap_static
+
+# version of the artifact layout, bumped on incompatible changes
+FORMAT_VERSION = 3
+
+
+def _pretrained_files(model, model_config):
+    # hyperparams of the model, and the files of the loadables whose state is
+    # not held by the state dict of the modules; stand-ins built by a factory
+    # have neither
+    if model_config.factory is not None:
+        return None, {}
+    hparams = Path(model_config.savedir, "hyperparams.yaml").read_text()
+    pretrainer = model.hparams.pretrainer
+    files = {}
+    for name, loadable in pretrainer.loadables.items():
+        if not pretrainer.is_loadable(name):
+            continue
+        if (
+            name not in pretrainer.custom_hooks
+            and get_default_hook(loadable, DEFAULT_TRANSFER_HOOKS)
+            is torch_parameter_transfer
+        ):
+            continue
+        files[name] = Path(pretrainer.paths[name]).read_bytes()
+    return hparams, files
+
+
+def _hub_files(model):
+    # config and feature extractor of each HuggingFace model, by the source
+    # that its wrapper fetched them from
+    try:
+        from speechbrain.integrations.huggingface.huggingface import (
+            HFTransformersInterface,
+        )
+    except ImportError:
+        return {}
+    return {
+        module.config.name_or_path: {
+            "config": module.config,
+            "feature_extractor": getattr(module, "feature_extractor", None),
+        }
+        for module in model.modules()
+        if isinstance(module, HFTransformersInterface)
+    }
+
+
+@contextlib.contextmanager
+def _without_hub(hub_files):
+    # SpeechBrain's HuggingFace wrappers fetch the config, feature extractor
+    # and weights of the hub model when built; the skeleton takes the config
+    # and feature extractor from the artifact, and only needs the
+    # architecture of the model
+    try:
+        from speechbrain.integrations.huggingface import huggingface
+    except ImportError:
+        yield
+        return
+    auto_config = huggingface.AutoConfig
+    auto_feature_extractor = huggingface.AutoFeatureExtractor
+
+    def config(source, return_unused_kwargs=False, **kwargs):
+        if source not in hub_files:
+            return auto_config.from_pretrained(
+                source, return_unused_kwargs=return_unused_kwargs, **kwargs
+            )
+        config = copy.deepcopy(hub_files[source]["config"])
+        return (config, {}) if return_unused_kwargs else config
+
+    def feature_extractor(source, **kwargs):
+        if hub_files.get(source, {}).get("feature_extractor") is None:
+            return auto_feature_extractor.from_pretrained(source, **kwargs)
+        return copy.deepcopy(hub_files[source]["feature_extractor"])
+
+    def from_config(self, source, save_path, cache_dir, device=None, **kwargs):
+        self.model = self.auto_class.from_config(self.config)
+
+    original = huggingface.HFTransformersInterface._from_pretrained
+    huggingface.AutoConfig = types.SimpleNamespace(from_pretrained=config)
+    huggingface.AutoFeatureExtractor = types.SimpleNamespace(
+        from_pretrained=feature_extractor
+    )
+    huggingface.HFTransformersInterface._from_pretrained = from_config
+    try:
+        yield
+    finally:
+        huggingface.AutoConfig = auto_config
+        huggingface.AutoFeatureExtractor = auto_feature_extractor
+        huggingface.HFTransformersInterface._from_pretrained = original
+
+
+def _skeleton(artifact):
+    # model with the modules of the artifact, randomly initialized, and the
+    # rest of its pretrained state loaded from the files of the artifact
+    model_config = artifact["model_config"]
+    if artifact["hparams"] is None:
+        return model_config.load()
+    with _without_hub(artifact["hub_files"]):
+        hparams = load_hyperpyyaml(artifact["hparams"])
+    files = artifact["pretrained_files"]
+    if files:
+        pretrainer = hparams["pretrainer"]
+        with tempfile.TemporaryDirectory() as directory:
+            for name, data in files.items():
+                Path(directory, name + PARAMFILE_EXT).write_bytes(data)
+            Pretrainer(
+                collect_in=directory,
+                loadables={name: pretrainer.loadables[name] for name in files},
+                custom_hooks={
+                    name: hook
+                    for name, hook in pretrainer.custom_hooks.items()
+                    if name in files
+                },
+            ).load_collected()
+    return model_config.type(modules=hparams["modules"], hparams=hparams)
+
+
+def save_quantized(
+    model,
+    model_config,
+    path,
+    dynamic_modules=None,
+    static_modules=None,
+    dynamic_targets=None,
+    dynamic_dtype=torch.qint8,
+    static_qconfig=torch.ao.quantization.default_qconfig,
+    fused_modules=None,
+    static_chains=None,
+):
+    """Saves a model quantized by ``custom_quantize`` to a single file.
+
+    The file holds everything needed to run the model, so that neither the
+    pretrained savedir nor a download is needed to load it. This includes
+    the configs and feature extractors of its HuggingFace models, which
+    SpeechBrain's wrappers would otherwise fetch from the hub.
+
+    Arguments
+    ---------
+    model : EncoderASR | EncoderDecoderASR
+        Quantized model.
+    model_config : ModelConfig
+        Config that the model was loaded from, with ``load``.
+    path : str
+        Path of the artifact.
+    dynamic_modules, static_modules, dynamic_targets, dynamic_dtype, static_qconfig
+        Arguments that ``custom_quantize`` was called with.
+    fused_modules : list[list[str]]
+        Chains of modules fused before quantization, i.e. ``fused`` of the
+        report returned by ``custom_quantize`` with ``fuse=True``.
+    static_chains : list[list[str]]
+        Chains of static modules that activations stay quantized across,
+        i.e. ``chains`` of the report returned by ``custom_quantize`` with
+        ``keep_quantized=True``.
+    """
+    hparams, files = _pretrained_files(model, model_config)
+    torch.save(
+        {
+            "format_version": FORMAT_VERSION,
+            "model_config": model_config,
+            "hparams": hparams,
+            "pretrained_files": files,
+            "hub_files": _hub_files(model),
+            "recipe": {
+                "dynamic_modules": list(dynamic_modules or []),
+                "static_modules": list(static_modules or []),
+                "dynamic_targets": dynamic_targets,
+                "dynamic_dtype": dynamic_dtype,
+                "static_qconfig": static_qconfig,
+                "fused_modules": list(fused_modules or []),
+                "static_chains": list(static_chains or []),
+            },
+            "state_dict": model.mods.state_dict(),
+        },
+        path,
+    )
+
+
+def load_quantized(path, mmap=True):
+    """Loads a quantized model saved by ``save_quantized``.
+
+    The model is built from the hyperparams in the artifact, and its weights
+    are taken from the artifact only, so that no pretrained weights are
+    fetched, loaded or quantized again. The artifact is unpickled, and its
+    YAML can run arbitrary code, so it must come from a trusted source.
+
+    Arguments
+    ---------
+    path : str
+        Path of the artifact.
+    mmap : bool
+        Whether to memory-map the file, so that unquantized weights are
+        paged in from disk rather than copied into memory, in place of those
+        of the skeleton.
+
+    Returns
+    -------
+    EncoderASR | EncoderDecoderASR
+        The quantized model, in eval mode.
+    """
+    artifact = torch.load(path, mmap=mmap, weights_only=False)
+    if artifact["format_version"] != FORMAT_VERSION:
+        raise ValueError(
+            f"Artifact format {artifact['format_version']} is not supported, "
+            f"expected {FORMAT_VERSION}"
+        )
+    model = _skeleton(artifact)
+    recipe = artifact["recipe"]
+
+    dynamic_quantize(
+        model=model,
+        modules=recipe["dynamic_modules"],
+        targets=recipe["dynamic_targets"],
+        dtype=recipe["dynamic_dtype"],
+        quantize_fn=torch.quantization.quantize_dynamic,
+    )
+    if recipe["fused_modules"]:
+        model.eval()
+        torch.ao.quantization.fuse_modules(
+            model.mods, recipe["fused_modules"], inplace=True
+        )
+    if recipe["static_modules"]:
+        wrap_static(
+            model,
+            recipe["static_modules"],
+            recipe["static_qconfig"],
+            recipe["static_chains"],
+        )
+        torch.ao.quantization.prepare(model=model, inplace=True)
+        with warnings.catch_warnings():
+            # observers have seen no data, the scales and zero points are
+            # loaded from the state dict below
+            warnings.simplefilter("ignore")
+            torch.ao.quantization.convert(module=model, inplace=True)
+
+    model.mods.load_state_dict(artifact["state_dict"], assign=True)
+    model.eval()
+    return model
@@ -7,11 +7,19 @@ from torch.ao.quantization import DeQuantStub, QuantStub
 
 
 class StaticQuant(nn.Module):
-    def __init__(self, model):
+    """Brackets a module with stubs, so that it is statically quantized.
+
+    Inside a chain of statically quantized modules that feed each other,
+    activations stay quantized from one module to the next: only the first
+    module quantizes its input (``quantize_input``) and only the last one
+    dequantizes its output (``dequantize_output``).
+    """
+
+    def __init__(self, model, quantize_input=True, dequantize_output=True):
         super().__init__()
-        self.quant = QuantStub()
+        self.quant = QuantStub() if quantize_input else nn.Identity()
         self.model = model
-        self.dequant = DeQuantStub()
+        self.dequant = DeQuantStub() if dequantize_output else nn.Identity()
 
     # Override __getattr__ so that other code can successfully
     # access attributes of the contained model without erroring.
@@ -0,0 +1,107 @@
+from unittest.mock import MagicMock
+
+import pytest
+import torch
+import torch.nn as nn
+
+from quantization.calibration import calibrate_observers, calibration_part
+
+
+def encoder_model(num_layers=3):
+    # model whose encoder is a stack of linear layers over 4 features
+    model = MagicMock()
+    model.mods = nn.ModuleDict(
+        {"encoder": nn.Sequential(*[nn.Linear(4, 4) for _ in range(num_layers)])}
+    )
+    model.encode_batch = MagicMock(
+        side_effect=lambda wavs, wav_lens: model.mods.encoder(wavs)
+    )
+    return model
+
+
+def record_inputs(module):
+    inputs = []
+    module.register_forward_hook(lambda module, args, output: inputs.append(args[0]))
+    return inputs
+
+
+class TestCalibrationPart:
+    @pytest.mark.parametrize(
+        "modules,expected",
+        [
+            (["encoder.model.CNN"], "encoder"),
+            (["encoder.model.CNN", "encoder.model.DNN"], "encoder"),
+            (["decoder.fc.w"], "decoder"),
+            (["encoder.model.CNN", "decoder.fc.w"], None),
+        ],
+    )
+    def test_calibration_part(self, modules, expected):
+        # GIVEN
+        #      names of observed modules
+        # WHEN
+        #      the part of the model that runs them is found
+        # THEN
+        #      it is their common top-level part, if any
+        assert calibration_part(modules) == expected
+
+
+class TestCalibrateObservers:
+    def test_encoder_stops_after_last_observed_module(self):
+        # GIVEN
+        #      observers in the first two of three encoder layers
+        #      four samples, calibrated in batches of two
+        model = encoder_model()
+        first_inputs = record_inputs(model.mods.encoder[0])
+        last_inputs = record_inputs(model.mods.encoder[2])
+        samples = [torch.randn(4) for _ in range(4)]
+
+        # WHEN
+        #      the observers are calibrated
+        calibrate_observers(model, ["encoder.0", "encoder.1"], samples, batch_size=2)
+
+        # THEN
+        #      the observed layers see every batch
+        #      the layer after them and the decoding never run
+        #      no hook is left on the model
+        assert [inputs.shape for inputs in first_inputs] == [(2, 4), (2, 4)]
+        assert last_inputs == []
+        model.transcribe_batch.assert_not_called()
+        assert not model.mods.encoder[1]._forward_hooks
+
+    def test_decoder_modules_are_calibrated_by_transcription(self):
+        # GIVEN
+        #      an observer in the decoder
+        #      samples of different lengths, calibrated in batches of two
+        model = MagicMock()
+        samples = [torch.ones(3), torch.ones(5), torch.ones(4)]
+
+        # WHEN
+        #      the observers are calibrated
+        calibrate_observers(model, ["decoder.fc.w"], samples, batch_size=2)
+
+        # THEN
+        #      padded batches of similar lengths are transcribed whole
+        #      with the relative length of each sample
+        calls = model.transcribe_batch.call_args_list
+        assert len(calls) == 2
+        wavs, wav_lens = calls[0].args
+        assert wavs.shape == (2, 5)
+        assert wav_lens.tolist() == pytest.approx([1.0, 0.8])
+        wavs, wav_lens = calls[1].args
+        assert wavs.shape == (1, 3)
+        assert wav_lens.tolist() == [1.0]
+
+    def test_pcm_samples_are_scaled(self):
+        # GIVEN
+        #      16-bit PCM samples, as held by an AudioStore
+        model = encoder_model(num_layers=1)
+        inputs = record_inputs(model.mods.encoder[0])
+        samples = [torch.full((4,), 16384, dtype=torch.int16)]
+
+        # WHEN
+        #      the observers are calibrated one sample at a time
+        calibrate_observers(model, ["encoder.0"], samples)
+
+        # THEN
+        #      the observed layer sees the samples as float audio in [-1, 1)
+        assert torch.equal(inputs[0], torch.full((1, 4), 0.5))
@@ -0,0 +1,160 @@
+import torch
+import torch.nn as nn
+import torch.ao.nn.quantized as nnq
+
+from quantization.chains import plan_chains
+from quantization.quantization import custom_quantize
+
+
+class ChainModel(nn.Module):
+    # encoder of a conv front end, transposed into a linear projection and a
+    # linear head, whose input can also be added to the output
+    def __init__(self, residual=False):
+        super().__init__()
+        self.residual = residual
+        self.mods = nn.ModuleDict(
+            {
+                "encoder": nn.ModuleDict(
+                    {
+                        "front": nn.Sequential(nn.Conv1d(1, 4, 3), nn.ReLU()),
+                        "proj": nn.Sequential(nn.Linear(4, 4), nn.ReLU()),
+                        "head": nn.Linear(4, 3),
+                        "skip": nn.Linear(4, 3),
+                    }
+                )
+            }
+        )
+
+    def encode_batch(self, wavs, wav_lens):
+        x = self.mods.encoder.front(wavs.unsqueeze(1))
+        x = self.mods.encoder.proj(x.transpose(1, 2))
+        out = self.mods.encoder.head(x)
+        if self.residual:
+            out = out + self.mods.encoder.skip(x)
+        return out
+
+
+MODULES = ["encoder.front", "encoder.proj", "encoder.head"]
+
+
+class FunctionalModel(nn.Module):
+    # two linear modules with functional ops in between, which free
+    # intermediate tensors whose memory the allocator can hand out again
+    def __init__(self, in_place=False):
+        super().__init__()
+        self.in_place = in_place
+        self.mods = nn.ModuleDict(
+            {
+                "encoder": nn.ModuleDict(
+                    {"first": nn.Linear(4, 4), "second": nn.Linear(4, 4)}
+                )
+            }
+        )
+
+    def encode_batch(self, wavs, wav_lens):
+        x = self.mods.encoder.first(wavs.unsqueeze(-1).expand(-1, -1, 4))
+        if self.in_place:
+            x.tanh_()
+        else:
+            x = torch.tanh(x)
+            x = torch.sigmoid(x)
+        return self.mods.encoder.second(x)
+
+
+class TestPlanChains:
+    def test_chain_through_view(self):
+        # GIVEN
+        #      modules that each feed the next, through a transpose
+        torch.manual_seed(0)
+        model = ChainModel()
+
+        # WHEN
+        #      the chains are planned
+        chains = plan_chains(model, MODULES, [torch.randn(64)])
+
+        # THEN
+        #      the modules form a single chain, in the order that they run
+        assert chains == [MODULES]
+
+    def test_output_used_elsewhere(self):
+        # GIVEN
+        #      a projection whose output is also taken by a module outside
+        #      the static modules
+        torch.manual_seed(0)
+        model = ChainModel(residual=True)
+
+        # WHEN
+        #      the chains are planned
+        chains = plan_chains(model, MODULES, [torch.randn(64)])
+
+        # THEN
+        #      the projection ends the chain, its output is dequantized
+        assert chains == [["encoder.front", "encoder.proj"]]
+
+    def test_functional_ops_in_between(self):
+        # GIVEN
+        #      two modules with functional ops in between
+        torch.manual_seed(0)
+        model = FunctionalModel()
+        modules = ["encoder.first", "encoder.second"]
+
+        # WHEN
+        #      the chains are planned many times
+        plans = [plan_chains(model, modules, [torch.randn(64)]) for _ in range(50)]
+
+        # THEN
+        #      the modules never form a chain
+        assert plans == [[]] * 50
+
+    def test_output_modified_in_place(self):
+        # GIVEN
+        #      two modules with an in-place op in between
+        torch.manual_seed(0)
+        model = FunctionalModel(in_place=True)
+
+        # WHEN
+        #      the chains are planned
+        chains = plan_chains(
+            model, ["encoder.first", "encoder.second"], [torch.randn(64)]
+        )
+
+        # THEN
+        #      the modules do not form a chain
+        assert chains == []
+
+
+class TestKeepQuantized:
+    def test_stubs_at_chain_ends(self):
+        # GIVEN
+        #      a model and its output
+        torch.manual_seed(0)
+        model = ChainModel()
+        model.eval()
+        samples = [torch.randn(64) for _ in range(8)]
+        wavs = torch.randn(2, 64)
+        expected = model.encode_batch(wavs, torch.ones(2))
+
+        # WHEN
+        #      the modules are statically quantized, keeping activations
+        #      quantized between them
+        plan = custom_quantize(
+            model,
+            static_modules=MODULES,
+            calibration_samples=samples,
+            keep_quantized=True,
+        )
+
+        # THEN
+        #      only the entry of the chain quantizes, only its exit dequantizes
+        #      the output is close to that of the original model
+        encoder = model.mods.encoder
+        assert plan == {"chains": [MODULES]}
+        assert isinstance(encoder.front.quant, nnq.Quantize)
+        assert isinstance(encoder.front.dequant, nn.Identity)
+        assert isinstance(encoder.proj.quant, nn.Identity)
+        assert isinstance(encoder.proj.dequant, nn.Identity)
+        assert isinstance(encoder.head.quant, nn.Identity)
+        assert isinstance(encoder.head.dequant, nnq.DeQuantize)
+        output = model.encode_batch(wavs, torch.ones(2))
+        assert not output.is_quantized
+        assert torch.allclose(output, expected, atol=0.1)
@@ -0,0 +1,114 @@
+from unittest.mock import MagicMock
+
+import torch
+import torch.nn as nn
+
+from quantization.fusion import find_fusions, fuse_for_quantization
+from quantization.quantization import static_quantize
+from quantization.static_quant import StaticQuant
+
+
+class ConvModel(nn.Module):
+    # encoder of a conv stack that PyTorch can fuse, and of a linear stack
+    # that it cannot, with a transpose and a dropout in between
+    def __init__(self):
+        super().__init__()
+        self.mods = nn.ModuleDict(
+            {
+                "encoder": nn.ModuleDict(
+                    {
+                        "cnn": nn.Sequential(
+                            nn.Conv1d(1, 4, 3),
+                            nn.BatchNorm1d(4),
+                            nn.Dropout(0.1),
+                            nn.ReLU(),
+                        ),
+                        "dnn": nn.Sequential(
+                            nn.Linear(4, 4), nn.LayerNorm(4), nn.GELU()
+                        ),
+                    }
+                )
+            }
+        )
+
+    def encode_batch(self, wavs, wav_lens):
+        x = self.mods.encoder.cnn(wavs.unsqueeze(1))
+        return self.mods.encoder.dnn(x.transpose(1, 2))
+
+
+class TestFindFusions:
+    def test_fusable_and_unsupported_chains(self):
+        # GIVEN
+        #      a conv, batch norm and ReLU, which PyTorch fuses
+        #      a linear, layer norm and GELU, which it cannot
+        torch.manual_seed(0)
+        model = ConvModel()
+
+        # WHEN
+        #      the chains under both modules are found
+        report = find_fusions(model, ["encoder.cnn", "encoder.dnn"], torch.randn(64))
+
+        # THEN
+        #      the conv chain is fusable, skipping the dropout
+        #      the linear chain is reported with its types
+        assert report["fused"] == [["encoder.cnn.0", "encoder.cnn.1", "encoder.cnn.3"]]
+        assert report["unsupported"] == [
+            {
+                "modules": ["encoder.dnn.0", "encoder.dnn.1", "encoder.dnn.2"],
+                "types": ["Linear", "LayerNorm", "GELU"],
+            }
+        ]
+
+    def test_fusion_keeps_outputs(self):
+        # GIVEN
+        #      a model in eval mode, and its output
+        torch.manual_seed(0)
+        model = ConvModel()
+        model.eval()
+        wavs = torch.randn(2, 64)
+        expected = model.encode_batch(wavs, torch.ones(2))
+
+        # WHEN
+        #      the fusable chains are fused
+        fuse_for_quantization(model, ["encoder.cnn"], [wavs[0]])
+
+        # THEN
+        #      the conv chain is a single module, with the same output
+        assert isinstance(model.mods.encoder.cnn[0], torch.ao.nn.intrinsic.ConvReLU1d)
+        assert isinstance(model.mods.encoder.cnn[1], nn.Identity)
+        assert torch.allclose(
+            model.encode_batch(wavs, torch.ones(2)), expected, atol=1e-6
+        )
+
+
+class TestStaticQuantizeFusion:
+    def test_fusion_precedes_wrapping(self):
+        # GIVEN
+        #      a fusion function that checks that the modules are not wrapped yet
+        model = MagicMock()
+        modules = ["module1"]
+        calibration_samples = [torch.ones(4)]
+        fuse_fn = MagicMock(
+            side_effect=lambda model, modules, samples: (
+                {"wrapped": isinstance(model.mods.module1, StaticQuant)}
+            )
+        )
+
+        # WHEN
+        #      static quantization is applied
+        fusions = static_quantize(
+            model=model,
+            modules=modules,
+            calibration_samples=calibration_samples,
+            qconfig="qconfig",
+            prepare_fn=MagicMock(),
+            convert_fn=MagicMock(),
+            fuse_fn=fuse_fn,
+        )
+
+        # THEN
+        #      the modules are fused before they are wrapped
+        #      the report of the fusion is returned
+        fuse_fn.assert_called_once_with(model, modules, calibration_samples)
+        assert fusions == {"wrapped": False}
+        assert isinstance(model.mods.module1, StaticQuant)
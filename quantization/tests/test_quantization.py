@@ -266,6 +266,9 @@ class TestStaticQuantize:
         sample1.unsqueeze.return_value = mock_sample1_unsqueeze
         sample2 = MagicMock()
         sample2.unsqueeze.return_value = mock_sample2_unsqueeze
+        # float samples are unchanged by the conversion of PCM samples
+        sample1.float.return_value = sample1
+        sample2.float.return_value = sample2
         calibration_samples = [sample1, sample2]
         qconfig = "qconfig"
         expected_prepare_calls = [call(model=model, inplace=True)]
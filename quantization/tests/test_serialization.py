@@ -0,0 +1,287 @@
+import shutil
+
+import pytest
+import torch
+import torch.nn as nn
+from hyperpyyaml import load_hyperpyyaml
+from speechbrain.inference.ASR import EncoderASR
+from transformers import (
+    AutoConfig,
+    AutoFeatureExtractor,
+    AutoModel,
+    Wav2Vec2FeatureExtractor,
+)
+
+from config.config import ModelConfig, QuantMethod
+from config.tiny import TinyWav2Vec2
+from quantization.quantization import custom_quantize
+from quantization.serialization import load_quantized, save_quantized
+from quantization.static_quant import StaticQuant
+
+
+class SmallModel(nn.Module):
+    # model with a front end and a linear head, over 4 features
+    def __init__(self):
+        super().__init__()
+        self.mods = nn.ModuleDict(
+            {
+                "encoder": nn.ModuleDict(
+                    {
+                        "front": nn.Sequential(nn.Linear(4, 8), nn.ReLU()),
+                        "head": nn.Sequential(nn.Linear(8, 3)),
+                    }
+                )
+            }
+        )
+
+    def encode_batch(self, wavs, wav_lens):
+        return self.mods.encoder.head(self.mods.encoder.front(wavs))
+
+
+def small_model():
+    torch.manual_seed(0)
+    return SmallModel()
+
+
+def small_model_config():
+    return ModelConfig(
+        src="small",
+        savedir=None,
+        module_config={
+            "encoder.front": [QuantMethod.STATIC],
+            "encoder.head": [QuantMethod.DYNAMIC],
+        },
+        type=EncoderASR,
+        factory=small_model,
+    )
+
+
+# hyperparams of a pretrained model with the layout of SmallModel, whose
+# normalization statistics and tokenizer are held outside of its modules
+HPARAMS = """
+normalize: !new:speechbrain.processing.features.InputNormalization
+    norm_type: global
+front: !new:torch.nn.Sequential
+    - !new:torch.nn.Linear
+        in_features: 4
+        out_features: 8
+    - !new:torch.nn.ReLU
+head: !new:torch.nn.Sequential
+    - !new:torch.nn.Linear
+        in_features: 8
+        out_features: 3
+encoder: !new:speechbrain.nnet.containers.LengthsCapableSequential
+    normalize: !ref <normalize>
+    front: !ref <front>
+    head: !ref <head>
+tokenizer: !new:speechbrain.dataio.encoder.CTCTextEncoder
+decoding_function: !name:speechbrain.decoders.ctc_greedy_decode
+    blank_id: 0
+modules:
+    encoder: !ref <encoder>
+pretrainer: !new:speechbrain.utils.parameter_transfer.Pretrainer
+    loadables:
+        encoder: !ref <encoder>
+        normalizer: !ref <normalize>
+        tokenizer: !ref <tokenizer>
+"""
+
+
+def pretrained_source(path):
+    # directory of a pretrained model, as it would be downloaded
+    path.mkdir()
+    (path / "hyperparams.yaml").write_text(HPARAMS)
+    torch.manual_seed(0)
+    hparams = load_hyperpyyaml(HPARAMS)
+    hparams["normalize"](torch.randn(8, 4), torch.ones(8))
+    hparams["tokenizer"].update_from_iterable("abc", sequence_input=False)
+    torch.save(hparams["encoder"].state_dict(), path / "encoder.ckpt")
+    hparams["normalize"]._save(path / "normalizer.ckpt")
+    hparams["tokenizer"].save(path / "tokenizer.ckpt")
+    return path
+
+
+# hyperparams of a pretrained model around SpeechBrain's HuggingFace wrapper,
+# which fetches the config and feature extractor of its hub model when built
+HUB_HPARAMS = """
+wav2vec2: !new:speechbrain.integrations.huggingface.wav2vec2.Wav2Vec2
+    source: {hub}
+    save_path: {savedir}/wav2vec2_checkpoint
+    freeze: True
+head: !new:torch.nn.Linear
+    in_features: 32
+    out_features: 3
+encoder: !new:speechbrain.nnet.containers.LengthsCapableSequential
+    wav2vec2: !ref <wav2vec2>
+    head: !ref <head>
+tokenizer: !new:speechbrain.dataio.encoder.CTCTextEncoder
+decoding_function: !name:speechbrain.decoders.ctc_greedy_decode
+    blank_id: 0
+modules:
+    encoder: !ref <encoder>
+pretrainer: !new:speechbrain.utils.parameter_transfer.Pretrainer
+    loadables:
+        encoder: !ref <encoder>
+        tokenizer: !ref <tokenizer>
+"""
+
+
+def hub_source(path, savedir):
+    # directory of a pretrained model, and of the hub model that it wraps
+    hub = path / "hub"
+    torch.manual_seed(0)
+    TinyWav2Vec2().model.save_pretrained(hub)
+    Wav2Vec2FeatureExtractor().save_pretrained(hub)
+    hparams_yaml = HUB_HPARAMS.format(hub=hub, savedir=savedir)
+    (path / "hyperparams.yaml").write_text(hparams_yaml)
+    hparams = load_hyperpyyaml(hparams_yaml)
+    hparams["tokenizer"].update_from_iterable("ab", sequence_input=False)
+    torch.save(hparams["encoder"].state_dict(), path / "encoder.ckpt")
+    hparams["tokenizer"].save(path / "tokenizer.ckpt")
+    return path
+
+
+class TestSerialization:
+    def test_round_trip(self, tmp_path):
+        # GIVEN
+        #      a model quantized with static and dynamic modules
+        model_config = small_model_config()
+        model = model_config.load()
+        samples = [torch.randn(4) for _ in range(8)]
+        custom_quantize(
+            model,
+            dynamic_modules=["encoder.head"],
+            static_modules=["encoder.front"],
+            calibration_samples=samples,
+        )
+        path = tmp_path / "model.pt"
+
+        # WHEN
+        #      the model is saved and loaded again
+        save_quantized(
+            model,
+            model_config,
+            path,
+            dynamic_modules=["encoder.head"],
+            static_modules=["encoder.front"],
+        )
+        loaded = load_quantized(path)
+
+        # THEN
+        #      the loaded model has the same quantized layout
+        #      its quantization parameters and outputs are those of the original
+        assert isinstance(loaded.mods.encoder.front, StaticQuant)
+        assert isinstance(loaded.mods.encoder.head[0], nn.quantized.dynamic.Linear)
+        assert (
+            loaded.mods.encoder.front.quant.scale
+            == model.mods.encoder.front.quant.scale
+        )
+        wavs = torch.randn(2, 4)
+        assert torch.equal(
+            loaded.encode_batch(wavs, torch.ones(2)),
+            model.encode_batch(wavs, torch.ones(2)),
+        )
+
+    def test_unsupported_format(self, tmp_path):
+        # GIVEN
+        #      an artifact of another format version
+        path = tmp_path / "model.pt"
+        torch.save({"format_version": -1}, path)
+
+        # WHEN
+        #      it is loaded
+        # THEN
+        #      a ValueError is raised
+        with pytest.raises(ValueError):
+            load_quantized(path)
+
+    def test_load_without_pretrained_files(self, tmp_path):
+        # GIVEN
+        #      a quantized pretrained model, saved to an artifact
+        model_config = ModelConfig(
+            src=str(pretrained_source(tmp_path / "source")),
+            savedir=str(tmp_path / "savedir"),
+            module_config={
+                "encoder.front": [QuantMethod.STATIC],
+                "encoder.head": [QuantMethod.DYNAMIC],
+            },
+            type=EncoderASR,
+        )
+        model = model_config.load()
+        custom_quantize(
+            model,
+            dynamic_modules=["encoder.head"],
+            static_modules=["encoder.front"],
+            calibration_samples=[torch.randn(4) for _ in range(8)],
+        )
+        model.eval()
+        path = tmp_path / "model.pt"
+        save_quantized(
+            model,
+            model_config,
+            path,
+            dynamic_modules=["encoder.head"],
+            static_modules=["encoder.front"],
+        )
+
+        # WHEN
+        #      the pretrained source and savedir are gone when it is loaded
+        shutil.rmtree(tmp_path / "source")
+        shutil.rmtree(tmp_path / "savedir")
+        loaded = load_quantized(path)
+
+        # THEN
+        #      the state outside of the modules is restored from the artifact
+        #      its outputs are those of the original
+        assert loaded.tokenizer.lab2ind == model.tokenizer.lab2ind
+        assert torch.equal(
+            loaded.mods.encoder.normalize.glob_mean,
+            model.mods.encoder.normalize.glob_mean,
+        )
+        wavs = torch.randn(2, 4)
+        assert torch.equal(
+            loaded.encode_batch(wavs, torch.ones(2)),
+            model.encode_batch(wavs, torch.ones(2)),
+        )
+
+    def test_load_without_hub(self, tmp_path, monkeypatch):
+        # GIVEN
+        #      a quantized pretrained model around a HuggingFace model,
+        #      saved to an artifact
+        model_config = ModelConfig(
+            src=str(hub_source(tmp_path / "source", tmp_path / "savedir")),
+            savedir=str(tmp_path / "savedir"),
+            module_config={"encoder.head": [QuantMethod.DYNAMIC]},
+            type=EncoderASR,
+        )
+        model = model_config.load()
+        custom_quantize(model, dynamic_modules=["encoder.head"])
+        model.eval()
+        path = tmp_path / "model.pt"
+        save_quantized(model, model_config, path, dynamic_modules=["encoder.head"])
+
+        # WHEN
+        #      the pretrained source and savedir are gone, and the hub cannot
+        #      be reached, when it is loaded
+        shutil.rmtree(tmp_path / "source")
+        shutil.rmtree(tmp_path / "savedir")
+
+        def unreachable(*args, **kwargs):
+            raise OSError("hub unreachable")
+
+        for auto_class in (AutoConfig, AutoFeatureExtractor, AutoModel):
+            monkeypatch.setattr(auto_class, "from_pretrained", unreachable)
+        loaded = load_quantized(path)
+
+        # THEN
+        #      the HuggingFace model is built from the config in the artifact
+        #      its outputs are those of the original
+        assert (
+            loaded.mods.encoder.wav2vec2.model.config.to_dict()
+            == model.mods.encoder.wav2vec2.model.config.to_dict()
+        )
+        wavs = torch.randn(2, 1600)
+        assert torch.equal(
+            loaded.encode_batch(wavs, torch.ones(2)),
+            model.encode_batch(wavs, torch.ones(2)),
+        )
@@ -1,6 +1,33 @@
 from unittest.mock import MagicMock
 
-from quantization.utils import get_module, set_module
+import torch
+import torch.nn as nn
+
+from quantization.quantization import custom_quantize
+from quantization.utils import clone_for_quantization, get_module, set_module
+
+
+class SmallModel(nn.Module):
+    # encoder of two layers and a head, over 4 features, and a decoder
+    def __init__(self):
+        super().__init__()
+        self.mods = nn.ModuleDict(
+            {
+                "encoder": nn.ModuleDict(
+                    {
+                        "layers": nn.ModuleList(
+                            [nn.Sequential(nn.Linear(4, 4)) for _ in range(2)]
+                        ),
+                        "head": nn.Sequential(nn.Linear(4, 4), nn.ReLU()),
+                    }
+                ),
+                "decoder": nn.Sequential(nn.Linear(4, 4)),
+            }
+        )
+
+    def encode_batch(self, wavs, wav_lens):
+        encoder = self.mods.encoder
+        return encoder.head(encoder.layers[1](encoder.layers[0](wavs)))
 
 
 class TestGetAttr:
@@ -183,3 +210,68 @@ class TestSetAttr:
         # THEN
         #      the attribute is correctly set
         assert mock_model.mods.attr.my_list[2].attr1.attr2 == expected
+
+
+class TestCloneForQuantization:
+    def test_only_named_modules_are_copied(self):
+        # GIVEN
+        #      a model and one of its nested submodules
+        model = SmallModel()
+
+        # WHEN
+        #      the model is cloned to quantize that submodule
+        clone = clone_for_quantization(model, ["encoder.layers.1"])
+
+        # THEN
+        #      the submodule and its ancestors are copies
+        #      every other submodule is shared
+        assert clone is not model
+        assert clone.mods is not model.mods
+        assert clone.mods.encoder.layers is not model.mods.encoder.layers
+        assert clone.mods.encoder.layers[1] is not model.mods.encoder.layers[1]
+        assert clone.mods.encoder.layers[0] is model.mods.encoder.layers[0]
+        assert clone.mods.encoder.head is model.mods.encoder.head
+        assert clone.mods.decoder is model.mods.decoder
+
+    def test_nested_names_are_copied_once(self):
+        # GIVEN
+        #      a submodule named along with a module inside of it
+        model = SmallModel()
+
+        # WHEN
+        #      the model is cloned
+        clone = clone_for_quantization(model, ["encoder.head", "encoder"])
+
+        # THEN
+        #      the outer module is copied whole, including the inner one
+        assert clone.mods.encoder is not model.mods.encoder
+        assert clone.mods.encoder.head is not model.mods.encoder.head
+        assert (
+            clone.mods.encoder.head[0].weight is not model.mods.encoder.head[0].weight
+        )
+
+    def test_quantizing_clone_leaves_original_unchanged(self):
+        # GIVEN
+        #      a clone of a model for dynamic and static quantization
+        model = SmallModel()
+        state = {k: v.clone() for k, v in model.state_dict().items()}
+        clone = clone_for_quantization(model, ["encoder.layers.1", "encoder.head"])
+
+        # WHEN
+        #      the clone is quantized in place
+        custom_quantize(
+            clone,
+            dynamic_modules=["encoder.layers.1"],
+            static_modules=["encoder.head"],
+            calibration_samples=[torch.randn(4) for _ in range(4)],
+        )
+
+        # THEN
+        #      the clone is quantized
+        #      the original keeps its modules and weights
+        assert isinstance(clone.mods.encoder.layers[1][0], nn.quantized.dynamic.Linear)
+        assert type(model.mods.encoder.layers[1][0]) is nn.Linear
+        assert type(model.mods.encoder.head) is nn.Sequential
+        assert model.state_dict().keys() == state.keys()
+        for key, value in model.state_dict().items():
+            assert torch.equal(value, state[key])
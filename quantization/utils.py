@@ -1,8 +1,11 @@
 """
 Utility functions for getting nested attributes and attributes inside lists,
-specified only by string.
+specified only by string, and for copying models to be quantized.
 """
 
+from copy import copy, deepcopy
+from itertools import chain
+
 from speechbrain.inference import Pretrained
 
 
@@ -28,3 +31,70 @@ def set_module(model: Pretrained, module_name: str, new_module):
         curr[int(attrs[-1])] = new_module
     else:
         setattr(curr, attrs[-1], new_module)
+
+
+def clone_for_quantization(model: Pretrained, module_names: list[str]):
+    """Copy of a model whose named submodules can be quantized in place.
+
+    Only the named submodules are deep-copied. Their ancestors are shallow
+    copies, so that the copied submodules can be set into them, and every
+    other submodule, as well as the hparams, is shared with the original
+    model by reference. Quantizing the named submodules of the copy, e.g.
+    with ``custom_quantize``, leaves the original model unchanged, but any
+    other submodule must not be modified in place.
+
+    Arguments
+    ---------
+    model : Pretrained
+        Model to be copied.
+    module_names : list[str]
+        Names of the submodules to be copied, as nested fields of
+        ``model.mods``, e.g. ``encoder.enc``.
+
+    Returns
+    -------
+    Pretrained
+    """
+    clone = _shallow_copy(model)
+    # copies by id of the original modules, so that shared ancestors are
+    # copied once
+    copies = {}
+    # an outer module is deep-copied whole, with the modules inside of it
+    names = sorted(module_names, key=lambda name: len(name.split(".")))
+    copied = []
+    for name in names:
+        if any(name.startswith(outer + ".") for outer in copied):
+            continue
+        attrs = ["mods"] + name.split(".")
+        parent, parent_clone = model, clone
+        for attr in attrs[:-1]:
+            child = parent._modules[attr]
+            if id(child) not in copies:
+                copies[id(child)] = _shallow_copy(child)
+                parent_clone._modules[attr] = copies[id(child)]
+            parent, parent_clone = child, copies[id(child)]
+        parent_clone._modules[attrs[-1]] = deepcopy(parent._modules[attrs[-1]])
+        copied.append(name)
+
+    # the copied submodules must not share any tensor with the original
+    original = {
+        tensor.data_ptr()
+        for tensor in chain(model.parameters(), model.buffers())
+        if tensor.numel() > 0
+    }
+    for name in copied:
+        module = get_module(clone, name)
+        for tensor in chain(module.parameters(), module.buffers()):
+            if tensor.numel() > 0 and tensor.data_ptr() in original:
+                raise RuntimeError(f"Copy of {name} shares tensors with the original")
+    return clone
+
+
+def _shallow_copy(module):
+    # copies the attributes of a module, with its own dicts of submodules,
+    # parameters and buffers, so that those can be replaced independently
+    clone = copy(module)
+    clone._modules = copy(module._modules)
+    clone._parameters = copy(module._parameters)
+    clone._buffers = copy(module._buffers)
+    return clone
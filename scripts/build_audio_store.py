@@ -0,0 +1,25 @@
+"""
+Script for decoding the LibriSpeech dev-clean corpus once into a memory-mapped
+audio store, which later runs open with AudioStore.open instead of decoding.
+"""
+
+import os
+import sys
+
+sys.path.append("/home/justinlam19/dissertation")
+
+import numpy as np
+
+from data.manifest import get_manifest
+from data.store import build_audio_store
+
+manifest = get_manifest(
+    "librispeech_dev_clean/LibriSpeech/dev-clean", "output/dev_clean_manifest.tsv"
+)
+# stored in the order of the manifest, so that references line up
+build_audio_store(
+    manifest.dataset(),
+    "output/dev_clean_store",
+    dtype=np.int16,
+    num_workers=os.cpu_count(),
+)
@@ -12,34 +12,40 @@ sys.path.append("/home/justinlam19/dissertation")
 import gc
 from copy import deepcopy
 
-import numpy as np
-
-from benchmark.benchmark import benchmark
+from benchmark.benchmark import benchmark, format_results
+from benchmark.memory import format_memory, module_memory
 from config.config import ModelConfig, QuantMethod
-from data.data import get_librispeech_data, random_choice
+from data.manifest import get_manifest
+from data.prefetch import Prefetcher
+from data.sampler import calibration_set
+from quantization.chains import format_chains
+from quantization.fusion import format_fusions
 from quantization.quantization import custom_quantize
+from quantization.serialization import save_quantized
 
 output_file = "output/crdnn_overall.txt"
 
 model_config = ModelConfig.crdnn()
-asr_model = model_config.type.from_hparams(
-    source=model_config.src,
-    savedir=model_config.savedir,
-)
+asr_model = model_config.load()
 
-audios, references = get_librispeech_data("librispeech_dev_clean/LibriSpeech/dev-clean")
+manifest = get_manifest(
+    "librispeech_dev_clean/LibriSpeech/dev-clean", "output/dev_clean_manifest.tsv"
+)
+audios, references = manifest.dataset(), manifest.references()
 assert len(audios) == len(references)
-np.random.seed(1337)
-calibration_samples = random_choice(audios, 10)
+calibration_samples = calibration_set(manifest)
 n = 100
-audio_subset = audios[:n]
+batch_size = 8
+# upcoming batches are decoded while the current one is transcribed
+audio_subset = Prefetcher(audios[:n], num_workers=2)
 ref_subset = references[:n]
 
 original_model = deepcopy(asr_model)
 original_model.eval()
-wer, rtf = benchmark(original_model, audio_subset, ref_subset)
+results = benchmark(original_model, audio_subset, ref_subset, batch_size=batch_size)
 with open(output_file, "w+") as f:
-    f.write(f"Original Model\nWER(%): {wer}\nRTF: {rtf}\n\n")
+    f.write(f"Original Model\n{format_results(results)}\n")
+    f.write(format_memory(module_memory(original_model, model_config.modules)))
 del original_model
 gc.collect()
 
@@ -55,17 +61,32 @@ static_modules = [
     for module in model_config.modules
     if QuantMethod.STATIC in model_config.module_config[module]
 ]
-custom_quantize(
+plan = custom_quantize(
     model=quantized_model,
     dynamic_modules=dynamic_modules,
     static_modules=static_modules,
     calibration_samples=calibration_samples,
+    fuse=True,
+    keep_quantized=True,
 )
 quantized_model.eval()
-wer, rtf = benchmark(quantized_model, audio_subset, ref_subset)
+# ready-to-run artifact, see quantization.serialization.load_quantized
+save_quantized(
+    quantized_model,
+    model_config,
+    "output/crdnn_quantized.pt",
+    dynamic_modules=dynamic_modules,
+    static_modules=static_modules,
+    fused_modules=plan["fused"],
+    static_chains=plan["chains"],
+)
+results = benchmark(quantized_model, audio_subset, ref_subset, batch_size=batch_size)
 with open(output_file, "w+") as f:
     f.write(
-        f"Quantized Model (dynamic rnn, dnn, dec, fc; static cnn)\nWER(%): {wer}\nRTF: {rtf}\n\n"
+        f"Quantized Model (dynamic rnn, dnn, dec, fc; static cnn)\n{format_results(results)}\n"
     )
+    f.write(format_memory(module_memory(quantized_model, model_config.modules)))
+    f.write(format_fusions(plan))
+    f.write(format_chains(plan["chains"]))
 del quantized_model
 gc.collect()
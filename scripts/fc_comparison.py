@@ -0,0 +1,68 @@
+"""
+Script for deciding between dynamic and static quantization of decoder.fc.w
+in the crdnn-commonvoice-14-en model, from repeated benchmark runs.
+"""
+
+import sys
+
+sys.path.append("/home/justinlam19/dissertation")
+
+import gc
+
+from benchmark.runner import (
+    compare,
+    format_comparison,
+    format_repeated,
+    repeated_benchmark,
+)
+from config.config import ModelConfig
+from data.manifest import get_manifest
+from data.sampler import calibration_set
+from quantization.quantization import custom_quantize
+from quantization.utils import clone_for_quantization
+
+output_file = "output/fc_comparison.txt"
+
+model_config = ModelConfig.crdnn()
+asr_model = model_config.load()
+
+manifest = get_manifest(
+    "librispeech_dev_clean/LibriSpeech/dev-clean", "output/dev_clean_manifest.tsv"
+)
+audios, references = manifest.dataset(), manifest.references()
+assert len(audios) == len(references)
+calibration_samples = calibration_set(manifest)
+n = 100
+audio_subset = audios[:n]
+ref_subset = references[:n]
+
+# decoder.fc.w only runs in the decoder, so only shows in the end-to-end RTF
+e2e_rtfs = {}
+with open(output_file, "w+") as f:
+    for method in ["dynamic", "static"]:
+        quantized_model = clone_for_quantization(asr_model, ["decoder.fc.w"])
+        custom_quantize(
+            model=quantized_model,
+            dynamic_modules=["decoder.fc.w"] if method == "dynamic" else None,
+            static_modules=["decoder.fc.w"] if method == "static" else None,
+            calibration_samples=calibration_samples,
+        )
+        quantized_model.eval()
+        results = repeated_benchmark(
+            quantized_model,
+            audio_subset,
+            ref_subset,
+            repeats=10,
+            num_threads=1,
+            cpu_affinity=[0],
+            batch_size=8,
+        )
+        e2e_rtfs[method] = results["e2e_rtfs"]
+        f.write(f"decoder.fc.w ({method})\n{format_repeated(results)}\n")
+        del quantized_model
+        gc.collect()
+
+    f.write(
+        "Static vs dynamic end-to-end RTF\n"
+        f"{format_comparison(compare(e2e_rtfs['dynamic'], e2e_rtfs['static']))}"
+    )
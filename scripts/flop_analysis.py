@@ -1,31 +1,41 @@
 """
 Quick script for analyzing the number of flops per unit audio length
 of a provided model.
+
+Traced FLOPs are cached in output/flops_cache.json, and models are only
+loaded when a length is missing from the cache.
 """
 
 import sys
 
 sys.path.append("/home/justinlam19/dissertation")
 
-from benchmark.flops import count_flops
+from functools import lru_cache
+
+from benchmark.flops import FlopCache, fit_flops
 from config.config import ModelConfig
-from data.data import get_librispeech_data
+from data.manifest import get_manifest
+
+cache = FlopCache("output/flops_cache.json")
+
 
+def print_flop_analysis(model_config: ModelConfig, duration):
+    @lru_cache(maxsize=None)
+    def load_model():
+        return model_config.load()
 
-def print_flop_analysis(model_config: ModelConfig, sample):
-    asr_model = model_config.type.from_hparams(
-        source=model_config.src,
-        savedir=model_config.savedir,
-    )
-    flops = count_flops(asr_model, model_config.modules, sample)
+    flop_model = fit_flops(load_model, model_config.src, model_config.modules, cache)
     print(model_config.src)
-    for k, v in flops:
+    for k, v in flop_model.per_second(duration).items():
         print(f"{k}: {v}")
     print()
 
 
-audios, references = get_librispeech_data("librispeech_dev_clean/LibriSpeech/dev-clean")
+manifest = get_manifest(
+    "librispeech_dev_clean/LibriSpeech/dev-clean", "output/dev_clean_manifest.tsv"
+)
+audios, references = manifest.dataset(), manifest.references()
 assert len(audios) == len(references)
 
-print_flop_analysis(ModelConfig.wav2vec2(), audios[1])
-print_flop_analysis(ModelConfig.crdnn(), audios[1])
+print_flop_analysis(ModelConfig.wav2vec2(), manifest[1].duration)
+print_flop_analysis(ModelConfig.crdnn(), manifest[1].duration)
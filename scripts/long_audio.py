@@ -0,0 +1,41 @@
+"""
+Script for measuring how the latency of the wav2vec2-commonvoice-14-en model
+grows with input length, with and without chunked encoding of long audio.
+"""
+
+import sys
+
+sys.path.append("/home/justinlam19/dissertation")
+
+from benchmark.benchmark import length_scaling
+from config.config import ModelConfig
+from data.manifest import get_manifest
+
+output_file = "output/long_audio.txt"
+
+model_config = ModelConfig.wav2vec2()
+asr_model = model_config.load()
+asr_model.eval()
+
+manifest = get_manifest(
+    "librispeech_dev_clean/LibriSpeech/dev-clean", "output/dev_clean_manifest.tsv"
+)
+audios, references = manifest.dataset(), manifest.references()
+durations = [15, 30, 60, 120, 240]
+
+with open(output_file, "w+") as f:
+    for name, wrapper_kwargs in [
+        ("Whole input", {}),
+        (
+            "Chunked (20s window, 16s stride, 4 chunks per batch)",
+            {"chunk_window": 20, "chunk_stride": 16, "chunk_batch_size": 4},
+        ),
+    ]:
+        scaling = length_scaling(asr_model, audios[0], durations, **wrapper_kwargs)
+        f.write(f"{name}\n")
+        for duration, latency in zip(scaling["durations"], scaling["latencies"]):
+            f.write(f"{duration}s: {latency}s\n")
+        f.write(
+            f"Slope: {scaling['slope']}\nIntercept: {scaling['intercept']}\n"
+            f"R2: {scaling['r2']}\n\n"
+        )
@@ -12,12 +12,13 @@ import argparse
 import gc
 from copy import deepcopy
 
-import numpy as np
-
-from benchmark.benchmark import benchmark
+from benchmark.benchmark import benchmark, format_results
 from config.config import ModelConfig, QuantMethod
-from data.data import get_librispeech_data, random_choice
+from data.manifest import get_manifest
+from data.sampler import calibration_set
+from data.store import pack_audio
 from quantization.quantization import custom_quantize
+from quantization.utils import clone_for_quantization
 
 parser = argparse.ArgumentParser()
 parser.add_argument("-o", "--output", help="output file path")
@@ -35,31 +36,32 @@ else:
         model_config = pickle.load(f)
 
 
-asr_model = model_config.type.from_hparams(
-    source=model_config.src,
-    savedir=model_config.savedir,
-)
+asr_model = model_config.load()
 
-audios, references = get_librispeech_data("librispeech_dev_clean/LibriSpeech/dev-clean")
+manifest = get_manifest(
+    "librispeech_dev_clean/LibriSpeech/dev-clean", "output/dev_clean_manifest.tsv"
+)
+audios, references = manifest.dataset(), manifest.references()
 assert len(audios) == len(references)
-np.random.seed(1337)
-calibration_samples = random_choice(audios, 10)
+calibration_samples = calibration_set(manifest)
 n = 100
-audio_subset = audios[:n]
+batch_size = 8
+# decoded once and held as int16, as it is benchmarked for every module
+audio_subset = pack_audio(audios[:n])
 ref_subset = references[:n]
 
 original_model = deepcopy(asr_model)
 original_model.eval()
-wer, rtf = benchmark(original_model, audio_subset, ref_subset)
+results = benchmark(original_model, audio_subset, ref_subset, batch_size=batch_size)
 with open(output_file, "w+") as f:
-    f.write(f"Original Model\nWER(%): {wer}\nRTF: {rtf}\n\n")
+    f.write(f"Original Model\n{format_results(results)}\n")
 del original_model
 gc.collect()
 
 for module in model_config.modules:
     if QuantMethod.DYNAMIC not in model_config.module_config[module]:
         continue
-    quantized_model = deepcopy(asr_model)
+    quantized_model = clone_for_quantization(asr_model, [module])
     custom_quantize(
         model=quantized_model,
         dynamic_modules=[module],
@@ -67,16 +69,18 @@ for module in model_config.modules:
         calibration_samples=None,
     )
     quantized_model.eval()
-    wer, rtf = benchmark(quantized_model, audio_subset, ref_subset)
+    results = benchmark(
+        quantized_model, audio_subset, ref_subset, batch_size=batch_size
+    )
     with open(output_file, "w+") as f:
-        f.write(f"module (dynamic)\nWER(%): {wer}\nRTF: {rtf}\n\n")
+        f.write(f"module (dynamic)\n{format_results(results)}\n")
     del quantized_model
     gc.collect()
 
 for module in model_config.modules:
     if QuantMethod.STATIC not in model_config.module_config[module]:
         continue
-    quantized_model = deepcopy(asr_model)
+    quantized_model = clone_for_quantization(asr_model, [module])
     custom_quantize(
         model=quantized_model,
         dynamic_modules=[module],
@@ -84,8 +88,10 @@ for module in model_config.modules:
         calibration_samples=None,
     )
     quantized_model.eval()
-    wer, rtf = benchmark(quantized_model, audio_subset, ref_subset)
+    results = benchmark(
+        quantized_model, audio_subset, ref_subset, batch_size=batch_size
+    )
     with open(output_file, "w+") as f:
-        f.write(f"module (static)\nWER(%): {wer}\nRTF: {rtf}\n\n")
+        f.write(f"module (static)\n{format_results(results)}\n")
     del quantized_model
     gc.collect()
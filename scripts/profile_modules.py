@@ -0,0 +1,67 @@
+"""
+Script for measuring the wall-clock time spent in each quantizable module of
+the wav2vec2 and crdnn (commonvoice-14-en) models, fp32 and dynamically quantized.
+"""
+
+import sys
+
+sys.path.append("/home/justinlam19/dissertation")
+
+import gc
+from copy import deepcopy
+
+from benchmark.profiler import format_profile, profile_modules
+from config.config import ModelConfig, QuantMethod
+from data.manifest import get_manifest
+from data.sampler import sample_manifest
+from extension.config.wav2vec2_config import (
+    encoder_enc_config,
+    encoder_layers_config,
+    feature_extractor_config,
+    feature_projection_config,
+)
+from quantization.quantization import custom_quantize
+
+output_file = "output/profile_modules.txt"
+
+manifest = get_manifest(
+    "librispeech_dev_clean/LibriSpeech/dev-clean", "output/dev_clean_manifest.tsv"
+)
+audios, references = manifest.dataset(), manifest.references()
+samples = sample_manifest(manifest, 50, seed=1337, num_strata=5).dataset()
+batch_size = 8
+
+fine_grained_layers = {
+    "wav2vec2": encoder_enc_config()
+    + encoder_layers_config()
+    + feature_projection_config()
+    + feature_extractor_config(),
+    "crdnn": [],
+}
+
+with open(output_file, "w+") as f:
+    for name, model_config in [
+        ("wav2vec2", ModelConfig.wav2vec2()),
+        ("crdnn", ModelConfig.crdnn()),
+    ]:
+        asr_model = model_config.load()
+        asr_model.eval()
+        modules = model_config.modules + fine_grained_layers[name]
+
+        quantized_model = deepcopy(asr_model)
+        custom_quantize(
+            model=quantized_model,
+            dynamic_modules=[
+                module
+                for module in model_config.modules
+                if QuantMethod.DYNAMIC in model_config.module_config[module]
+            ],
+        )
+        quantized_model.eval()
+
+        for label, model in [("fp32", asr_model), ("dynamic", quantized_model)]:
+            table = profile_modules(model, modules, samples, batch_size=batch_size)
+            f.write(f"{name} ({label})\n{format_profile(table)}\n")
+
+        del asr_model, quantized_model
+        gc.collect()
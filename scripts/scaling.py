@@ -0,0 +1,79 @@
+"""
+Script for measuring how the throughput of the fp32 and quantized
+wav2vec2-commonvoice-14-en model scales with threads and replicas.
+"""
+
+import sys
+
+sys.path.append("/home/justinlam19/dissertation")
+
+import gc
+import os
+from copy import deepcopy
+
+from benchmark.scaling import format_scaling, scaling_sweep
+from config.config import ModelConfig, QuantMethod
+from data.manifest import get_manifest
+from data.sampler import calibration_set
+from quantization.quantization import custom_quantize
+
+# replicas are spawned, and import this script as a module
+if __name__ == "__main__":
+    output_file = "output/scaling.txt"
+
+    model_config = ModelConfig.wav2vec2()
+    asr_model = model_config.load()
+
+    manifest = get_manifest(
+        "librispeech_dev_clean/LibriSpeech/dev-clean", "output/dev_clean_manifest.tsv"
+    )
+    audios, references = manifest.dataset(), manifest.references()
+    assert len(audios) == len(references)
+    calibration_samples = calibration_set(manifest)
+    n = 100
+    batch_size = 8
+    audio_subset = audios[:n]
+    ref_subset = references[:n]
+
+    cpus = os.cpu_count()
+    counts = [2**i for i in range(cpus.bit_length()) if 2**i <= cpus]
+
+    original_model = deepcopy(asr_model)
+    original_model.eval()
+    results = scaling_sweep(
+        original_model,
+        audio_subset,
+        ref_subset,
+        counts,
+        counts,
+        batch_size=batch_size,
+        timeout=3600,
+    )
+    with open(output_file, "w+") as f:
+        f.write(f"Original Model\n{format_scaling(results)}\n")
+    del original_model
+    gc.collect()
+
+    quantized_model = deepcopy(asr_model)
+    custom_quantize(
+        model=quantized_model,
+        dynamic_modules=[
+            module
+            for module in model_config.modules
+            if QuantMethod.DYNAMIC in model_config.module_config[module]
+        ],
+    )
+    quantized_model.eval()
+    results = scaling_sweep(
+        quantized_model,
+        audio_subset,
+        ref_subset,
+        counts,
+        counts,
+        batch_size=batch_size,
+        timeout=3600,
+    )
+    with open(output_file, "a+") as f:
+        f.write(f"Quantized Model (dynamic)\n{format_scaling(results)}\n")
+    del quantized_model
+    gc.collect()